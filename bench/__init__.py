@@ -0,0 +1,17 @@
+"""
+حزمة القياس (Benchmarks) - بدون أي اتصال بتيليجرام أو fal/HF الحقيقية.
+
+المكونات:
+- stub_bot_api: خادم Bot API وهمي (زمن استجابة، RetryAfter، Forbidden، حد لكل توكن)
+- stub_design_api: خادم fal (queue) و HF وهمي يرجع صوراً جاهزة
+- fixtures: توليد N مستخدم/قناة/مجموعة في SQLite أو PostgreSQL
+- run: تشغيل السيناريوهات وإخراج النتائج JSON
+- compare: مقارنة نتيجتين
+
+مثال:
+    pip install -r bench/requirements.txt
+    python -m bench.run --users 20000 --channels 300 --groups 500 --out results/base.json
+    python -m bench.compare results/base.json results/new.json
+    # البوتات المساعدة: حد 30 رسالة/ثانية لكل توكن، ثم 3 توكنات مساعدة
+    python -m bench.run --scenarios broadcast --users 0 --channels 3000 --token-rate 30 --helpers 3
+"""
@@ -0,0 +1,47 @@
+import json
+import sys
+
+# المقاييس التي تكون فيها الزيادة تحسناً (الباقي: الأقل أفضل)
+HIGHER_IS_BETTER = ("throughput_per_s", "cards_per_s", "designs_per_s", "succeeded", "sent_ok", "deleted")
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    out = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            out.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[path] = value
+    return out
+
+def compare(base: dict, new: dict) -> list:
+    a, b = flatten(base.get("scenarios", {})), flatten(new.get("scenarios", {}))
+    rows = []
+    for key in sorted(set(a) | set(b)):
+        old, cur = a.get(key), b.get(key)
+        delta = None
+        if old not in (None, 0) and cur is not None:
+            delta = (cur - old) / old * 100
+        better = None
+        if delta is not None and delta != 0:
+            better = (delta > 0) == key.endswith(HIGHER_IS_BETTER)
+        rows.append((key, old, cur, delta, better))
+    return rows
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print("usage: python -m bench.compare BASE.json NEW.json")
+        return 2
+    with open(argv[0], encoding="utf-8") as f: base = json.load(f)
+    with open(argv[1], encoding="utf-8") as f: new = json.load(f)
+
+    print(f"{'metric':48} {'base':>12} {'new':>12} {'delta':>9}")
+    for key, old, cur, delta, better in compare(base, new):
+        mark = "" if better is None else (" ✅" if better else " ❌")
+        d = f"{delta:+.1f}%" if delta is not None else "-"
+        print(f"{key:48} {str(old):>12} {str(cur):>12} {d:>9}{mark}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import logging
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, text
+from src.database import engine, init_db
+from src.models import Base, BotUser, TelegramChannel, TelegramGroup, BroadcastLog
+
+logger = logging.getLogger("BenchFixtures")
+
+CHUNK = 5000
+
+async def _prepare_schema():
+    if engine.dialect.name == "sqlite":
+        # SQLite لا يدعم الترقيم التلقائي مع مفتاح مركّب، فننشئ بقية الجداول
+        # بدون broadcast_logs ثم ننشئ السجل بصيغة بسيطة
+        tables = [t for t in Base.metadata.sorted_tables if t.name != BroadcastLog.__tablename__]
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+            await conn.execute(text("DROP TABLE IF EXISTS broadcast_logs"))
+            await conn.execute(text(
+                "CREATE TABLE broadcast_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, source_msg_id BIGINT, "
+                "target_chat_id BIGINT, target_msg_id BIGINT, source_group_id BIGINT, sender_bot_id BIGINT, created_at DATETIME)"
+            ))
+            await conn.execute(text("CREATE INDEX ix_broadcast_logs_source_msg_id ON broadcast_logs (source_msg_id)"))
+            await conn.execute(text("CREATE INDEX ix_broadcast_logs_target_chat_id ON broadcast_logs (target_chat_id)"))
+    else:
+        await init_db()
+        from src.services.log_partitions import log_partitions
+        await log_partitions.maintain()
+
+async def generate(users: int, channels: int, groups: int, inactive_ratio: float = 0.05, seed: int = 42) -> dict:
+    """
+    تفريغ الجداول ثم إدخال بيانات وهمية بالأعداد المطلوبة.
+    المعرفات ثابتة لنفس البذرة (seed) حتى تكون النتائج قابلة للمقارنة.
+    """
+    await _prepare_schema()
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    async with engine.begin() as conn:
+        for model in (BroadcastLog, TelegramGroup, TelegramChannel, BotUser):
+            await conn.execute(delete(model))
+
+    async def bulk(model, rows):
+        for i in range(0, len(rows), CHUNK):
+            async with engine.begin() as conn:
+                await conn.execute(insert(model), rows[i:i + CHUNK])
+
+    await bulk(BotUser, [{
+        "user_id": 100_000 + i,
+        "first_name": f"user{i}",
+        "username": None,
+        "is_active": rng.random() >= inactive_ratio,
+        "joined_at": now - timedelta(days=rng.randint(0, 720)),
+    } for i in range(users)])
+
+    def chats(base, n):
+        return [{
+            "chat_id": -(base + i),
+            "title": f"chat{i}",
+            "added_by_id": 100_000 + rng.randrange(users) if users else None,
+            "is_active": rng.random() >= inactive_ratio,
+            "joined_at": now - timedelta(days=rng.randint(0, 720)),
+        } for i in range(n)]
+
+    await bulk(TelegramChannel, chats(1_000_000_000_000, channels))
+    await bulk(TelegramGroup, chats(2_000_000_000_000, groups))
+
+    logger.info(f"🧪 Fixtures ready: {users} users, {channels} channels, {groups} groups")
+    return {"users": users, "channels": channels, "groups": groups, "inactive_ratio": inactive_ratio, "seed": seed}
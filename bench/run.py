@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+logger = logging.getLogger("Bench")
+
+SOURCE_MSG_ID = 777
+SAMPLE_TEXTS = [
+    "وما نيلُ المطالبِ بالتمني\nولكن تؤخذُ الدنيا غِلابا",
+    "إذا غامرتَ في شرفٍ مرومِ\nفلا تقنع بما دون النجومِ",
+    "أنا الذي نظرَ الأعمى إلى أدبي\nوأسمعت كلماتي من به صممُ",
+    "قفا نبكِ من ذكرى حبيبٍ ومنزلِ",
+]
+
+def percentiles(values) -> dict:
+    if not values: return {"n": 0}
+    data = sorted(values)
+    pick = lambda q: data[min(len(data) - 1, int(q * len(data)))]
+    return {
+        "n": len(data),
+        "mean": round(statistics.fmean(data), 6),
+        "p50": round(pick(0.50), 6),
+        "p90": round(pick(0.90), 6),
+        "p95": round(pick(0.95), 6),
+        "p99": round(pick(0.99), 6),
+        "max": round(data[-1], 6),
+    }
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Broadcast / render benchmarks against local stubs")
+    p.add_argument("--scenarios", default="broadcast,delete,design,render,backup")
+    p.add_argument("--users", type=int, default=5000)
+    p.add_argument("--channels", type=int, default=100)
+    p.add_argument("--groups", type=int, default=200)
+    p.add_argument("--inactive", type=float, default=0.05)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--latency", type=float, default=0.05, help="Stub Bot API mean latency (s)")
+    p.add_argument("--jitter", type=float, default=0.02)
+    p.add_argument("--retry-after-rate", type=float, default=0.0)
+    p.add_argument("--forbidden-rate", type=float, default=0.01)
+    p.add_argument("--token-rate", type=float, default=0.0, help="Stub per-token msg/s limit (0 = none)")
+    p.add_argument("--helpers", type=int, default=0, help="Helper bot tokens in the broadcast pool")
+    p.add_argument("--design-latency", type=float, default=1.5, help="Stub fal/HF latency (s)")
+    p.add_argument("--render-count", type=int, default=5)
+    p.add_argument("--design-count", type=int, default=30, help="Concurrent fal designs in the design scenario")
+    p.add_argument("--db-url", default="sqlite+aiosqlite:///bench.db")
+    p.add_argument("--redis-url", default="redis://localhost:6379/15")
+    p.add_argument("--skip-fixtures", action="store_true")
+    p.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    return p.parse_args(argv)
+
+def configure_env(args):
+    """يجب ضبط البيئة قبل استيراد src.config"""
+    os.environ["DATABASE_URL"] = args.db_url
+    os.environ["REDIS_URL"] = args.redis_url
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+    os.environ.setdefault("ADMIN_ID", "1")
+    os.environ["MASTER_SOURCE_ID"] = "-1001"
+    os.environ.setdefault("FAL_KEY", "bench")
+    os.environ["METRICS_PORT"] = "0"
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def make_timed_bot(token, base_url):
+    from telegram import Bot
+
+    class TimedBot(Bot):
+        """يسجّل زمن كل طلب حسب اسم الدالة (من جهة العميل)"""
+        latencies = {}
+
+        async def _post(self, endpoint, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await super()._post(endpoint, *args, **kwargs)
+            finally:
+                self.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+
+    return TimedBot(token, base_url=base_url)
+
+# --- السيناريوهات ---
+
+async def scenario_broadcast(ctx) -> dict:
+    from src.services import metrics
+    bot, stub, forwarder = ctx["bot"], ctx["bot_stub"], ctx["forwarder"]
+    bot.latencies.clear()
+    before = {r: metrics.BROADCAST_SENDS.value(result=r) for r in ("ok", "forbidden", "bad_request", "error")}
+    retry_before = metrics.BROADCAST_RETRY_AFTER.value()
+
+    start = time.perf_counter()
+    await forwarder.broadcast_message(bot, SOURCE_MSG_ID)
+    elapsed = time.perf_counter() - start
+
+    results = {r: metrics.BROADCAST_SENDS.value(result=r) - v for r, v in before.items()}
+    return {
+        "duration_s": round(elapsed, 3),
+        "sent_ok": results["ok"],
+        "failed": results["forbidden"] + results["bad_request"] + results["error"],
+        "retry_after": metrics.BROADCAST_RETRY_AFTER.value() - retry_before,
+        "api_calls": stub.calls.get("copyMessage", 0),
+        "throughput_per_s": round(results["ok"] / elapsed, 2) if elapsed else None,
+        "copy_latency_s": percentiles(bot.latencies.get("copyMessage", [])),
+        "calls_by_token": dict(stub.by_token),
+    }
+
+async def scenario_delete(ctx) -> dict:
+    bot, forwarder = ctx["bot"], ctx["forwarder"]
+    bot.latencies.clear()
+    start = time.perf_counter()
+    await forwarder.delete_broadcast(bot, SOURCE_MSG_ID)
+    elapsed = time.perf_counter() - start
+    deleted = len(bot.latencies.get("deleteMessage", []))
+    return {
+        "duration_s": round(elapsed, 3),
+        "deleted": deleted,
+        "throughput_per_s": round(deleted / elapsed, 2) if elapsed else None,
+        "delete_latency_s": percentiles(bot.latencies.get("deleteMessage", [])),
+    }
+
+async def scenario_design(ctx) -> dict:
+    """N تصاميم متزامنة عبر fal queue الوهمي (يقيس التوازي دون Threads)"""
+    from src.services.fal_design import FalDesignService
+    designer = FalDesignService()
+    count = ctx["args"].design_count
+
+    async def one(i):
+        t0 = time.perf_counter()
+        result = await designer.generate_background_b64(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)])
+        return time.perf_counter() - t0, bool(result)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    return {
+        "duration_s": round(elapsed, 3),
+        "designs": count,
+        "succeeded": sum(ok for _, ok in results),
+        "designs_per_s": round(count / elapsed, 3) if elapsed else None,
+        "design_latency_s": percentiles([t for t, _ in results]),
+    }
+
+async def scenario_render(ctx) -> dict:
+    try:
+        from src.services.image_gen import ImageGenerator
+    except ImportError as e:
+        return {"skipped": f"renderer unavailable: {e}"}
+
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{ctx['design_url']}/images/canned.jpg") as resp:
+            bg_data = "data:image/jpeg;base64," + base64.b64encode(await resp.read()).decode()
+
+    image_gen = ImageGenerator()
+    timings = []
+    start = time.perf_counter()
+    for i in range(ctx["args"].render_count):
+        t0 = time.perf_counter()
+        await image_gen.render(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)], 900_000 + i, bg_data)
+        timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {
+        "duration_s": round(elapsed, 3),
+        "cards": len(timings),
+        "cards_per_s": round(len(timings) / elapsed, 3) if elapsed else None,
+        "render_latency_s": percentiles(timings),
+    }
+
+async def scenario_backup(ctx) -> dict:
+    from src.services.backup_service import BackupService
+    service = BackupService()
+
+    t0 = time.perf_counter()
+    path = await service.create_backup()
+    create_s = time.perf_counter() - t0
+    size = os.path.getsize(path)
+
+    t0 = time.perf_counter()
+    await service.restore_backup(path)
+    restore_s = time.perf_counter() - t0
+    os.remove(path)
+    return {"create_s": round(create_s, 3), "restore_s": round(restore_s, 3), "file_bytes": size}
+
+SCENARIOS = {
+    "broadcast": scenario_broadcast,
+    "delete": scenario_delete,
+    "design": scenario_design,
+    "render": scenario_render,
+    "backup": scenario_backup,
+}
+
+async def run(args) -> dict:
+    configure_env(args)
+    from bench.stub_bot_api import StubBotAPI
+    from bench.stub_design_api import StubDesignAPI
+    from bench import fixtures
+    from src.config import settings
+    from src.services.forwarder import ForwarderService
+
+    design_stub = StubDesignAPI(latency=args.design_latency)
+    design_url = await design_stub.start()
+    # توجيه عميل fal إلى الخادم الوهمي
+    from src.services.fal_queue import fal_queue
+    fal_queue.base_url = design_url
+
+    bot_stub = StubBotAPI(latency=args.latency, jitter=args.jitter, retry_after_rate=args.retry_after_rate,
+                          forbidden_rate=args.forbidden_rate, seed=args.seed, token_rate=args.token_rate)
+    bot_url = await bot_stub.start()
+
+    fixture_meta = None
+    if not args.skip_fixtures:
+        fixture_meta = await fixtures.generate(args.users, args.channels, args.groups, args.inactive, args.seed)
+
+    bot = make_timed_bot(settings.BOT_TOKEN, bot_url)
+    await bot.initialize()
+    forwarder = ForwarderService()
+    if args.helpers:
+        # توكنات وهمية: الخادم الوهمي يقبل أي توكن ويطبق حد token_rate على كل واحد
+        from src.services.bot_pool import BotPool
+        tokens = [f"{900000 + i}:HELPER" for i in range(args.helpers)]
+        forwarder.pool = BotPool(bot, tokens, settings.BOT_RATE_PER_SECOND, base_url=bot_url)
+        await forwarder.pool.start()
+    ctx = {"args": args, "bot": bot, "bot_stub": bot_stub, "design_url": design_url, "forwarder": forwarder}
+
+    results = {}
+    try:
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            logger.info(f"🏁 Scenario: {name}")
+            results[name] = await SCENARIOS[name](ctx)
+    finally:
+        if forwarder.pool: await forwarder.pool.stop()
+        await bot.shutdown()
+        await fal_queue.close()
+        await bot_stub.stop()
+        await design_stub.stop()
+
+    return {
+        "meta": {
+            "date": datetime.utcnow().isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "db": args.db_url.split("://", 1)[0],
+            "fixtures": fixture_meta,
+            "stub": {"latency": args.latency, "jitter": args.jitter, "retry_after_rate": args.retry_after_rate,
+                     "forbidden_rate": args.forbidden_rate, "design_latency": args.design_latency,
+                     "token_rate": args.token_rate, "helpers": args.helpers},
+        },
+        "scenarios": results,
+    }
+
+def main(argv=None):
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    args = parse_args(argv)
+    output = json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+        logger.info(f"📄 Results written to {args.out}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import random
+import time
+from aiohttp import web
+
+class StubBotAPI:
+    """
+    خادم Bot API وهمي: يستقبل /bot<token>/<method> ويرد كما يرد تيليجرام.
+    - latency: متوسط زمن الاستجابة (ثوانٍ) مع تذبذب jitter
+    - retry_after_rate: نسبة الطلبات التي ترد بـ 429
+    - forbidden_rate: نسبة المحادثات "المحظورة" (ثابتة لكل chat_id)
+    - token_rate: حد الرسائل/ثانية لكل توكن (مثل حد تيليجرام العام)، 0 = بلا حد
+    """
+    def __init__(self, latency=0.05, jitter=0.02, retry_after_rate=0.0, retry_after=1,
+                 forbidden_rate=0.0, seed=42, token_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.forbidden_rate = forbidden_rate
+        self.token_rate = token_rate
+        self._windows = {}       # token -> [بداية النافذة، عدد الطلبات]
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.calls = {}          # method -> عدد الاستدعاءات
+        self.by_token = {}       # token -> عدد الاستدعاءات
+        self._msg_id = 1000
+        self._runner = None
+        self.port = None
+
+    def _next_id(self) -> int:
+        self._msg_id += 1
+        return self._msg_id
+
+    def _is_forbidden(self, chat_id) -> bool:
+        if not self.forbidden_rate: return False
+        return random.Random(f"{self.seed}:{chat_id}").random() < self.forbidden_rate
+
+    def _message(self, chat_id, **extra) -> dict:
+        chat_id = int(chat_id)
+        return {
+            "message_id": self._next_id(),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            **extra,
+        }
+
+    async def _params(self, request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        data = await request.post()
+        return {k: v for k, v in data.items() if isinstance(v, str)}
+
+    async def handle(self, request):
+        token = request.match_info["token"]
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls[method] = self.calls.get(method, 0) + 1
+        self.by_token[token] = self.by_token.get(token, 0) + 1
+
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+        if method not in ("getMe", "getUpdates") and (self._over_rate(token) or self.rng.random() < self.retry_after_rate):
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            })
+
+        chat_id = params.get("chat_id")
+        if chat_id is not None and self._is_forbidden(chat_id):
+            return web.json_response({"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"})
+
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    def _over_rate(self, token) -> bool:
+        if not self.token_rate: return False
+        now = time.monotonic()
+        window = self._windows.setdefault(token, [now, 0])
+        if now - window[0] >= 1.0:
+            window[0], window[1] = now, 0
+        window[1] += 1
+        return window[1] > self.token_rate
+
+    def _result(self, method, params):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                    "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+        if method == "copyMessage":
+            return {"message_id": self._next_id()}
+        if method == "copyMessages":
+            ids = json.loads(params.get("message_ids", "[]")) if isinstance(params.get("message_ids"), str) else params.get("message_ids", [])
+            return [{"message_id": self._next_id()} for _ in ids]
+        if method == "sendMediaGroup":
+            media = params.get("media", "[]")
+            media = json.loads(media) if isinstance(media, str) else media
+            return [self._message(params["chat_id"], photo=[self._photo()]) for _ in media]
+        if method == "sendPhoto":
+            return self._message(params["chat_id"], photo=[self._photo()])
+        if method in ("sendMessage", "editMessageText"):
+            return self._message(params.get("chat_id", 0), text=params.get("text", ""))
+        if method == "editMessageCaption":
+            return self._message(params.get("chat_id", 0), caption=params.get("caption", ""))
+        # deleteMessage, sendChatAction, setMyCommands ...
+        return True
+
+    def _photo(self) -> dict:
+        uid = f"stub{self._next_id()}"
+        return {"file_id": uid, "file_unique_id": uid, "width": 1080, "height": 1440}
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}/bot"
+
+    async def stop(self):
+        if self._runner: await self._runner.cleanup()
@@ -0,0 +1,89 @@
+import asyncio
+import io
+import random
+import uuid
+from aiohttp import web
+from PIL import Image
+
+def canned_image(width=768, height=1024) -> bytes:
+    """صورة JPEG ثابتة (تدرج لوني) بحجم قريب من مخرجات Flux"""
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+class StubDesignAPI:
+    """
+    خادم وهمي يحاكي:
+    - fal queue API: POST /<endpoint> -> status_url / response_url / cancel_url
+    - Hugging Face Inference: POST /models/<model> -> بايتات الصورة
+    - /images/canned.jpg لتحميل الصورة
+    """
+    def __init__(self, latency=1.5, fail_rate=0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(7)
+        self.image = canned_image()
+        self.requests = {}   # request_id -> وقت الجاهزية
+        self.calls = 0
+        self._runner = None
+        self.base_url = None
+
+    async def fal_submit(self, request):
+        self.calls += 1
+        endpoint = request.match_info["endpoint"]
+        rid = uuid.uuid4().hex
+        self.requests[rid] = asyncio.get_running_loop().time() + self.latency
+        base = f"{self.base_url}/{endpoint}/requests/{rid}"
+        return web.json_response({
+            "request_id": rid,
+            "status_url": f"{base}/status",
+            "response_url": base,
+            "cancel_url": f"{base}/cancel",
+        })
+
+    async def fal_status(self, request):
+        ready_at = self.requests.get(request.match_info["rid"])
+        if ready_at is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        done = asyncio.get_running_loop().time() >= ready_at
+        return web.json_response({"status": "COMPLETED" if done else "IN_PROGRESS"}, status=200 if done else 202)
+
+    async def fal_result(self, request):
+        self.requests.pop(request.match_info["rid"], None)
+        if self.rng.random() < self.fail_rate:
+            return web.json_response({"detail": "stub failure"}, status=500)
+        return web.json_response({"images": [{"url": f"{self.base_url}/images/canned.jpg", "content_type": "image/jpeg"}]})
+
+    async def fal_cancel(self, request):
+        self.requests.pop(request.match_info["rid"], None)
+        return web.json_response({"status": "CANCELLATION_REQUESTED"}, status=202)
+
+    async def hf_infer(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.rng.random() < self.fail_rate:
+            return web.json_response({"error": "stub failure"}, status=503)
+        return web.Response(body=self.image, content_type="image/jpeg")
+
+    async def image(self, request):
+        return web.Response(body=self.image, content_type="image/jpeg")
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/images/canned.jpg", self.image)
+        app.router.add_post("/models/{model:.+}", self.hf_infer)
+        app.router.add_get("/{endpoint:.+}/requests/{rid}/status", self.fal_status)
+        app.router.add_put("/{endpoint:.+}/requests/{rid}/cancel", self.fal_cancel)
+        app.router.add_get("/{endpoint:.+}/requests/{rid}", self.fal_result)
+        app.router.add_post("/{endpoint:.+}", self.fal_submit)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner: await self._runner.cleanup()
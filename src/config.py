@@ -11,6 +11,10 @@ class Settings(BaseSettings):
     
     # ✅ مفتاح Fal.ai (إلزامي الآن)
     FAL_KEY: str
+    FAL_QUEUE_URL: str = "https://queue.fal.run"
+    FAL_POLL_INTERVAL: float = 0.5        # أول فترة استطلاع (تتضاعف تدريجياً)
+    FAL_POLL_MAX_INTERVAL: float = 2.0
+    FAL_TIMEOUT: float = 180.0
     # مفتاح Hugging Face (المجاني)
     HUGGINGFACE_TOKEN: Optional[str] = None
 
@@ -19,6 +23,105 @@ class Settings(BaseSettings):
     CHANNEL_HANDLE: str = "@Rwaea3"
     CHANNEL_LINK: str = "https://t.me/Rwaea3"
 
+    # سجل البث (أقسام يومية)
+    BROADCAST_LOG_RETENTION_DAYS: int = 14   # بعدها يُحذف القسم كاملاً (لا حاجة لـ /del)
+    BROADCAST_LOG_PREMAKE_DAYS: int = 3      # عدد الأقسام المستقبلية الجاهزة مسبقاً
+
+    # ذاكرة المستخدمين (تقليل استعلامات /start و my_chat_member)
+    USER_CACHE_SIZE: int = 50000
+    USER_BATCH_WINDOW: float = 0.2           # ثوانٍ لتجميع المستخدمين الجدد
+    USER_BATCH_MAX: int = 200
+
+    # المقاييس (Prometheus) - المنفذ 0 يعطّل الخادم
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9108
+
+    # تتبع مراحل المنشور (/trace)
+    TRACE_TTL: int = 86400
+
+    # تعديل منشور في القناة المصدر: "propagate" (تعديل النسخ الموزعة) أو "ignore"
+    EDIT_MODE: str = "propagate"
+
+    # خط المعالجة (تصميم -> نشر) بطوابير مستقلة
+    DESIGN_QUEUE_SIZE: int = 20
+    DESIGN_WORKERS: int = 2
+    PUBLISH_QUEUE_SIZE: int = 100
+    PUBLISH_WORKERS: int = 1
+
+    # موجّه مزودي التصميم (الترتيب = أولوية الجودة عند غياب القياسات)
+    DESIGN_PROVIDERS: str = "fal,hf_flux,hf_sdxl"
+    DESIGN_TIMEOUT: float = 45.0
+    PRO_DESIGN_TIMEOUT: float = 120.0
+    DESIGN_HEDGE: bool = True
+    DESIGN_STATS_WINDOW: int = 50
+    DESIGN_MIN_SAMPLES: int = 5
+    DESIGN_CB_THRESHOLD: int = 3          # إخفاقات متتالية قبل فتح الدائرة
+    DESIGN_CB_COOLDOWN: float = 300.0
+    # خلفيات محلية (NumPy) عند فشل كل المزودين؛ ويمكن إضافة "procedural" لـ DESIGN_PROVIDERS كطبقة اقتصادية بلا شبكة
+    PROCEDURAL_FALLBACK: bool = True
+    PROCEDURAL_CACHE_SIZE: int = 64
+
+    # ترميز الصور قبل الرفع (تيليجرام يعيد الضغط على أي حال)
+    IMAGE_FORMAT: str = "jpeg"            # jpeg أو webp
+    IMAGE_MAX_BYTES: int = 450_000
+    IMAGE_MAX_SIDE: int = 1440
+    IMAGE_MIN_QUALITY: int = 70
+    IMAGE_MAX_QUALITY: int = 90
+    IMAGE_PROGRESSIVE: bool = True
+    # الصور تبقى في الذاكرة حتى الرفع؛ مجلد اختياري لحفظ نسخة منها للتشخيص (فارغ = معطل)
+    DEBUG_SPILL_DIR: str = ""
+
+    # السلاسل (رسم جماعي ونشر مجدول)
+    BATCH_RENDER_CONCURRENCY: int = 4
+    BATCH_MAX_ENTRIES: int = 50
+    BATCH_INTERVAL_MINUTES: int = 60
+
+    # الجدولة الدائمة (تباعد البث الكبير)
+    SCHEDULE_SEND_RATE: float = 25.0      # رسالة/ثانية متوقعة لتقدير مدة البث
+    SCHEDULE_MARGIN_SECONDS: int = 120
+    SCHEDULE_TZ_OFFSET_HOURS: int = 0     # لتفسير أوقات /at (مثلاً 3 لتوقيت مكة)
+    HOLD_TTL_HOURS: int = 72              # مدة بقاء المنشور المعلّق (#hold) بانتظار /at أو /to
+
+    # لقطة المستلمين في الذاكرة (البث الكامل بدون استعلامات)
+    RECIPIENT_SNAPSHOT_FLUSH_SECONDS: float = 2.0   # تجميع التحديثات قبل حفظها في Redis
+    RECIPIENT_SNAPSHOT_MAX_AGE_HOURS: int = 24      # بعدها تُعاد بناؤها من قاعدة البيانات
+
+    # اتصالات Bot API: مجمع خاص بالبث منفصل عن المعالجات وعن getUpdates
+    BROADCAST_POOL_SIZE: int = 64
+    BROADCAST_HTTP2: bool = False             # يحتاج حزمة h2
+    BROADCAST_BATCH_SIZE: int = 20            # رسائل متزامنة في كل دفعة
+    BROADCAST_BATCH_PAUSE: float = 0.1        # ثوانٍ بين الدفعات
+    BOT_POOL_SIZE: int = 256                  # للمعالجات والردود العادية (حجم PTB الافتراضي؛ التصغير يقيد التزامن)
+    BOT_CONNECT_TIMEOUT: float = 5.0
+    BOT_READ_TIMEOUT: float = 15.0
+    BOT_WRITE_TIMEOUT: float = 30.0           # رفع الصور
+    BOT_POOL_TIMEOUT: float = 10.0
+
+    # بوتات مساعدة لتوزيع القنوات والمجموعات (توكنات مفصولة بفواصل، يجب أن تكون أعضاء فيها وفي القناة المصدر)
+    HELPER_BOT_TOKENS: str = ""
+    BOT_RATE_PER_SECOND: float = 25.0         # حد الإرسال لكل توكن (حد تيليجرام ~30)
+
+    # الألبومات: انتظار وصول كل العناصر قبل التوزيع (ثوانٍ بعد آخر عنصر)
+    ALBUM_WINDOW_SECONDS: float = 1.5
+
+    # صحة المحادثات (إخفاقات متتالية غير Forbidden: مهلة، BadRequest...)
+    HEALTH_DEFER_AFTER: int = 2               # تُرسل في نهاية البث بعد المستلمين السليمين
+    HEALTH_PROBE_AFTER: int = 5               # بعدها تُفحص بمعدل منخفض فقط
+    HEALTH_PROBE_BASE_SECONDS: int = 600      # فترة الفحص الأولى (تتضاعف مع كل إخفاق)
+    HEALTH_PROBE_MAX_SECONDS: int = 86400
+    HEALTH_DEACTIVATE_AFTER: int = 12         # بعدها تُعطّل المحادثة نهائياً
+
+    # الخدمات تُحمّل عند أول استخدام؛ هذه تُجهَّز في الخلفية بعد التشغيل (مثال: "image_gen,design_router")
+    SERVICES_WARMUP: str = ""
+
+    # إعادة تحميل messages.yaml عند تعديله (ثوانٍ بين الفحوص، 0 يعطّل)
+    CONTENT_RELOAD_INTERVAL: float = 5.0
+
+    # فلتر رسائل المجموعات (filters.yaml): حذف الإعلانات والروابط الغريبة (اختياري: البوت لا يحذف شيئاً افتراضياً)
+    FILTER_ENABLED: bool = False
+    FILTER_CACHE_SIZE: int = 4096          # أحكام محفوظة حسب بصمة الرسالة
+    FILTER_ADMIN_CACHE_SECONDS: int = 600  # مدة حفظ قائمة مشرفي كل مجموعة
+
     class Config:
         env_file = ".env"
 
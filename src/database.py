@@ -1,10 +1,12 @@
 import logging
 import sys
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from src.config import settings
 from src.models import Base
+from src.services.metrics import instrument_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("DB_Engine")
@@ -19,13 +21,17 @@ if not db_url:
 if db_url.startswith("postgres://"):
     db_url = db_url.replace("postgres://", "postgresql+asyncpg://", 1)
 
-logger.info(f"🔌 Database Configured: PostgreSQL")
-
 # ✅ الإعدادات الصحيحة والدقيقة لـ Supabase Transaction Pooler
 # نستخدم المفتاح "statement_cache_size" فقط، وهو ما تفهمه مكتبة asyncpg
-connect_args = {
-    "statement_cache_size": 0
-}
+# (SQLite مدعوم فقط لبيئة القياس bench/)
+if db_url.startswith("sqlite"):
+    logger.info("🔌 Database Configured: SQLite")
+    connect_args = {}
+else:
+    logger.info(f"🔌 Database Configured: PostgreSQL")
+    connect_args = {
+        "statement_cache_size": 0
+    }
 
 engine = create_async_engine(
     db_url,
@@ -36,10 +42,45 @@ engine = create_async_engine(
 
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# قياس زمن الاستعلامات وعدد الجلسات
+instrument_engine(engine)
+
+async def _detach_legacy_logs(conn):
+    """
+    إذا كان broadcast_logs جدولاً عادياً (من النسخ السابقة) نعيد تسميته
+    ليُنشأ الجدول المقسّم مكانه، ثم تنقل LogPartitionService السجلات الحديثة منه.
+    """
+    relkind = await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('broadcast_logs')"))
+    if relkind != "r": return
+
+    logger.info("🔁 Migrating broadcast_logs to a partitioned table...")
+    await conn.execute(text("ALTER TABLE broadcast_logs RENAME TO broadcast_logs_legacy"))
+    await conn.execute(text("ALTER TABLE broadcast_logs_legacy RENAME CONSTRAINT broadcast_logs_pkey TO broadcast_logs_legacy_pkey"))
+    await conn.execute(text("ALTER INDEX IF EXISTS ix_broadcast_logs_source_msg_id RENAME TO ix_broadcast_logs_legacy_source_msg_id"))
+    await conn.execute(text("ALTER INDEX IF EXISTS ix_broadcast_logs_target_chat_id RENAME TO ix_broadcast_logs_legacy_target_chat_id"))
+    await conn.execute(text("ALTER SEQUENCE IF EXISTS broadcast_logs_id_seq RENAME TO broadcast_logs_legacy_id_seq"))
+
+# أعمدة أضيفت لجداول موجودة (create_all لا يعدّل الجداول القائمة)
+_COLUMN_PATCHES = [
+    "ALTER TABLE bot_users ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP WITHOUT TIME ZONE",
+    "CREATE INDEX IF NOT EXISTS ix_bot_users_last_seen_at ON bot_users (last_seen_at)",
+    "ALTER TABLE broadcast_logs ADD COLUMN IF NOT EXISTS source_group_id BIGINT",
+    "CREATE INDEX IF NOT EXISTS ix_broadcast_logs_source_group_id ON broadcast_logs (source_group_id)",
+    "ALTER TABLE broadcast_logs ADD COLUMN IF NOT EXISTS sender_bot_id BIGINT",
+]
+
+async def _patch_columns(conn):
+    for statement in _COLUMN_PATCHES:
+        await conn.execute(text(statement))
+
 async def init_db():
     try:
         async with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                await _detach_legacy_logs(conn)
             await conn.run_sync(Base.metadata.create_all)
+            if conn.dialect.name == "postgresql":
+                await _patch_columns(conn)
         logger.info("✅ Database Tables Verified.")
     except Exception as e:
         logger.critical(f"❌ Database Error: {e}")
@@ -1,6 +1,7 @@
 #--- START OF FILE telegram_broadcast_bot-main/src/handlers/admin.py ---
 
 import os
+import time
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
@@ -10,9 +11,22 @@ from src.models import BotUser, TelegramChannel, TelegramGroup
 from src.config import settings
 from src.services.content_manager import content
 from src.services.backup_service import BackupService
+from src.services.metrics import registry
+from src.services.tracing import tracer
+from src.services.batch_publisher import BatchPublisher
+from src.services.segments import Segment, add_tag, remove_tag, tag_counts
+from src.services.recipients import recipients
+from src.services.user_cache import user_cache
+from src.services.chat_health import chat_health
+from src.services.container import services
+from src.handlers.channel import scheduler
+from src.utils.helpers import split_text
 
 # تهيئة خدمة النسخ الاحتياطي
 backup_service = BackupService()
+services.register("batch_publisher", lambda: BatchPublisher(
+    services.image_gen, services.design_router, services.mood_classifier.classify_many, scheduler
+))
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """عرض إحصائيات النظام"""
@@ -26,6 +40,156 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = content.get("admin.stats_report", users=u, channels=c, groups=g, total=u+c+g)
     await update.message.reply_text(msg, parse_mode=ParseMode.MARKDOWN)
 
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """ملخص مقاييس الأداء (زمن التصميم، سرعة البث، RetryAfter...)"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    # الموجّهات تُعرض فقط إن حُمّلت (لا نحمّل مزودي التصميم لأجل التقرير)
+    sections = [registry.summary()]
+    sections += [services.get(name).describe() for name in ("design_router", "pro_router") if services.loaded(name)]
+    sections.append(await chat_health.summary())
+    sections.append(services.describe())
+    report = "📈 مقاييس الأداء منذ التشغيل\n──────────────\n" + "\n──────────────\n".join(sections)
+    # سلسلة لكل تسمية (transport × method ...): التقرير يتجاوز حد الرسالة بعد فترة تشغيل
+    for chunk in split_text(report):
+        await update.message.reply_text(chunk)
+
+async def trace_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /trace <msg_id>          -> الجدول الزمني لمراحل المنشور
+    /trace <msg_id> profile  -> ملف Profiling (إن وُجد)
+    """
+    if update.effective_user.id != settings.ADMIN_ID: return
+    if not context.args or not context.args[0].lstrip("-").isdigit():
+        await update.message.reply_text("الاستخدام: `/trace <msg_id> [profile]`", parse_mode=ParseMode.MARKDOWN)
+        return
+
+    msg_id = int(context.args[0])
+    if len(context.args) > 1 and context.args[1].lower() == "profile":
+        report = await tracer.get_profile(msg_id)
+        if not report:
+            await update.message.reply_text("لا يوجد Profile لهذه الرسالة. استخدم /profile قبل النشر.")
+            return
+        await update.message.reply_document(document=report.encode("utf-8"), filename=f"profile_{msg_id}.txt")
+        return
+
+    spans = await tracer.get(msg_id)
+    await update.message.reply_text(f"```\n{tracer.format(msg_id, spans)}\n```", parse_mode=ParseMode.MARKDOWN)
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """تفعيل Profiling للمنشور القادم في القناة المصدر"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    await tracer.arm_profile()
+    await update.message.reply_text("🔬 سيتم تحليل المنشور القادم. استخدم `/trace <msg_id> profile` بعده.", parse_mode=ParseMode.MARKDOWN)
+
+async def batch_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    استقبال ملف سلسلة (txt / yaml) مع الوصف: batch [الفاصل بالدقائق]
+    يتم رسم كل البطاقات دفعة واحدة ثم نشرها تباعاً.
+    """
+    if update.effective_user.id != settings.ADMIN_ID: return
+    doc = update.message.document
+    caption = (update.message.caption or "").split()
+    if not caption or caption[0].lower() != "batch":
+        await update.message.reply_text("⚠️ لنشر سلسلة، أعد إرسال الملف واكتب `batch 60` في الوصف (الرقم = الفاصل بالدقائق).", parse_mode=ParseMode.MARKDOWN)
+        return
+
+    interval = int(caption[1]) if len(caption) > 1 and caption[1].isdigit() else settings.BATCH_INTERVAL_MINUTES
+    file = await doc.get_file()
+    texts = BatchPublisher.parse(doc.file_name, bytes(await file.download_as_bytearray()))
+    if not texts:
+        await update.message.reply_text("⚠️ الملف لا يحتوي على نصوص.")
+        return
+
+    status_msg = await update.message.reply_text(f"🎨 جاري تجهيز {len(texts)} بطاقة...")
+
+    async def progress(text):
+        try: await status_msg.edit_text(text)
+        except Exception: pass
+
+    try:
+        batch_publisher = services.batch_publisher
+        staged = await batch_publisher.prepare(context.bot, texts, progress)
+        posts = await batch_publisher.schedule(context.job_queue, staged, interval)
+        first = f"{posts[0].run_at:%Y-%m-%d %H:%M} UTC" if posts else "-"
+        await status_msg.edit_text(f"✅ تم تجهيز {len(staged)}/{len(texts)} بطاقة.\n⏰ النشر كل {interval} دقيقة تقريباً، أولها: {first}\n📋 /queue لعرض الطابور.")
+    except Exception as e:
+        await status_msg.edit_text(f"❌ فشل تجهيز السلسلة: {e}")
+
+async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """عرض المنشورات المجدولة"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    posts = await scheduler.pending()
+    if not posts:
+        await update.message.reply_text("📭 لا توجد منشورات مجدولة.")
+        return
+    lines = [f"#{p.id}  {p.run_at:%m-%d %H:%M} UTC  {'🖼️ بطاقة' if p.photo_file_id else f'📨 رسالة {p.source_msg_id}'}" for p in posts[:30]]
+    more = f"\n… و{len(posts) - 30} أخرى" if len(posts) > 30 else ""
+    await update.message.reply_text("⏰ الطابور:\n" + "\n".join(lines) + more + "\n\nللإلغاء: /unqueue <id>")
+
+async def unqueue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """إلغاء منشور مجدول"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("الاستخدام: /unqueue <id>")
+        return
+    ok = await scheduler.cancel(context.job_queue, int(context.args[0]))
+    await update.message.reply_text("✅ تم الإلغاء." if ok else "⚠️ المنشور غير موجود أو نُشر مسبقاً.")
+
+def _parse_ids(args) -> list:
+    return [int(a) for a in args if a.lstrip("-").isdigit()]
+
+async def tag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/tag <وسم> <id> [id...] — بدون معرفات: عرض الوسوم الموجودة"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    if not context.args:
+        rows = await tag_counts()
+        lines = [f"• {tag}: {n}" for tag, n in rows[:40]] or ["لا توجد وسوم بعد."]
+        await update.message.reply_text("🏷️ الوسوم:\n" + "\n".join(lines))
+        return
+    tag, ids = context.args[0].lower(), _parse_ids(context.args[1:])
+    if not ids:
+        await update.message.reply_text("الاستخدام: /tag <وسم> <id> [id...]")
+        return
+    added = await add_tag(tag, ids)
+    await update.message.reply_text(f"🏷️ أضيف الوسم {tag} إلى {added} مستلم.")
+
+async def untag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/untag <وسم> <id> [id...]"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    ids = _parse_ids(context.args[1:]) if context.args else []
+    if not ids:
+        await update.message.reply_text("الاستخدام: /untag <وسم> <id> [id...]")
+        return
+    removed = await remove_tag(context.args[0].lower(), ids)
+    await update.message.reply_text(f"🏷️ أزيل الوسم من {removed} مستلم.")
+
+async def segment_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/segment <شروط> — معاينة حجم الشريحة قبل البث الموجّه (/to في القناة)"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    try:
+        segment = Segment(" ".join(context.args))
+    except ValueError as e:
+        await update.message.reply_text(f"⚠️ {e}")
+        return
+    counts = await segment.count()
+    lines = [f"• {label}: {n}" for label, n in counts.items()]
+    await update.message.reply_text(
+        f"🎯 الشريحة: {segment}\n" + "\n".join(lines) + f"\nالمجموع: {sum(counts.values())}"
+        "\n\nللإرسال: رد على المنشور في القناة بـ /to <شروط>"
+    )
+
+async def snapshot_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/snapshot — عرض لقطة المستلمين، /snapshot rebuild — إعادة بنائها من قاعدة البيانات"""
+    if update.effective_user.id != settings.ADMIN_ID: return
+    if context.args and context.args[0] == "rebuild":
+        await recipients.rebuild()
+    age = f"{(time.time() - recipients.built_at) / 60:.0f} دقيقة" if recipients.built_at else "-"
+    await update.message.reply_text(
+        f"📇 لقطة المستلمين\n"
+        f"👤 {recipients.count('users')} | 📢 {recipients.count('channels')} | 🏘️ {recipients.count('groups')}\n"
+        f"⏱️ عمر البناء: {age}\n\nلإعادة البناء: /snapshot rebuild"
+    )
+
 async def backup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """إنشاء نسخة احتياطية وإرسالها للمدير"""
     if update.effective_user.id != settings.ADMIN_ID: return
@@ -81,6 +245,9 @@ async def restore_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # 2. تنفيذ الاستعادة
         report = await backup_service.restore_backup(download_path)
+        user_cache.clear()
+        await recipients.rebuild()
+        await scheduler.reload(context.job_queue)
         
         # 3. إرسال التقرير
         await status_msg.edit_text(report)
@@ -1,38 +1,63 @@
 #--- start
+import json
 import logging
-import os
 from telegram import Update
 from telegram.ext import ContextTypes
 from src.config import settings
-from src.services.forwarder import ForwarderService
-from src.services.image_gen import ImageGenerator
-from src.services.fal_design import FalDesignService # الاقتصادي (خلفيات)
-from src.services.google_design import GoogleDesignService # الاحترافي (كامل)
+from src.services.container import services
+from src.services.scheduler import PostScheduler
+from src.services.album_buffer import AlbumBuffer
+from src.services.segments import Segment
+from src.services.tracing import tracer
+from src.services.pipeline import PostPipeline, PostJob
+from src.services.image_encoder import image_encoder
+from src.services.text_fit import TextOverflow
+from src.utils.helpers import card_caption, notify_admin
+from src.utils.images import photo_file
 
 logger = logging.getLogger(__name__)
 
-# تهيئة جميع الخدمات
-forwarder = ForwarderService()
-image_gen = ImageGenerator()
-fal_designer = FalDesignService()
-google_designer = GoogleDesignService()
-
 async def handle_source_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.channel_post or update.edited_channel_post
     if not message or message.chat.id != settings.MASTER_SOURCE_ID: return
 
+    # تتبع زمني لكل مرحلة (+ Profiling عند طلب المدير)
+    # إذا دخل المنشور خط المعالجة، يتوقف الـ Profiler بعد مرحلة النشر
+    profiler = await tracer.start_profile()
+    queued = False
+    try:
+        async with tracer.span(message.message_id, "handler"):
+            queued = await _route_source_post(message, context, profiler)
+    finally:
+        if not queued:
+            await tracer.stop_profile(profiler, message.message_id)
+
+async def _route_source_post(message, context: ContextTypes.DEFAULT_TYPE, profiler=None) -> bool:
+    """
+    يقرر مصير المنشور بسرعة ويضعه في الطابور المناسب.
+    يرجع True إذا دخل المنشور خط المعالجة.
+    """
+    trace_id = message.message_id
+
+    # --- التعديلات: لا نعيد النشر، بل نعدّل النسخ الموزعة ---
+    if message.edit_date:
+        return await _handle_edit(message, context, profiler)
+
     # --- 1. قفل التكرار (Deduplication Lock) ---
-    # نمنع معالجة نفس الرسالة مرتين خلال دقيقة
-    lock_key = f"processing_lock:{message.message_id}"
-    if await forwarder.redis.get(lock_key): return
-    await forwarder.redis.set(lock_key, "1", ex=60)
+    # نمنع معالجة نفس الرسالة مرتين خلال دقيقة (SET NX ذري: فائز واحد فقط)
+    async with tracer.span(trace_id, "lock"):
+        lock_key = f"processing_lock:{message.message_id}"
+        if not await services.forwarder.redis.set(lock_key, "1", ex=60, nx=True): return False
 
     # --- 2. كاسر الحلقة (Loop Breaker) ---
     # إذا كانت الرسالة تحتوي على توقيع البوت، نتجاهلها فوراً (لأنها من صنع البوت)
     # هذا يحل مشكلة تكرار النشر اللانهائي
     content_text = message.text or message.caption or ""
     if settings.CHANNEL_HANDLE in content_text:
-        return
+        return False
+
+    def job(kind, **kwargs):
+        return PostJob(kind=kind, message_id=trace_id, bot=context.bot, profiler=profiler, **kwargs)
 
     # ---------------------------------------------------------
     # 3. أوامر التحكم اليدوي (PRO / DELETE)
@@ -43,90 +68,282 @@ async def handle_source_post(update: Update, context: ContextTypes.DEFAULT_TYPE)
         # أ) حذف (/del)
         if command == "/del":
             logger.info("🗑️ Delete command received.")
-            await forwarder.delete_broadcast(context.bot, message.reply_to_message.message_id)
-            try: 
-                await message.reply_to_message.delete()
+            source_ids = await services.forwarder.delete_broadcast(context.bot, message.reply_to_message.message_id)
+            # الألبوم يُحذف كاملاً من القناة المصدر أيضاً (فشل ذلك لا يُبقي رسالة الأمر)
+            try:
+                await context.bot.delete_messages(message.chat.id, source_ids)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not delete source posts {source_ids}: {e}")
+            try:
                 await message.delete()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not delete /del command {message.message_id}: {e}")
+            return False
+
+        # ب) جدولة البث (/at 18:30 أو /at +2h) - للمنشورات المعلّقة (#hold)
+        if command.startswith("/at"):
+            run_at = PostScheduler.parse_when(command[3:])
+            if not run_at: return False
+            target = message.reply_to_message
+            held = await _take_held(target.message_id)
+            if held is None:
+                # المنشور غير المعلّق وُزّع عند وصوله (أو هو قيد التوزيع): جدولته تكرره على الجميع
+                await notify_admin(context.bot, f"⚠️ المنشور {target.message_id} ليس معلّقاً؛ لجدولة منشور ابدأه بـ {HOLD_MARKER}.")
+                return False
+            if _designable(held.get("text")):
+                # البطاقة تُصمم الآن، ومرحلة النشر تجدولها بدل بثها
+                design = PostJob(kind="design", message_id=target.message_id, bot=context.bot,
+                                 text=held["text"], run_at=run_at, cleanup=[message])
+                if pipeline.submit(design): return True
+            post = await scheduler.schedule(run_at, source_msg_id=target.message_id)
+            logger.info(f"⏰ Post {post.source_msg_id} scheduled at {post.run_at:%Y-%m-%d %H:%M} UTC")
+            try: await message.delete()
             except: pass
-            return
+            return False
+
+        # ج) بث موجّه لشريحة (/to lang:ar tag:vip) - للمنشورات المعلّقة (#hold) فقط
+        if command.startswith("/to "):
+            try:
+                segment = Segment(command[4:])
+            except ValueError as e:
+                logger.warning(f"🎯 Bad segment: {e}")
+                return False
+            target = message.reply_to_message
+            held = await _take_held(target.message_id)
+            if held is None:
+                # المنشور غير المعلّق وصل للجميع عند نشره: إرساله للشريحة يكرره عليها فقط
+                await notify_admin(context.bot, f"⚠️ المنشور {target.message_id} ليس معلّقاً؛ للبث الموجّه ابدأ المنشور بـ {HOLD_MARKER}.")
+                return False
+            if _designable(held.get("text")):
+                # النص يُصمم كبطاقة ثم تُوزع البطاقة على الشريحة
+                design = PostJob(kind="design", message_id=target.message_id, bot=context.bot,
+                                 text=held["text"], segment=segment, cleanup=[message])
+                if pipeline.submit(design): return True
+            return await _submit_publish(PostJob(kind="publish", message_id=target.message_id, bot=context.bot,
+                                                 publish_id=target.message_id, segment=segment, cleanup=[message]))
 
-        # ب) تصميم احترافي (/pro) - يستخدم Google Gemini 3
+        # د) تصميم احترافي (/pro) - يستخدم Google Gemini 3
         if command == "/pro":
             original_text = message.reply_to_message.text or message.reply_to_message.caption
-            if not original_text: return
+            if not original_text: return False
             
             logger.info("💎 Manual PRO trigger received.")
+            if not pipeline.submit(job("pro", text=original_text, cleanup=[message])):
+                # النص الأصلي وُزّع عند وصوله، فلا بديل للنشر هنا: نبلغ المدير ليعيد المحاولة
+                await notify_admin(context.bot, "⚠️ طابور التصميم ممتلئ: لم يُنفذ أمر /pro، أعد المحاولة بعد قليل.")
+                return False
             await context.bot.send_chat_action(chat_id=message.chat.id, action="upload_photo")
-            
-            # استدعاء المحرك الذكي (جوجل)
-            image_path = await google_designer.generate_pro_design(original_text, message.message_id)
-            
-            if image_path:
-                with open(image_path, 'rb') as f:
-                    sent = await context.bot.send_photo(
-                        chat_id=settings.MASTER_SOURCE_ID,
-                        photo=f,
-                        caption=f"✨ {settings.CHANNEL_HANDLE}"
-                    )
-                # نوزع النسخة الاحترافية
-                await forwarder.broadcast_message(context.bot, sent.message_id)
-                
-                # تنظيف
-                try: await message.delete() # نحذف الأمر /pro
-                except: pass
-                os.remove(image_path)
-            return
+            return True
 
     # ---------------------------------------------------------
     # 4. معالجة الوسائط الجاهزة (صور/فيديو)
     # ---------------------------------------------------------
     # إذا نشرت صورة أو فيديو، البوت يوزعها كما هي ولا يحاول تصميمها
     # هذا يحل مشكلة "تصميم الكاباتشا" أو الصور العشوائية
+    if message.media_group_id:
+        # عناصر الألبوم تُجمع ثم تُوزع معاً (طلب copyMessages واحد لكل مستلم)
+        albums.add(context.bot, message)
+        return False
+
+    # منشور معلّق (#hold): لا يُوزّع عند وصوله، بل عند /at (جدولة) أو /to (شريحة)
+    if _is_held(content_text):
+        await _hold(message, context.bot)
+        return False
+
     if message.photo or message.video or message.document:
         logger.info("📸 Media post detected. Broadcasting as is...")
-        await forwarder.broadcast_message(context.bot, message.message_id)
-        return
+        return await _submit_publish(job("publish", publish_id=message.message_id))
 
     # ---------------------------------------------------------
     # 5. النشر التلقائي (الاقتصادي - للنصوص فقط)
     # ---------------------------------------------------------
     text = message.text
-    if not text: return
+    if not text: return False
 
     # نتجاهل النصوص الطويلة جداً (أكثر من 400 حرف) لتجنب تشوه التصميم
-    if len(text) > 400:
-        await forwarder.broadcast_message(context.bot, message.message_id)
-        return
+    if not _designable(text):
+        return await _submit_publish(job("publish", publish_id=message.message_id))
+
+    if not pipeline.submit(job("design", text=text)):
+        # طابور التصميم ممتلئ: ننشر النص كما هو بدل إسقاطه
+        return await _submit_publish(job("publish", publish_id=message.message_id))
+    return True
+
+def _designable(text) -> bool:
+    return bool(text) and len(text) <= 400
+
+# ---------------------------------------------------------
+# المنشورات المعلّقة: أول سطر يبدأ بـ #hold
+# ---------------------------------------------------------
+HOLD_MARKER = "#hold"
+
+def _is_held(text: str) -> bool:
+    return text.lstrip().lower().startswith(HOLD_MARKER)
+
+async def _hold(message, bot):
+    """حفظ المنشور في held:{id} وحذف العلامة منه (حتى لا تظهر في النسخ الموزعة لاحقاً)"""
+    original = message.text or message.caption or ""
+    stripped = original.lstrip()[len(HOLD_MARKER):].strip()
+    try:
+        if message.text:
+            if not stripped: return
+            await bot.edit_message_text(chat_id=message.chat.id, message_id=message.message_id, text=stripped)
+        else:
+            await bot.edit_message_caption(chat_id=message.chat.id, message_id=message.message_id, caption=stripped or None)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not strip {HOLD_MARKER} from {message.message_id}: {e}")
+    held = {"text": stripped if message.text else None}
+    await services.forwarder.redis.set(f"held:{message.message_id}", json.dumps(held), ex=settings.HOLD_TTL_HOURS * 3600)
+    logger.info(f"⏸️ Post {message.message_id} held (waiting for /at or /to).")
+
+async def _take_held(message_id: int):
+    """يحرر المنشور المعلّق مرة واحدة فقط (GETDEL ذري). None إن لم يكن معلّقاً"""
+    raw = await services.forwarder.redis.getdel(f"held:{message_id}")
+    return json.loads(raw) if raw else None
+
+async def _submit_publish(job: PostJob) -> bool:
+    # طابور النشر كبير، ولا نسقط منشوراً أبداً: ننتظر مكاناً إذا لزم
+    if not pipeline.submit(job):
+        await pipeline.publish.put(job)
+    return True
+
+# ---------------------------------------------------------
+# مراحل خط المعالجة (تعمل خارج معالج التحديث)
+# ---------------------------------------------------------
+async def _design_stage(job: PostJob):
+    """ينتج البطاقة وينشرها في القناة المصدر، ثم يسلم رقمها لمرحلة النشر"""
+    trace_id = job.message_id
+    bot = job.bot
+
+    if job.kind == "pro":
+        # إذا لم تصل المهمة لمرحلة النشر (التي توقف الـ Profiler) نوقفه هنا، ونبلغ المدير
+        handed_off = False
+        try:
+            # استدعاء المحرك الذكي (جوجل)
+            async with tracer.span(trace_id, "design"):
+                image = await services.pro_router.generate(job.text, message_id=trace_id)
+            if not image:
+                await notify_admin(bot, f"⚠️ فشل تصميم /pro للمنشور {trace_id}: لم يرجع المحرك صورة.")
+                return None
+
+            async with tracer.span(trace_id, "upload"):
+                sent = await bot.send_photo(
+                    chat_id=settings.MASTER_SOURCE_ID,
+                    photo=photo_file(image, f"pro_{trace_id}.{image_encoder.extension}"),
+                    caption=f"✨ {settings.CHANNEL_HANDLE}"
+                )
+            await tracer.alias(sent.message_id, trace_id)
+            job.kind, job.publish_id = "publish", sent.message_id
+            handed_off = True
+            return job
+        except Exception as e:
+            logger.error(f"PRO Design Failed: {e}")
+            await notify_admin(bot, f"⚠️ فشل تصميم /pro للمنشور {trace_id}: {e}")
+            return None
+        finally:
+            if not handed_off:
+                await tracer.stop_profile(job.profiler, trace_id)
 
     logger.info("🎨 Starting Economy Design...")
+    text = job.text
     
     # أ) خلفية رخيصة (Flux Schnell)
-    bg_data = await fal_designer.generate_background_b64(text)
+    async with tracer.span(trace_id, "mood"):
+        mood = services.mood_classifier.classify(text)
+    async with tracer.span(trace_id, "background"):
+        bg_data = await services.design_router.generate(text, mood=mood)
     
     # ب) دمج بالكود (مجاني واحترافي)
     try:
-        image_path = await image_gen.render(text, message.message_id, bg_data)
+        async with tracer.span(trace_id, "render"):
+            image = await services.image_gen.render(text, trace_id, bg_data)
         
-        lines = [line for line in text.split('\n') if line.strip()]
-        excerpt = lines[0][:50] + "..." if lines else ""
-        caption = f"❝ {excerpt}\n\n💎 {settings.CHANNEL_HANDLE}"
+        caption = card_caption(text)
 
-        with open(image_path, 'rb') as f:
-            sent = await context.bot.send_photo(
+        async with tracer.span(trace_id, "upload"):
+            sent = await bot.send_photo(
                 chat_id=settings.MASTER_SOURCE_ID,
-                photo=f,
+                photo=photo_file(image, f"card_{trace_id}.{image_encoder.extension}"),
                 caption=caption
             )
+        await tracer.alias(sent.message_id, trace_id)
         
         # تسجيل الرسالة (مهم للحذف لاحقاً)
-        await forwarder.redis.set(f"bot_gen:{sent.message_id}", "1", ex=86400)
-        
-        # توزيع
-        await forwarder.broadcast_message(context.bot, sent.message_id)
-        
-        os.remove(image_path)
+        await services.forwarder.redis.set(f"bot_gen:{sent.message_id}", "1", ex=86400)
+        # ربط النص الأصلي بالبطاقة (لتجاهل تعديلات النص لاحقاً)
+        await services.forwarder.redis.set(f"design_of:{trace_id}", sent.message_id, ex=settings.BROADCAST_LOG_RETENTION_DAYS * 86400)
+        job.publish_id = sent.message_id
             
+    except TextOverflow as e:
+        # البطاقة مرفوضة (النص لا يتسع)، فننشر النص كما هو
+        logger.info(f"📝 Card rejected for {trace_id} ({e}), publishing the text as is.")
+        job.publish_id = trace_id
+
     except Exception as e:
         logger.error(f"Design Failed: {e}")
         # في حال الفشل، ننشر النص كما هو
-        await forwarder.broadcast_message(context.bot, message.message_id)
\ No newline at end of file
+        job.publish_id = trace_id
+
+    job.kind = "publish"
+    return job
+
+async def _publish_stage(job: PostJob):
+    """التوزيع على جميع المستلمين (أو نشر تعديل على النسخ الموجودة، أو جدولة منشور معلّق)"""
+    try:
+        if job.kind == "edit":
+            async with tracer.span(job.message_id, "edit"):
+                await services.forwarder.edit_broadcast(job.bot, job.message)
+            return
+        if job.run_at:
+            post = await scheduler.schedule(job.run_at, source_msg_id=job.publish_id)
+            logger.info(f"⏰ Card {post.source_msg_id} scheduled at {post.run_at:%Y-%m-%d %H:%M} UTC")
+        else:
+            try:
+                async with tracer.span(job.message_id, "broadcast"):
+                    await services.forwarder.broadcast_message(job.bot, job.publish_id, job.segment, job.album)
+            except Exception:
+                if job.scheduled_id: await scheduler.finish(job.scheduled_id, ok=False)
+                raise
+            if job.scheduled_id: await scheduler.finish(job.scheduled_id, ok=True)
+        for msg in job.cleanup:
+            try: await msg.delete() # مثل أمر /pro
+            except: pass
+    finally:
+        await tracer.stop_profile(job.profiler, job.message_id)
+
+pipeline = PostPipeline(_design_stage, _publish_stage)
+
+async def publish_card(bot, message_id: int, scheduled_id: int = None):
+    """توزيع بطاقة نشرها البوت بنفسه في القناة المصدر (سلاسل/جدولة)"""
+    await services.forwarder.redis.set(f"bot_gen:{message_id}", "1", ex=86400)
+    await _submit_publish(PostJob(kind="publish", message_id=message_id, bot=bot, publish_id=message_id,
+                                  scheduled_id=scheduled_id))
+
+async def _publish_album(bot, message_ids: list):
+    await _submit_publish(PostJob(kind="publish", message_id=message_ids[0], bot=bot,
+                                  publish_id=message_ids[0], album=message_ids))
+
+albums = AlbumBuffer(settings.ALBUM_WINDOW_SECONDS, _publish_album)
+
+scheduler = PostScheduler(publish_card)
+
+async def _handle_edit(message, context: ContextTypes.DEFAULT_TYPE, profiler=None) -> bool:
+    """نشر التعديل على النسخ الموجودة عبر BroadcastLog (في مرحلة النشر)"""
+    if settings.EDIT_MODE != "propagate": return False
+
+    # قفل لكل نسخة من التعديل (نفس التعديل قد يصل مرتين)
+    edit_ts = int(message.edit_date.timestamp())
+    if not await services.forwarder.redis.set(f"edit_lock:{message.message_id}:{edit_ts}", "1", ex=60, nx=True): return False
+
+    content_text = message.text or message.caption or ""
+    if settings.CHANNEL_HANDLE in content_text: return False
+
+    # تعديل حذف علامة #hold (أو تعديل منشور ما زال معلّقاً): لا نسخ لتعديلها
+    if await services.forwarder.redis.exists(f"held:{message.message_id}"): return False
+
+    # النص الذي تحول إلى بطاقة لا يمكن تعديله دون إعادة التصميم
+    if await services.forwarder.redis.get(f"design_of:{message.message_id}"):
+        logger.info(f"✏️ Edit of designed post {message.message_id} ignored (card already published).")
+        return False
+
+    return await _submit_publish(PostJob(kind="edit", message_id=message.message_id, bot=context.bot, message=message, profiler=profiler))
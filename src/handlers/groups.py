@@ -1,11 +1,18 @@
+import time
+import logging
 from telegram import Update, ChatMember
 from telegram.constants import ChatType
 from telegram.ext import ContextTypes
-from sqlalchemy import select, update
+from sqlalchemy import select, update as sa_update
 from src.database import AsyncSessionLocal
 from src.models import TelegramChannel, TelegramGroup
 from src.utils.helpers import ensure_user_exists, notify_admin
 from src.services.content_manager import content
+from src.services.recipients import recipients
+from src.services.container import services
+from src.config import settings
+
+logger = logging.getLogger(__name__)
 
 async def track_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     result = update.my_chat_member
@@ -13,6 +20,7 @@ async def track_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     new = result.new_chat_member
     chat = result.chat
     
+    added = None   # (النوع، المعرف) يُضاف للقطة المستلمين بعد الحفظ فقط
     async with AsyncSessionLocal() as session:
         if new.status in [ChatMember.MEMBER, ChatMember.ADMINISTRATOR]:
             owner_id = await ensure_user_exists(result.from_user, context.bot)
@@ -21,17 +29,62 @@ async def track_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 existing = await session.scalar(select(TelegramChannel).where(TelegramChannel.chat_id == chat.id))
                 if not existing:
                     session.add(TelegramChannel(chat_id=chat.id, title=chat.title, added_by_id=owner_id, is_active=True))
+                    added = ("channels", chat.id)
                     await notify_admin(context.bot, content.get("admin.new_channel", title=chat.title, by=result.from_user.first_name))
             else:
                 existing = await session.scalar(select(TelegramGroup).where(TelegramGroup.chat_id == chat.id))
                 if not existing:
                     session.add(TelegramGroup(chat_id=chat.id, title=chat.title, added_by_id=owner_id, is_active=True))
+                    added = ("groups", chat.id)
                     await notify_admin(context.bot, content.get("admin.new_group", title=chat.title, by=result.from_user.first_name))
                     try: await context.bot.send_message(chat.id, "🕊️ وصل الزاجل!")
                     except: pass
             await session.commit()
+            if added: recipients.add(*added)
         
         elif new.status in [ChatMember.LEFT, ChatMember.BANNED]:
             model = TelegramChannel if chat.type == ChatType.CHANNEL else TelegramGroup
-            await session.execute(update(model).where(model.chat_id == chat.id).values(is_active=False))
-            await session.commit()
\ No newline at end of file
+            await session.execute(sa_update(model).where(model.chat_id == chat.id).values(is_active=False))
+            await session.commit()
+            recipients.remove("channels" if model is TelegramChannel else "groups", chat.id)
+# ---------------------------------------------------------
+# الإشراف على رسائل المجموعات
+# ---------------------------------------------------------
+_group_info = {}   # chat_id -> (وقت الجلب, set(user_id للمشرفين), القناة المرتبطة)
+
+async def _group_trust(bot, chat_id: int):
+    """مشرفو المجموعة وقناة النقاش المرتبطة بها (محفوظة لمدة FILTER_ADMIN_CACHE_SECONDS)"""
+    cached = _group_info.get(chat_id)
+    if cached and time.monotonic() - cached[0] < settings.FILTER_ADMIN_CACHE_SECONDS:
+        return cached[1], cached[2]
+    try:
+        admins = {m.user.id for m in await bot.get_chat_administrators(chat_id)}
+        linked = (await bot.get_chat(chat_id)).linked_chat_id
+    except Exception as e:
+        logger.warning(f"⚠️ Could not fetch admins of {chat_id}: {e}")
+        admins, linked = (cached[1], cached[2]) if cached else (set(), None)
+    _group_info[chat_id] = (time.monotonic(), admins, linked)
+    return admins, linked
+
+async def moderate_group_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.effective_message
+    if not msg: return
+    chat = msg.chat
+
+    # المشرفون المجهولون يرسلون باسم المجموعة نفسها، وقناة النقاش تحوّل منشوراتها تلقائياً
+    if msg.sender_chat and msg.sender_chat.id == chat.id: return
+    if msg.is_automatic_forward: return
+
+    # الفحص أولاً (محلي وسريع)، ثم التحقق من المشرفين والقناة المرتبطة فقط عند الحاجة
+    reason = services.message_filter.check(msg)
+    if not reason: return
+    admins, linked = await _group_trust(context.bot, chat.id)
+    if msg.sender_chat and msg.sender_chat.id == linked: return
+    user = msg.from_user
+    if user and user.id in admins: return
+
+    try:
+        await msg.delete()
+        logger.info(f"🧹 Removed message in {chat.id} ({reason})")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not remove message in {chat.id}: {e}")
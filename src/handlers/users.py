@@ -1,4 +1,3 @@
-import os
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, constants
 from telegram.constants import ParseMode, ChatType
@@ -6,11 +5,13 @@ from telegram.ext import ContextTypes, CallbackQueryHandler
 from src.utils.helpers import ensure_user_exists
 from src.config import settings
 from src.services.content_manager import content
-from src.services.image_gen import ImageGenerator
+from src.services.container import services
+from src.services.image_encoder import image_encoder
+from src.services.text_fit import TextOverflow
+from src.utils.images import photo_file
 
 # إعداد السجل الخاص بهذا الملف
 logger = logging.getLogger(__name__)
-image_gen = ImageGenerator()
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -53,21 +54,23 @@ async def handle_private_design(update: Update, context: ContextTypes.DEFAULT_TY
     try:
         # محاولة التصميم
         logger.info(f"🎨 Starting private design for user {user.id}...")
-        image_path = await image_gen.render(text, update.message.message_id)
+        image = await services.image_gen.render(text, update.message.message_id)
         
         caption_text = content.get("art.caption", excerpt="إهداء خاص")
         
-        with open(image_path, 'rb') as f:
-            await update.message.reply_photo(
-                photo=f,
-                caption=caption_text,
-                reply_to_message_id=update.message.message_id
-            )
+        await update.message.reply_photo(
+            photo=photo_file(image, f"card_{update.message.message_id}.{image_encoder.extension}"),
+            caption=caption_text,
+            reply_to_message_id=update.message.message_id
+        )
         
         await status_msg.delete()
-        os.remove(image_path)
         logger.info(f"✅ Design success for user {user.id}")
 
+    except TextOverflow:
+        # النص لا يتسع للبطاقة بأي حجم خط: لا نرسل بطاقة مقصوصة
+        await status_msg.edit_text(content.get("art.error_too_long"))
+
     except Exception as e:
         # طباعة الخطأ كاملاً في السجل لنعرف السبب
         logger.error(f"❌ Private Design Failed for user {user.id}: {e}", exc_info=True)
@@ -1,5 +1,8 @@
 #--- START OF FILE telegram_broadcast_bot-main/src/main.py ---
 
+import time
+_BOOT = time.perf_counter()
+
 import logging
 import os
 from telegram import Update, BotCommand
@@ -7,18 +10,33 @@ from telegram.ext import Application, ChatMemberHandler, CommandHandler, Message
 from src.config import settings
 from src.database import init_db
 
-# استيراد المعالجات
+# استيراد المعالجات (الخدمات الثقيلة لا تُحمّل هنا، بل عند أول استخدام عبر services)
+_IMPORT_START = time.perf_counter()
 from src.handlers.users import start_command, handle_private_design, help_channel_callback
-from src.handlers.groups import track_chats
-from src.handlers.channel import handle_source_post
-from src.handlers.admin import stats_command, backup_command, restore_handler
+from src.handlers.groups import track_chats, moderate_group_message
+from src.handlers.channel import handle_source_post, pipeline, scheduler
+from src.handlers.admin import (
+    stats_command, metrics_command, trace_command, profile_command,
+    backup_command, restore_handler, batch_handler, queue_command, unqueue_command,
+    tag_command, untag_command, segment_command, snapshot_command
+)
 # استيراد خدمة النسخ لاستخدامها في الجدولة
 from src.services.backup_service import BackupService
+from src.services.log_partitions import log_partitions
+from src.services.metrics import MetricsServer
+from src.services.fal_queue import fal_queue
+from src.services.container import services
+from src.services.content_manager import content
+from src.services.recipients import recipients
+from src.services.bot_transport import build_request, build_polling_request
+_IMPORTS_DONE = time.perf_counter()
 
 # إعداد السجلات
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+metrics_server = MetricsServer(settings.METRICS_HOST, settings.METRICS_PORT)
+
 # --- وظيفة النسخ الاحتياطي الآلي ---
 async def scheduled_backup(context):
     """إرسال نسخة احتياطية للمدير تلقائياً"""
@@ -45,36 +63,124 @@ async def scheduled_backup(context):
     except Exception as e:
         logger.error(f"❌ Automated backup failed: {e}")
 
+# --- إعادة بناء لقطة المستلمين (تصحيح أي انحراف عن قاعدة البيانات) ---
+async def rebuild_recipients(context):
+    try:
+        await recipients.rebuild()
+    except Exception as e:
+        logger.error(f"❌ Recipient snapshot rebuild failed: {e}")
+
+# --- صيانة أقسام سجل البث ---
+async def maintain_log_partitions(context):
+    """إنشاء أقسام الأيام القادمة وحذف المنتهية"""
+    try:
+        await log_partitions.maintain()
+    except Exception as e:
+        logger.error(f"❌ Log partition maintenance failed: {e}")
+
+async def _timed(label: str, coro):
+    start = time.perf_counter()
+    result = await coro
+    logger.info(f"⏱️ {label}: {(time.perf_counter() - start) * 1000:.0f}ms")
+    return result
+
 async def post_init(app: Application):
     """تهيئة النظام عند البدء"""
-    await init_db()
+    await _timed("init_db", init_db())
+    # يجب أن توجد أقسام اليوم قبل أول بث
+    await _timed("log partitions", log_partitions.maintain())
+    # لقطة المستلمين (من Redis عادةً، أو بناء كامل)
+    await _timed("recipient snapshot", recipients.load())
+
+    if settings.METRICS_PORT:
+        await _timed("metrics server", metrics_server.start())
+
+    # التوزيع يستخدم مجمع اتصالات خاصاً به (لا يزاحم getUpdates ولا المعالجات)
+    services.forwarder.sender = await _timed("broadcast transport", services.aget("broadcast_bot"))
+    if settings.HELPER_BOT_TOKENS:
+        services.forwarder.pool = await _timed("helper bot pool", services.aget("bot_pool"))
+
+    # عمال التصميم والنشر (خارج معالجات التحديث)
+    await pipeline.start()
+
+    # نصوص الرسائل: تحميل مسبق + مراقبة التعديلات
+    content.get("welcome.header", name="")
+    content.start_watcher()
+
+    # استعادة المنشورات المجدولة بعد إعادة التشغيل
+    if app.job_queue:
+        await _timed("scheduled posts", scheduler.load(app.job_queue))
 
     await app.bot.set_my_commands([
         BotCommand("start", "تفعيل البوت / القائمة الرئيسية"),
         BotCommand("help", "المساعدة"),
         BotCommand("stats", "الإحصائيات (للمدير)"),
+        BotCommand("metrics", "مقاييس الأداء (للمدير)"),
+        BotCommand("trace", "تتبع مراحل منشور (للمدير)"),
+        BotCommand("queue", "المنشورات المجدولة (للمدير)"),
+        BotCommand("segment", "معاينة شريحة مستلمين (للمدير)"),
         BotCommand("backup", "نسخة احتياطية (للمدير)")
     ])
 
-    logger.info("🛡️ System Ready. All Modules Loaded Successfully.")
+    logger.info(f"🛡️ System Ready in {time.perf_counter() - _BOOT:.2f}s (services load on first use).")
+
+    # تجهيز مسبق اختياري في الخلفية (مثل image_gen) بعد أن يبدأ الاستقبال
+    warm = [name.strip() for name in settings.SERVICES_WARMUP.split(",") if name.strip()]
+    if warm:
+        app.create_task(services.warm(warm))
+
+async def post_shutdown(app: Application):
+    """إيقاف الخدمات الجانبية"""
+    await pipeline.stop()
+    await content.stop_watcher()
+    await services.shutdown()
+    await recipients.flush()
+    await fal_queue.close()
+    await metrics_server.stop()
 
 def main():
     """نقطة التشغيل المركزية"""
-    application = Application.builder().token(settings.BOT_TOKEN).post_init(post_init).build()
+    logger.info(f"⏱️ Imports: {(_IMPORTS_DONE - _IMPORT_START) * 1000:.0f}ms handlers, {(_IMPORTS_DONE - _BOOT) * 1000:.0f}ms total")
+    application = (
+        Application.builder()
+        .token(settings.BOT_TOKEN)
+        .request(build_request("handlers", settings.BOT_POOL_SIZE))
+        .get_updates_request(build_polling_request())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # 1. المعالجات العامة
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CallbackQueryHandler(help_channel_callback, pattern="how_to_channel"))
     application.add_handler(MessageHandler(filters.ChatType.PRIVATE & filters.TEXT & ~filters.COMMAND, handle_private_design))
     application.add_handler(ChatMemberHandler(track_chats, ChatMemberHandler.MY_CHAT_MEMBER))
+    if settings.FILTER_ENABLED:
+        application.add_handler(MessageHandler(filters.ChatType.GROUPS & ~filters.COMMAND, moderate_group_message))
 
     # 2. معالجات المدير
     application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("metrics", metrics_command))
+    application.add_handler(CommandHandler("trace", trace_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("queue", queue_command))
+    application.add_handler(CommandHandler("unqueue", unqueue_command))
+    application.add_handler(CommandHandler("tag", tag_command))
+    application.add_handler(CommandHandler("untag", untag_command))
+    application.add_handler(CommandHandler("segment", segment_command))
+    application.add_handler(CommandHandler("snapshot", snapshot_command))
     application.add_handler(CommandHandler("backup", backup_command))
     application.add_handler(MessageHandler(
         filters.Document.MimeType("application/json") & filters.User(settings.ADMIN_ID),
         restore_handler
     ))
+    application.add_handler(MessageHandler(
+        (filters.Document.FileExtension("txt") | filters.Document.FileExtension("yaml") | filters.Document.FileExtension("yml"))
+        & filters.User(settings.ADMIN_ID),
+        batch_handler,
+        block=False   # تجهيز السلسلة يستغرق دقائق: لا يوقف بقية التحديثات (منشورات القناة المصدر)
+    ))
 
     # 3. القناة المصدر
     application.add_handler(MessageHandler(
@@ -89,6 +195,13 @@ def main():
         application.job_queue.run_repeating(scheduled_backup, interval=21600, first=300)
         logger.info("⏰ Auto-Backup Job Started (Every 6 hours).")
 
+        # صيانة أقسام السجل كل 6 ساعات (الأقسام تُنشأ قبل موعدها بأيام)
+        application.job_queue.run_repeating(maintain_log_partitions, interval=21600, first=21600)
+
+        # إعادة بناء لقطة المستلمين قبل أن تصل لعمرها الأقصى
+        rebuild_every = settings.RECIPIENT_SNAPSHOT_MAX_AGE_HOURS * 1800
+        application.job_queue.run_repeating(rebuild_recipients, interval=rebuild_every, first=rebuild_every)
+
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@ class BotUser(Base):
     username: Mapped[str] = mapped_column(String, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True) # آخر تفاعل (يُحدّث مرة يومياً)
 
 class TelegramChannel(Base):
     __tablename__ = "channels"
@@ -30,11 +31,38 @@ class TelegramGroup(Base):
     joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 # --- الجدول الجديد: سجل الرسائل ---
+# الجدول مقسّم يومياً حسب created_at (Range Partitioning في PostgreSQL)
+# الأقسام تُنشأ وتُحذف آلياً عبر LogPartitionService حسب مدة الاحتفاظ
 class BroadcastLog(Base):
     __tablename__ = "broadcast_logs"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     source_msg_id: Mapped[int] = mapped_column(BigInteger, index=True) # رقم الرسالة في القناة الأم
     target_chat_id: Mapped[int] = mapped_column(BigInteger, index=True) # أين أرسلناها؟
     target_msg_id: Mapped[int] = mapped_column(BigInteger) # ما هو رقمها هناك؟
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    source_group_id: Mapped[int] = mapped_column(BigInteger, nullable=True, index=True) # أول عنصر في الألبوم (لحذفه كاملاً)
+    sender_bot_id: Mapped[int] = mapped_column(BigInteger, nullable=True) # البوت المساعد الذي أرسل النسخة (فارغ = الأساسي)
+    # مفتاح التقسيم يجب أن يكون جزءاً من المفتاح الأساسي
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.utcnow)
+
+# --- وسوم المستلمين (لغة المستخدم + وسوم يضعها المدير) ---
+# المفتاح (tag, chat_id): اختيار شريحة = مسح نطاق واحد على الفهرس
+class ChatTag(Base):
+    __tablename__ = "chat_tags"
+
+    tag: Mapped[str] = mapped_column(String, primary_key=True) # مثل "vip" أو "lang:ar"
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True) # مستخدم أو قناة أو مجموعة
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+# --- المنشورات المجدولة (تبقى بعد إعادة التشغيل) ---
+class ScheduledPost(Base):
+    __tablename__ = "scheduled_posts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    source_msg_id: Mapped[int] = mapped_column(BigInteger, nullable=True) # رسالة موجودة في القناة الأم
+    photo_file_id: Mapped[str] = mapped_column(String, nullable=True) # أو بطاقة مرفوعة مسبقاً
+    caption: Mapped[str] = mapped_column(String, nullable=True)
+    run_at: Mapped[datetime] = mapped_column(DateTime, index=True) # بتوقيت UTC
+    status: Mapped[str] = mapped_column(String, default="pending", index=True) # pending / dispatched / sent / failed / cancelled
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
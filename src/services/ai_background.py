@@ -1,8 +1,9 @@
 import logging
-import os
 import asyncio
 from huggingface_hub import InferenceClient
 from src.config import settings
+from src.services import metrics
+from src.utils.images import image_to_data_url, image_to_bytes
 
 logger = logging.getLogger("AIBackground")
 
@@ -17,10 +18,19 @@ class AIBackgroundService:
             self.client = None
             logger.warning("⚠️ HUGGINGFACE_TOKEN missing! AI will not work.")
 
-    async def generate(self, mood_text: str) -> str:
+    async def generate(self, mood_text: str) -> bytes:
         """
-        توليد خلفية فنية باستخدام الذكاء الاصطناعي
+        توليد خلفية فنية باستخدام الذكاء الاصطناعي (JPEG في الذاكرة)
         """
+        image = await self._generate_image(mood_text)
+        return await asyncio.to_thread(image_to_bytes, image, "JPEG") if image else None
+
+    async def generate_background_b64(self, text: str, mood: str = None) -> str:
+        """نفس واجهة FalDesignService (للموجّه): خلفية كـ data URL بدون ملفات"""
+        image = await self._generate_image(mood or text)
+        return await asyncio.to_thread(image_to_data_url, image) if image else None
+
+    async def _generate_image(self, mood_text: str):
         if not self.client: return None
         
         logger.info(f"🎨 AI Generating Background for: {mood_text[:20]}...")
@@ -43,23 +53,16 @@ class AIBackgroundService:
                     height=1024
                 )
 
-            image = await asyncio.to_thread(call_api)
+            with metrics.DESIGN_SECONDS.time(provider="hf_flux"):
+                image = await asyncio.to_thread(call_api)
             
             if image:
-                # حفظ الصورة محلياً
-                output_dir = "/app/data"
-                os.makedirs(output_dir, exist_ok=True)
-                # اسم ملف عشوائي لتجنب التضارب
-                import uuid
-                filename = f"bg_{uuid.uuid4()}.jpg"
-                path = os.path.join(output_dir, filename)
-                
-                image.save(path)
-                logger.info(f"✅ AI Background Saved: {path}")
-                return path # نرجع مسار الملف
+                return image
             
+            metrics.DESIGN_FAILURES.inc(provider="hf_flux")
             return None
 
         except Exception as e:
+            metrics.DESIGN_FAILURES.inc(provider="hf_flux")
             logger.error(f"❌ AI Generation Failed: {e}")
             return None
\ No newline at end of file
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("AlbumBuffer")
+
+class AlbumBuffer:
+    """
+    عناصر الألبوم تصل كمنشورات منفصلة تحمل نفس media_group_id.
+    نجمعها حتى تمر فترة قصيرة بلا عنصر جديد، ثم نسلم الألبوم كاملاً مرة واحدة.
+    """
+    def __init__(self, window: float, on_ready: Callable[[object, list], Awaitable[None]]):
+        self.window = window
+        self.on_ready = on_ready   # async (bot, [message_id مرتبة])
+        self._items = {}           # media_group_id -> set(message_id)
+        self._timers = {}          # media_group_id -> Task
+
+    def add(self, bot, message):
+        group_id = message.media_group_id
+        self._items.setdefault(group_id, set()).add(message.message_id)
+        # كل عنصر جديد يؤجل التسليم (الألبوم لم يكتمل بعد)
+        timer = self._timers.get(group_id)
+        if timer: timer.cancel()
+        self._timers[group_id] = asyncio.create_task(self._fire(bot, group_id))
+
+    async def _fire(self, bot, group_id):
+        try:
+            await asyncio.sleep(self.window)
+        except asyncio.CancelledError:
+            return
+        self._timers.pop(group_id, None)
+        message_ids = sorted(self._items.pop(group_id, ()))
+        if not message_ids: return
+        logger.info(f"🖼️ Album {group_id} complete: {len(message_ids)} items")
+        try:
+            await self.on_ready(bot, message_ids)
+        except Exception as e:
+            logger.error(f"❌ Album {group_id} dispatch failed: {e}")
@@ -6,8 +6,7 @@ import logging
 from datetime import datetime
 from sqlalchemy import select
 from src.database import AsyncSessionLocal
-# ✅ تم إزالة ScheduledPost من هنا
-from src.models import BotUser, TelegramChannel, TelegramGroup, BroadcastLog
+from src.models import BotUser, TelegramChannel, TelegramGroup, ChatTag, ScheduledPost
 
 logger = logging.getLogger("BackupService")
 
@@ -17,16 +16,18 @@ class BackupService:
         os.makedirs(self.backup_dir, exist_ok=True)
 
     async def create_backup(self) -> str:
-        """إنشاء ملف JSON يحتوي على بيانات النظام (بدون الجدولة)"""
+        """إنشاء ملف JSON يحتوي على بيانات النظام (مع الوسوم والمنشورات المجدولة المعلقة)"""
         data = {
             "meta": {
-                "version": "1.0",
+                "version": "1.1",
                 "date": datetime.utcnow().isoformat(),
                 "type": "full_backup"
             },
             "users": [],
             "channels": [],
-            "groups": []
+            "groups": [],
+            "tags": [],
+            "scheduled": []
         }
 
         async with AsyncSessionLocal() as session:
@@ -63,6 +64,21 @@ class BackupService:
                     "joined_at": g.joined_at.isoformat() if g.joined_at else None
                 })
 
+            # 4. نسخ الوسوم (الشرائح)
+            tags = await session.scalars(select(ChatTag))
+            for t in tags:
+                data["tags"].append({"tag": t.tag, "chat_id": t.chat_id})
+
+            # 5. نسخ المنشورات المجدولة المعلقة (السلاسل و/at)
+            posts = await session.scalars(select(ScheduledPost).where(ScheduledPost.status == "pending"))
+            for p in posts:
+                data["scheduled"].append({
+                    "source_msg_id": p.source_msg_id,
+                    "photo_file_id": p.photo_file_id,
+                    "caption": p.caption,
+                    "run_at": p.run_at.isoformat()
+                })
+
         # حفظ الملف
         filename = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         filepath = os.path.join(self.backup_dir, filename)
@@ -80,7 +96,7 @@ class BackupService:
         except Exception as e:
             return f"❌ فشل قراءة الملف: {e}"
 
-        stats = {"users": 0, "channels": 0, "groups": 0}
+        stats = {"users": 0, "channels": 0, "groups": 0, "tags": 0, "scheduled": 0}
         
         async with AsyncSessionLocal() as session:
             # 1. استعادة المستخدمين
@@ -121,6 +137,31 @@ class BackupService:
                         joined_at=datetime.fromisoformat(g_data["joined_at"]) if g_data.get("joined_at") else datetime.utcnow()
                     ))
                     stats["groups"] += 1
+
+            # 4. استعادة الوسوم
+            for t_data in data.get("tags", []):
+                if not await session.get(ChatTag, (t_data["tag"], t_data["chat_id"])):
+                    session.add(ChatTag(tag=t_data["tag"], chat_id=t_data["chat_id"]))
+                    stats["tags"] += 1
+
+            # 5. استعادة المنشورات المجدولة (تُحمّل في job_queue بعد الاستعادة)
+            for s_data in data.get("scheduled", []):
+                run_at = datetime.fromisoformat(s_data["run_at"])
+                existing = await session.scalar(select(ScheduledPost.id).where(
+                    ScheduledPost.status == "pending",
+                    ScheduledPost.run_at == run_at,
+                    ScheduledPost.source_msg_id == s_data.get("source_msg_id"),
+                    ScheduledPost.photo_file_id == s_data.get("photo_file_id"),
+                ).limit(1))
+                if not existing:
+                    session.add(ScheduledPost(
+                        source_msg_id=s_data.get("source_msg_id"),
+                        photo_file_id=s_data.get("photo_file_id"),
+                        caption=s_data.get("caption"),
+                        run_at=run_at,
+                        status="pending"
+                    ))
+                    stats["scheduled"] += 1
             
             await session.commit()
             
@@ -128,5 +169,7 @@ class BackupService:
             f"✅ تمت الاستعادة بنجاح!\n"
             f"👤 مستخدمين جدد: {stats['users']}\n"
             f"📢 قنوات جديدة: {stats['channels']}\n"
-            f"🏘️ مجموعات جديدة: {stats['groups']}"
+            f"🏘️ مجموعات جديدة: {stats['groups']}\n"
+            f"🏷️ وسوم جديدة: {stats['tags']}\n"
+            f"⏰ منشورات مجدولة: {stats['scheduled']}"
         )
\ No newline at end of file
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+import yaml
+from datetime import datetime, timedelta
+from telegram import InputMediaPhoto
+from src.config import settings
+from src.services.image_encoder import image_encoder
+from src.utils.helpers import card_caption
+from src.utils.images import photo_file
+
+logger = logging.getLogger("BatchPublisher")
+
+class BatchPublisher:
+    """
+    نشر سلسلة بطاقات (مثل 20 بيتاً يومياً):
+    تحليل الملف -> خلفية واحدة لكل مزاج -> رسم جماعي على متصفح واحد
+    -> رفع مسبق للحصول على file_id -> نشر مجدول عبر PostScheduler
+    """
+    def __init__(self, image_gen, design_router, moods_fn, scheduler):
+        self.image_gen = image_gen
+        self.design_router = design_router
+        self.moods_fn = moods_fn   # [نص] -> [مزاج]
+        self.scheduler = scheduler
+
+    @staticmethod
+    def parse(filename: str, data: bytes) -> list:
+        """
+        YAML: قائمة نصوص أو عناصر {text: ...}
+        TXT: المداخل مفصولة بسطر '---' (أو بسطر فارغ إن لم يوجد)
+        """
+        raw = data.decode("utf-8-sig")
+        if filename.lower().endswith((".yaml", ".yml")):
+            entries = yaml.safe_load(raw) or []
+            if isinstance(entries, dict): entries = entries.get("entries", [])
+            texts = [e.get("text", "") if isinstance(e, dict) else str(e) for e in entries]
+        else:
+            lines = raw.splitlines()
+            if any(l.strip() == "---" for l in lines):
+                chunks, current = [], []
+                for l in lines:
+                    if l.strip() == "---":
+                        chunks.append("\n".join(current)); current = []
+                    else:
+                        current.append(l)
+                chunks.append("\n".join(current))
+            else:
+                chunks = raw.split("\n\n")
+            texts = chunks
+        return [t.strip() for t in texts if t and t.strip()][:settings.BATCH_MAX_ENTRIES]
+
+    async def prepare(self, bot, texts: list, progress=None) -> list:
+        """
+        يرسم البطاقات ويرفعها للمدير (كمعاينة) ويرجع [{text, file_id}]
+        progress: دالة async اختيارية تستقبل نص الحالة بعد كل مرحلة
+        """
+        async def report(text):
+            if progress: await progress(text)
+
+        # خلفية واحدة لكل مزاج بدل خلفية لكل نص
+        moods = self.moods_fn(texts)
+        first_text = {}
+        for text, mood in zip(texts, moods):
+            first_text.setdefault(mood, text)
+        backgrounds = await asyncio.gather(*(self.design_router.generate(t, mood=m) for m, t in first_text.items()))
+        bg_by_mood = dict(zip(first_text, backgrounds))
+        logger.info(f"🎨 Batch: {len(texts)} cards, {len(bg_by_mood)} backgrounds")
+        await report(f"🖌️ الخلفيات جاهزة ({len(bg_by_mood)})، جاري رسم {len(texts)} بطاقة...")
+
+        base_id = int(time.time())
+        items = [(text, f"batch{base_id}_{i}", bg_by_mood[mood]) for i, (text, mood) in enumerate(zip(texts, moods))]
+        images = await self.image_gen.render_many(items)
+
+        staged = []
+        ready = [(text, card_id, image) for (text, card_id, _), image in zip(items, images) if image]
+        await report(f"📤 تم رسم {len(ready)}/{len(texts)} بطاقة، جاري الرفع...")
+        # ألبومات من 10 صور: استدعاء واحد لكل 10 بطاقات
+        for i in range(0, len(ready), 10):
+            chunk = ready[i:i + 10]
+            media = [InputMediaPhoto(media=photo_file(image, f"{card_id}.{image_encoder.extension}"))
+                     for _, card_id, image in chunk]
+            sent = await bot.send_media_group(chat_id=settings.ADMIN_ID, media=media)
+            for (text, _, _), msg in zip(chunk, sent):
+                staged.append({"text": text, "file_id": msg.photo[-1].file_id})
+            await report(f"📤 تم رفع {len(staged)}/{len(ready)} بطاقة...")
+        return staged
+
+    async def schedule(self, job_queue, staged: list, interval_minutes: int, first_delay: int = 60) -> list:
+        """حفظ السلسلة في الجدولة الدائمة (تنجو من إعادة التشغيل)"""
+        start = datetime.utcnow() + timedelta(seconds=first_delay)
+        posts = []
+        for i, item in enumerate(staged):
+            post = await self.scheduler.add(
+                start + timedelta(minutes=i * interval_minutes),
+                photo_file_id=item["file_id"],
+                caption=card_caption(item["text"])
+            )
+            self.scheduler.register(job_queue, post)
+            posts.append(post)
+        return posts
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+import redis.asyncio as redis
+from telegram import Bot
+from src.config import settings
+from src.services.container import services
+
+logger = logging.getLogger("BotPool")
+
+class TokenBucket:
+    """محدد معدل لكل توكن: rate رسالة/ثانية مع سماحية burst"""
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class PooledBot:
+    def __init__(self, bot: Bot, rate: float, primary: bool = False):
+        self.bot = bot
+        self.bot_id = int(bot.token.split(":", 1)[0])
+        self.limiter = TokenBucket(rate)
+        self.primary = primary
+
+class BotPool:
+    """
+    البوت الأساسي + بوتات مساعدة (أعضاء في القنوات/المجموعات المستهدفة وفي القناة المصدر).
+    - المستخدمون دائماً عبر البوت الأساسي (البوت المساعد لا يراسل من لم يبدأه)
+    - كل قناة/مجموعة مثبتة على بوت واحد (chat_id % عدد البوتات) ليبقى التعديل والحذف ممكناً
+    - إذا رُفض بوت مساعد في محادثة، تنتقل نهائياً للأساسي (bot_pool:primary_only)
+    """
+    PRIMARY_ONLY = "bot_pool:primary_only"
+
+    def __init__(self, primary: Bot, helper_tokens: list, rate: float, base_url: str = None, request_factory=None):
+        self.redis = redis.from_url(settings.REDIS_URL)
+        self.primary = PooledBot(primary, rate, primary=True)
+        kwargs = {"base_url": base_url} if base_url else {}
+        self.helpers = [
+            PooledBot(Bot(token, request=request_factory(f"helper{i}") if request_factory else None, **kwargs), rate)
+            for i, token in enumerate(helper_tokens)
+        ]
+        self.members = [self.primary] + self.helpers
+        self._by_id = {m.bot_id: m for m in self.members}
+        self._primary_only = set()
+
+    async def start(self):
+        await asyncio.gather(*(h.bot.initialize() for h in self.helpers))
+        try:
+            self._primary_only = {int(c) for c in await self.redis.smembers(self.PRIMARY_ONLY)}
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load primary-only chats: {e}")
+        logger.info(f"🤖 Bot pool: {len(self.members)} tokens ({len(self._primary_only)} chats pinned to primary)")
+
+    async def stop(self):
+        await asyncio.gather(*(h.bot.shutdown() for h in self.helpers), return_exceptions=True)
+
+    def width(self, kind: str) -> int:
+        """عدد البوتات التي تتقاسم هذا النوع من المستلمين"""
+        return 1 if kind == "users" else len(self.members)
+
+    def for_chat(self, chat_id: int, kind: str) -> PooledBot:
+        if kind == "users" or not self.helpers or chat_id in self._primary_only:
+            return self.primary
+        return self.members[chat_id % len(self.members)]
+
+    def member(self, bot_id: int) -> PooledBot:
+        """البوت الذي أرسل نسخة ما (sender_bot_id فارغ = الأساسي)"""
+        member = self._by_id.get(bot_id) if bot_id else None
+        return member or self.primary
+
+    def by_id(self, bot_id: int) -> Bot:
+        return self.member(bot_id).bot
+
+    async def demote(self, chat_id: int):
+        """البوت المساعد ليس عضواً هنا: المحادثة تبقى على الأساسي"""
+        self._primary_only.add(chat_id)
+        try:
+            await self.redis.sadd(self.PRIMARY_ONLY, chat_id)
+        except Exception: pass
+
+def build_bot_pool() -> BotPool:
+    from src.services.bot_transport import build_request
+    tokens = [t.strip() for t in settings.HELPER_BOT_TOKENS.split(",") if t.strip()]
+    return BotPool(
+        services.broadcast_bot, tokens, settings.BOT_RATE_PER_SECOND,
+        request_factory=lambda name: build_request(name, settings.BROADCAST_POOL_SIZE, settings.BROADCAST_HTTP2),
+    )
@@ -0,0 +1,53 @@
+import importlib.util
+import logging
+import time
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from src.config import settings
+from src.services import metrics
+
+logger = logging.getLogger("BotTransport")
+
+class TimedRequest(HTTPXRequest):
+    """HTTPXRequest يقيس زمن كل طلب لـ Bot API حسب الدالة (copyMessage، deleteMessage...)"""
+    def __init__(self, name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        start = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            metrics.BOT_API_SECONDS.observe(time.perf_counter() - start, transport=self.name, method=endpoint)
+
+def _http_version(http2: bool) -> str:
+    if not http2: return "1.1"
+    # HTTP/2 يحتاج حزمة h2 (pip install "httpx[http2]")
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("⚠️ BROADCAST_HTTP2 enabled but 'h2' is not installed. Falling back to HTTP/1.1.")
+        return "1.1"
+    return "2"
+
+def build_request(name: str, pool_size: int, http2: bool = False) -> TimedRequest:
+    return TimedRequest(
+        name,
+        connection_pool_size=pool_size,
+        http_version=_http_version(http2),
+        connect_timeout=settings.BOT_CONNECT_TIMEOUT,
+        read_timeout=settings.BOT_READ_TIMEOUT,
+        write_timeout=settings.BOT_WRITE_TIMEOUT,
+        pool_timeout=settings.BOT_POOL_TIMEOUT,
+    )
+
+def build_polling_request() -> HTTPXRequest:
+    """اتصال واحد مخصص لـ getUpdates: لا ينتظر خلف دفعات البث أو المعالجات"""
+    return HTTPXRequest(connection_pool_size=1, connect_timeout=settings.BOT_CONNECT_TIMEOUT,
+                        pool_timeout=settings.BOT_POOL_TIMEOUT)
+
+def build_broadcast_bot() -> Bot:
+    """بوت بنفس التوكن لكن بمجمع اتصالات كبير خاص بالتوزيع (copy/edit/delete)"""
+    pool_size = max(settings.BROADCAST_POOL_SIZE, settings.BROADCAST_BATCH_SIZE)
+    logger.info(f"📡 Broadcast transport: pool={pool_size}, http2={_http_version(settings.BROADCAST_HTTP2) == '2'}")
+    return Bot(settings.BOT_TOKEN, request=build_request("broadcast", pool_size, settings.BROADCAST_HTTP2))
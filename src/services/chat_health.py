@@ -0,0 +1,130 @@
+import logging
+import time
+import redis.asyncio as redis
+from src.config import settings
+from src.services import metrics
+
+logger = logging.getLogger("ChatHealth")
+
+class ChatHealth:
+    """
+    صحة كل محادثة في Redis:
+        chat_health:fails      ZSET  chat_id -> إخفاقات متتالية (المحادثات السليمة غير موجودة فيه)
+        chat_health:last_fail  HASH  chat_id -> وقت آخر إخفاق
+        chat_health:last_ok    HASH  chat_id -> وقت آخر نجاح
+        chat_health:latency    HASH  chat_id -> متوسط زمن الإرسال (EWMA بالميلي ثانية)
+    النتائج تُجمع في الذاكرة وتُكتب مرة واحدة لكل دفعة إرسال.
+    """
+    FAILS = "chat_health:fails"
+    LAST_FAIL = "chat_health:last_fail"
+    LAST_OK = "chat_health:last_ok"
+    LATENCY = "chat_health:latency"
+
+    def __init__(self):
+        self.redis = redis.from_url(settings.REDIS_URL)
+        self._ok = {}        # chat_id -> latency_ms
+        self._failed = set()
+        self._latency = {}   # نسخة محلية من EWMA (تجنب قراءة Redis لكل إرسال)
+
+    # --- التسجيل ---
+    def record_ok(self, chat_id: int, seconds: float):
+        self._ok[chat_id] = seconds * 1000
+        self._failed.discard(chat_id)
+
+    def record_fail(self, chat_id: int):
+        self._failed.add(chat_id)
+        self._ok.pop(chat_id, None)
+
+    async def flush(self) -> list:
+        """كتابة نتائج الدفعة. ترجع المحادثات التي تجاوزت حد التعطيل"""
+        ok, self._ok = self._ok, {}
+        failed, self._failed = self._failed, set()
+        if not ok and not failed: return []
+
+        now = time.time()
+        alpha = 0.2
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if ok:
+                    pipe.zrem(self.FAILS, *ok)
+                    pipe.hdel(self.LAST_FAIL, *ok)
+                    latency = {}
+                    for chat_id, ms in ok.items():
+                        prev = self._latency.get(chat_id)
+                        latency[chat_id] = ms if prev is None else prev + alpha * (ms - prev)
+                    self._latency.update(latency)
+                    pipe.hset(self.LATENCY, mapping={c: round(v, 1) for c, v in latency.items()})
+                    pipe.hset(self.LAST_OK, mapping={c: int(now) for c in ok})
+                for chat_id in failed:
+                    pipe.zincrby(self.FAILS, 1, chat_id)
+                if failed:
+                    pipe.hset(self.LAST_FAIL, mapping={c: int(now) for c in failed})
+                results = await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Health flush failed: {e}")
+            return []
+
+        # نتائج ZINCRBY تأتي بنفس ترتيب المحادثات الفاشلة
+        offset = 4 if ok else 0
+        scores = results[offset:offset + len(failed)]
+        dead = [c for c, score in zip(failed, scores) if score >= settings.HEALTH_DEACTIVATE_AFTER]
+        if dead:
+            await self.forget(dead)
+        return dead
+
+    async def forget(self, chat_ids: list):
+        if not chat_ids: return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(self.FAILS, *chat_ids)
+            pipe.hdel(self.LAST_FAIL, *chat_ids)
+            pipe.hdel(self.LAST_OK, *chat_ids)
+            pipe.hdel(self.LATENCY, *chat_ids)
+            await pipe.execute()
+        for c in chat_ids: self._latency.pop(c, None)
+
+    # --- التخطيط قبل البث ---
+    async def plan(self) -> "HealthPlan":
+        """قراءة واحدة في بداية البث: من يؤجَّل ومن يُتخطى هذه المرة"""
+        try:
+            failing = await self.redis.zrangebyscore(self.FAILS, settings.HEALTH_DEFER_AFTER, "+inf", withscores=True)
+            last_fail = await self.redis.hmget(self.LAST_FAIL, [c for c, _ in failing]) if failing else []
+        except Exception as e:
+            logger.warning(f"⚠️ Health plan unavailable: {e}")
+            return HealthPlan({}, set())
+
+        now = time.time()
+        deferred, skipped = {}, set()
+        for (chat_id, fails), ts in zip(failing, last_fail):
+            chat_id, fails = int(chat_id), int(fails)
+            if fails >= settings.HEALTH_PROBE_AFTER:
+                # فحص بمعدل منخفض: الانتظار يتضاعف مع كل إخفاق إضافي
+                backoff = min(settings.HEALTH_PROBE_BASE_SECONDS * 2 ** (fails - settings.HEALTH_PROBE_AFTER),
+                              settings.HEALTH_PROBE_MAX_SECONDS)
+                if ts and now - float(ts) < backoff:
+                    skipped.add(chat_id)
+                    continue
+            deferred[chat_id] = fails
+        return HealthPlan(deferred, skipped)
+
+    async def summary(self) -> str:
+        try:
+            failing = await self.redis.zcard(self.FAILS)
+            probing = await self.redis.zcount(self.FAILS, settings.HEALTH_PROBE_AFTER, "+inf")
+        except Exception:
+            return "🩺 صحة المحادثات: غير متاحة"
+        return f"🩺 محادثات متعثرة: {failing} (منها {probing} تحت الفحص المتباعد)"
+
+class HealthPlan:
+    """تقسيم المستلمين: السليمة أولاً، المتعثرة في نهاية البث، والمتروكة مؤقتاً لا تُرسل"""
+    def __init__(self, deferred: dict, skipped: set):
+        self.deferred = deferred
+        self.skipped = skipped
+
+    def route(self, chat_id: int) -> str:
+        if chat_id in self.skipped:
+            metrics.BROADCAST_SENDS.inc(result="skipped")
+            return "skip"
+        if chat_id in self.deferred: return "defer"
+        return "send"
+
+chat_health = ChatHealth()
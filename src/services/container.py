@@ -0,0 +1,154 @@
+import asyncio
+import importlib
+import logging
+import time
+
+logger = logging.getLogger("Services")
+
+_MISSING = object()
+
+class ServiceContainer:
+    """
+    سجل خدمات كسول: ملف الخدمة لا يُستورد والخدمة لا تُنشأ إلا عند أول استخدام.
+    - target: "module.path:Class" أو دالة بدون وسائط ترجع الخدمة
+    - start/stop: دوال async اختيارية تُستدعى مرة واحدة (aget / shutdown)
+    زمن الاستيراد والتهيئة لكل خدمة يُسجل في السجل ويظهر في /metrics.
+    """
+    def __init__(self):
+        self._specs = {}
+        self._instances = {}
+        self._started = set()
+        self._locks = {}
+        self.timings = {}   # name -> (import_seconds, init_seconds)
+
+    def register(self, name: str, target, start=None, stop=None):
+        self._specs[name] = (target, start, stop)
+
+    def get(self, name: str):
+        instance = self._instances.get(name, _MISSING)
+        if instance is _MISSING:
+            instance = self._build(name)
+        return instance
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in self._specs:
+            raise AttributeError(name)
+        return self.get(name)
+
+    def _build(self, name: str):
+        target = self._specs[name][0]
+        t0 = time.perf_counter()
+        if isinstance(target, str):
+            module_path, _, attr = target.partition(":")
+            factory = getattr(importlib.import_module(module_path), attr)
+        else:
+            factory = target
+        t1 = time.perf_counter()
+        instance = factory()
+        t2 = time.perf_counter()
+
+        self._instances[name] = instance
+        self.timings[name] = (t1 - t0, t2 - t1)
+        logger.info(f"🧩 {name} ready (import {(t1 - t0) * 1000:.0f}ms, init {(t2 - t1) * 1000:.0f}ms)")
+        return instance
+
+    async def aget(self, name: str):
+        """مثل get لكن يشغّل start (إن وجدت) مرة واحدة حتى مع الطلبات المتزامنة"""
+        instance = self.get(name)
+        start = self._specs[name][1]
+        if start and name not in self._started:
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if name not in self._started:
+                    await start(instance)
+                    self._started.add(name)
+        return instance
+
+    async def warm(self, names):
+        """تجهيز خدمات مسبقاً في الخلفية (بعد بدء الاستقبال) حتى لا يدفع أول منشور الثمن"""
+        for name in names:
+            try:
+                await self.aget(name)
+            except Exception as e:
+                logger.error(f"❌ Warm-up of {name} failed: {e}")
+            await asyncio.sleep(0)
+
+    async def shutdown(self):
+        for name, instance in list(self._instances.items()):
+            stop = self._specs[name][2]
+            if not stop: continue
+            try:
+                await stop(instance)
+            except Exception as e:
+                logger.error(f"❌ Stopping {name} failed: {e}")
+
+    def loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def describe(self) -> str:
+        lines = [f"🧩 الخدمات المحمّلة ({len(self._instances)}/{len(self._specs)}):"]
+        for name, (imp, init) in self.timings.items():
+            lines.append(f"• {name}: import {imp * 1000:.0f}ms | init {init * 1000:.0f}ms")
+        return "\n".join(lines)
+
+services = ServiceContainer()
+
+# ---------------------------------------------------------
+# تسجيل الخدمات
+# ---------------------------------------------------------
+services.register("forwarder", "src.services.forwarder:ForwarderService")
+services.register("image_gen", "src.services.image_gen:ImageGenerator")
+services.register("fal_designer", "src.services.fal_design:FalDesignService")       # الاقتصادي (خلفيات)
+services.register("google_designer", "src.services.google_design:GoogleDesignService") # الاحترافي (كامل)
+services.register("ai_background", "src.services.ai_background:AIBackgroundService")  # HF Flux (خلفيات)
+services.register("hf_designer", "src.services.huggingface_design:HuggingFaceDesignService") # HF SDXL (خلفيات)
+services.register("procedural_bg", "src.services.procedural_bg:ProceduralBackgroundService") # محلي بلا شبكة (خلفيات)
+services.register("message_filter", "src.services.filters:FilterService")   # فلتر رسائل المجموعات (filters.yaml)
+services.register("mood_classifier", "src.services.moods:MoodClassifier")   # مزاج الخلفية (moods.yaml)
+
+def _design_router():
+    """الموجّه يختار أسرع مزود سليم لكل خلفية (مزودو HF لا يُحمّلون إلا إذا طُلبوا)"""
+    from src.config import settings
+    from src.services.design_router import DesignRouter
+
+    def fal():
+        return services.fal_designer.generate_background_b64
+    def hf_flux():
+        return services.ai_background.generate_background_b64 if services.ai_background.client else None
+    def hf_sdxl():
+        return services.hf_designer.generate_background_b64 if services.hf_designer.client else None
+
+    def procedural():
+        return services.procedural_bg.generate_background_b64
+
+    factories = {"fal": fal, "hf_flux": hf_flux, "hf_sdxl": hf_sdxl, "procedural": procedural}
+    providers = {}
+    for name in settings.DESIGN_PROVIDERS.split(","):
+        factory = factories.get(name.strip())
+        if factory and (fn := factory()):
+            providers[name.strip()] = fn
+    return DesignRouter("background", providers, timeout=settings.DESIGN_TIMEOUT, hedge=settings.DESIGN_HEDGE)
+
+def _pro_router():
+    """التصميم الاحترافي له مزود واحد (لا تحوط، لكن مع مهلة وقاطع دائرة)"""
+    from src.config import settings
+    from src.services.design_router import DesignRouter
+    return DesignRouter("pro", {"google": services.google_designer.generate_pro_design},
+                        timeout=settings.PRO_DESIGN_TIMEOUT, hedge=False)
+
+async def _start_bot(bot):
+    await bot.initialize()
+
+async def _stop_bot(bot):
+    await bot.shutdown()
+
+services.register("broadcast_bot", "src.services.bot_transport:build_broadcast_bot", start=_start_bot, stop=_stop_bot)
+async def _start_pool(pool):
+    await pool.start()
+
+async def _stop_pool(pool):
+    await pool.stop()
+
+services.register("bot_pool", "src.services.bot_pool:build_bot_pool", start=_start_pool, stop=_stop_pool)
+services.register("design_router", _design_router)
+services.register("pro_router", _pro_router)
@@ -1,14 +1,33 @@
 import yaml
 import os
+import asyncio
 import logging
+from string import Formatter
 from src.config import settings
 
 logger = logging.getLogger(__name__)
 
 class ContentManager:
+    """
+    نصوص البوت من messages.yaml، مترجمة مسبقاً عند التحميل:
+    - المفاتيح المتداخلة تُسطّح إلى قاموس واحد ("admin.new_user" -> قالب)
+    - القوالب التي لا تحتاج وسائط تُنسّق مرة واحدة وتُحفظ
+    - مراقب اختياري يعيد التحميل عند تغيّر الملف (بدون إعادة تشغيل)
+    """
     def __init__(self, filename="messages.yaml"):
         self.filepath = os.path.join(os.path.dirname(__file__), "../resources", filename)
-        self.messages = self._load_messages()
+        self._messages = None
+        self._compiled = {}     # key -> دالة تنسيق (للنصوص) أو القيمة كما هي (قوائم/أقسام)
+        self._memo = {}         # key -> نص جاهز (للمفاتيح بدون وسائط)
+        self._mtime = None
+        self._watcher = None
+
+    @property
+    def messages(self):
+        # التحميل عند أول رسالة تُطلب (لا قراءة YAML أثناء الاستيراد)
+        if self._messages is None:
+            self._load()
+        return self._messages
 
     def _load_messages(self):
         try:
@@ -18,20 +37,99 @@ class ContentManager:
             logger.critical(f"❌ Failed to load messages: {e}")
             return {}
 
+    def _load(self):
+        try:
+            self._mtime = os.stat(self.filepath).st_mtime
+        except OSError:
+            self._mtime = None
+        self._install(self._load_messages() or {})
+
+    def _install(self, messages: dict):
+        compiled = {}
+        self._flatten(messages, "", compiled)
+        # تبديل ذري: الطلبات الجارية ترى النسخة القديمة أو الجديدة كاملة
+        self._messages, self._compiled, self._memo = messages, compiled, {}
+
+    def _flatten(self, node, prefix, out):
+        for key, value in node.items():
+            path = f"{prefix}{key}"
+            if isinstance(value, dict):
+                out[path] = value
+                self._flatten(value, f"{path}.", out)
+            elif isinstance(value, str):
+                out[path] = self._compile(value)
+            else:
+                out[path] = value
+
+    @staticmethod
+    def _compile(template: str):
+        if all(name is None for _, name, _, _ in Formatter().parse(template)):
+            text = template.format()       # نص ثابت: لا حاجة لـ format عند كل طلب
+            return lambda args: text
+        return template.format_map
+
     def get(self, key_path: str, **kwargs) -> str:
-        keys = key_path.split('.')
-        value = self.messages
-        for k in keys:
-            value = value.get(k, {})
-            if not value: return f"MISSING: {key_path}"
-        
+        if self._messages is None:
+            self._load()
+
+        if not kwargs:
+            cached = self._memo.get(key_path)
+            if cached is not None: return cached
+
+        entry = self._compiled.get(key_path)
+        if not entry: return f"MISSING: {key_path}"
+        if not callable(entry): return entry
+
         format_args = {
             "bot_name": settings.CHANNEL_NAME,
             "channel_handle": settings.CHANNEL_HANDLE,
             **kwargs
         }
-        if isinstance(value, str):
-            return value.format(**format_args)
+        value = entry(format_args)
+        if not kwargs:
+            self._memo[key_path] = value
         return value
 
-content = ContentManager()
\ No newline at end of file
+    # --- إعادة التحميل التلقائي ---
+    async def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.filepath).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime: return False
+
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                raw = f.read()
+            messages = await asyncio.to_thread(yaml.safe_load, raw)
+        except Exception as e:
+            # نبقي النسخة السابقة إذا كان الملف الجديد معطوباً
+            logger.error(f"❌ messages.yaml reload failed (keeping previous): {e}")
+            self._mtime = mtime
+            return False
+
+        self._mtime = mtime
+        self._install(messages or {})
+        logger.info(f"🔄 Messages reloaded ({len(self._compiled)} keys).")
+        return True
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"❌ Messages watcher error: {e}")
+
+    def start_watcher(self, interval: float = None):
+        interval = interval or settings.CONTENT_RELOAD_INTERVAL
+        if interval <= 0 or self._watcher: return
+        self._watcher = asyncio.create_task(self._watch(interval))
+
+    async def stop_watcher(self):
+        if not self._watcher: return
+        self._watcher.cancel()
+        await asyncio.gather(self._watcher, return_exceptions=True)
+        self._watcher = None
+
+content = ContentManager()
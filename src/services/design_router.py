@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from src.config import settings
+from src.services import metrics
+
+logger = logging.getLogger("DesignRouter")
+
+class ProviderStats:
+    """إحصاءات متحركة لمزود واحد: زمن الاستجابة، نسبة الأخطاء، وقاطع الدائرة"""
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)   # True = نجاح
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def quantile(self, q: float):
+        if not self.latencies: return None
+        data = sorted(self.latencies)
+        return data[min(len(data) - 1, int(q * len(data)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes: return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+    def success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+
+    def failure(self, now: float, threshold: int, cooldown: float) -> bool:
+        """يرجع True إذا فُتحت الدائرة الآن"""
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            self.open_until = now + cooldown
+            return True
+        return False
+
+class DesignRouter:
+    """
+    يوزع طلبات التوليد على عدة مزودين:
+    - يختار الأسرع بين المزودين السليمين (p50 مع عقوبة لنسبة الأخطاء)
+    - طلب تحوّطي (Hedged) لمزود ثانٍ إذا تجاوز الأول زمن p95 المعتاد
+    - قاطع دائرة (Circuit Breaker) للمزود الذي يفشل مراراً
+    كل مزود دالة async تأخذ (text, **kwargs) وترجع النتيجة أو None.
+    """
+    def __init__(self, name: str, providers: dict, timeout: float, hedge: bool = True):
+        self.name = name
+        self.providers = providers
+        self.order = list(providers)
+        self.timeout = timeout
+        self.hedge = hedge
+        self.stats = {p: ProviderStats(settings.DESIGN_STATS_WINDOW) for p in providers}
+
+    def ranked(self) -> list:
+        now = time.monotonic()
+        healthy = [p for p in self.order if not self.stats[p].is_open(now)]
+
+        def score(p):
+            s = self.stats[p]
+            p50 = s.quantile(0.5) if len(s.latencies) >= settings.DESIGN_MIN_SAMPLES else None
+            # المزود بدون قياسات كافية يحتفظ بترتيبه المُعدّ (لا نغامر بالجودة)
+            if p50 is None: return (1, self.order.index(p), 0)
+            return (0, p50 * (1 + 2 * s.error_rate), self.order.index(p))
+
+        return sorted(healthy, key=score)
+
+    def _hedge_delay(self, provider: str):
+        if not self.hedge: return None
+        s = self.stats[provider]
+        if len(s.latencies) < settings.DESIGN_MIN_SAMPLES: return None
+        return s.quantile(0.95)
+
+    async def _call(self, provider: str, text: str, kwargs: dict):
+        start = time.monotonic()
+        try:
+            result = await self.providers[provider](text, **kwargs)
+        except asyncio.CancelledError:
+            # خاسر في سباق التحوط أو انتهت المهلة: يُحسب في generate()
+            raise
+        except Exception as e:
+            logger.error(f"❌ [{self.name}] {provider} raised: {e}")
+            result = None
+
+        if result:
+            self.stats[provider].success(time.monotonic() - start)
+        else:
+            self._fail(provider)
+        return result
+
+    def _fail(self, provider: str):
+        opened = self.stats[provider].failure(time.monotonic(), settings.DESIGN_CB_THRESHOLD, settings.DESIGN_CB_COOLDOWN)
+        if opened:
+            logger.warning(f"🔌 [{self.name}] Circuit open for {provider} ({settings.DESIGN_CB_COOLDOWN:.0f}s)")
+            metrics.DESIGN_CIRCUIT_OPEN.inc(provider=provider)
+
+    async def generate(self, text: str, **kwargs):
+        candidates = self.ranked()
+        if not candidates:
+            logger.warning(f"⚠️ [{self.name}] No healthy provider available.")
+            return None
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.timeout
+        pending = {}
+        next_idx = 0
+
+        def launch():
+            nonlocal next_idx
+            provider = candidates[next_idx]
+            next_idx += 1
+            pending[asyncio.create_task(self._call(provider, text, kwargs))] = provider
+
+        launch()
+        delay = self._hedge_delay(candidates[0])
+        hedge_at = started + delay if delay is not None and len(candidates) > 1 else None
+
+        try:
+            while pending:
+                wake = min(deadline, hedge_at) if hedge_at else deadline
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, wake - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    provider = pending.pop(task)
+                    result = task.result()
+                    if result:
+                        metrics.DESIGN_ROUTED.inc(provider=provider)
+                        return result
+
+                if loop.time() >= deadline:
+                    # انتهت المهلة: ما زال قيد التنفيذ يُعد فشلاً
+                    for provider in pending.values():
+                        logger.warning(f"⏱️ [{self.name}] {provider} timed out after {self.timeout:.0f}s")
+                        self._fail(provider)
+                    break
+
+                if not pending and next_idx < len(candidates):
+                    # كل الطلبات الجارية فشلت: ننتقل للمزود التالي فوراً
+                    launch()
+                    hedge_at = None
+                elif hedge_at and loop.time() >= hedge_at:
+                    hedge_at = None
+                    if next_idx < len(candidates):
+                        logger.info(f"🪁 [{self.name}] Hedging: {candidates[0]} exceeded p95 ({delay:.1f}s), firing {candidates[next_idx]}")
+                        metrics.DESIGN_HEDGES.inc(provider=candidates[next_idx])
+                        launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def describe(self) -> str:
+        now = time.monotonic()
+        lines = []
+        for p in self.order:
+            s = self.stats[p]
+            p50, p95 = s.quantile(0.5), s.quantile(0.95)
+            state = "🔴" if s.is_open(now) else "🟢"
+            lat = f"p50={p50:.1f}s p95={p95:.1f}s" if p50 is not None else "no data"
+            lines.append(f"{state} {self.name}/{p}: {lat} err={s.error_rate:.0%}")
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import aiohttp
+from src.config import settings
+
+logger = logging.getLogger("FalQueue")
+
+# مهام الإلغاء الجارية (مرجع قوي حتى لا يجمعها جامع القمامة قبل أن تكتمل)
+_cancel_tasks = set()
+
+class FalJobError(Exception):
+    pass
+
+class FalQueueClient:
+    """
+    عميل async لواجهة fal queue (submit ثم poll) على جلسة HTTP مشتركة.
+    لا يحجز أي Thread أثناء انتظار التوليد، ويُلغي الطلب عند fal إذا أُلغيت المهمة.
+    """
+    def __init__(self):
+        self.base_url = settings.FAL_QUEUE_URL.rstrip("/")
+        self.poll_interval = settings.FAL_POLL_INTERVAL
+        self.poll_max_interval = settings.FAL_POLL_MAX_INTERVAL
+        self.timeout = settings.FAL_TIMEOUT
+        self._session = None
+
+    @property
+    def _auth(self) -> dict:
+        return {"Authorization": f"Key {settings.FAL_KEY}"}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=60, connect=10),
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def run(self, endpoint: str, arguments: dict) -> dict:
+        """إرسال الطلب وانتظار النتيجة (مع مهلة كلية FAL_TIMEOUT)"""
+        return await asyncio.wait_for(self._run(endpoint, arguments), timeout=self.timeout)
+
+    async def _run(self, endpoint: str, arguments: dict) -> dict:
+        session = self._get_session()
+        async with session.post(f"{self.base_url}/{endpoint}", json=arguments, headers=self._auth) as resp:
+            if resp.status >= 400:
+                raise FalJobError(f"submit failed ({resp.status}): {(await resp.text())[:200]}")
+            job = await resp.json()
+
+        request_id = job["request_id"]
+        base = f"{self.base_url}/{endpoint}/requests/{request_id}"
+        status_url = job.get("status_url") or f"{base}/status"
+        response_url = job.get("response_url") or base
+        cancel_url = job.get("cancel_url") or f"{base}/cancel"
+
+        try:
+            interval = self.poll_interval
+            while True:
+                async with session.get(status_url, headers=self._auth) as resp:
+                    # 404 وأي 4xx لن تتغير بالانتظار (طلب مجهول أو مفتاح مرفوض): نفشل فوراً بدل الاستطلاع حتى FAL_TIMEOUT
+                    if resp.status >= 400:
+                        raise FalJobError(f"status failed ({resp.status}): {(await resp.text())[:200]}")
+                    status = (await resp.json()).get("status")
+                if status == "COMPLETED":
+                    break
+                await asyncio.sleep(interval)
+                interval = min(interval * 1.5, self.poll_max_interval)
+
+            async with session.get(response_url, headers=self._auth) as resp:
+                if resp.status >= 400:
+                    raise FalJobError(f"result failed ({resp.status}): {(await resp.text())[:200]}")
+                return await resp.json()
+
+        except asyncio.CancelledError:
+            # نُبلغ fal بالإلغاء حتى لا يستمر الحساب (ولا ننتظر الرد)
+            task = asyncio.create_task(self._cancel(cancel_url))
+            _cancel_tasks.add(task)
+            task.add_done_callback(_cancel_tasks.discard)
+            raise
+
+    async def _cancel(self, cancel_url: str):
+        try:
+            async with self._get_session().put(cancel_url, headers=self._auth) as resp:
+                logger.info(f"🛑 fal request cancelled ({resp.status})")
+        except Exception as e:
+            logger.debug(f"fal cancel failed: {e}")
+
+    async def download(self, url: str):
+        """تحميل الصورة الناتجة -> (bytes, content_type)"""
+        async with self._get_session().get(url) as resp:
+            if resp.status != 200:
+                return None, None
+            return await resp.read(), resp.headers.get("content-type", "image/jpeg")
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+fal_queue = FalQueueClient()
@@ -1,50 +1,107 @@
 import re
+import os
+import hashlib
 import logging
-from telegram import Message
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import yaml
+from telegram import Message, MessageEntity
 from src.config import settings
+from src.services import metrics
+from src.utils.text_match import AhoCorasick, DomainSet
 
 logger = logging.getLogger(__name__)
 
+# تعبير نمطي لاكتشاف الروابط (يُترجم مرة واحدة): يتوقف عند الأقواس وعلامات الاقتباس والفواصل
+URL_PATTERN = re.compile(r"""https?://[^\s<>()\[\]"'،,]+|(?:t|telegram)\.me/[^\s<>()\[\]"'،,]+""", re.IGNORECASE)
+URL_TRAILING = ".,;:!?؟؛"   # علامات ترقيم تلتصق بآخر الرابط في الجملة
+TG_HOSTS = {"t.me", "telegram.me"}
+
 class FilterService:
-    @staticmethod
-    def is_ad(message: Message) -> bool:
-        """
-        فلتر ذكي: يمنع الروابط الخارجية والرسائل المحولة من قنوات غريبة
-        (متوافق مع python-telegram-bot v21+)
-        """
-        
-        # --- 1. فحص التوجيه (Forward Check) - التحديث الجديد ---
+    """
+    فلتر ذكي لرسائل المجموعات: التوجيه من مصادر غريبة، الروابط الخارجية، العبارات الدعائية.
+    - كل الأنماط والقوائم تُبنى مرة واحدة (filters.yaml)
+    - حكم النص يُحفظ في LRU بمفتاح بصمة الرسالة (الرسائل المكررة لا تُفحص مجدداً)
+    """
+    def __init__(self, filename="filters.yaml"):
+        self.filepath = os.path.join(os.path.dirname(__file__), "../resources", filename)
+        config = self._load_config()
+        self.allow = DomainSet(config.get("allow_domains") or ())
+        self.deny = DomainSet(config.get("deny_domains") or ())
+        self.handles = {h.lstrip("@").lower() for h in config.get("allow_handles") or ()}
+        self.handles.add(settings.CHANNEL_HANDLE.lstrip("@").lower())
+        self.phrases = AhoCorasick(p.lower() for p in config.get("spam_phrases") or ())
+        self._verdicts = OrderedDict()
+        self._cache_size = settings.FILTER_CACHE_SIZE
+
+    def _load_config(self) -> dict:
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.error(f"❌ Failed to load filters: {e}")
+            return {}
+
+    def is_ad(self, message: Message) -> bool:
+        return self.check(message) is not None
+
+    def check(self, message: Message):
+        """يرجع سبب الحظر (نص قصير) أو None"""
+        with metrics.FILTER_SECONDS.time():
+            return self._check(message)
+
+    def _check(self, message: Message):
+        # --- 1. فحص التوجيه (Forward Check) ---
         # في النسخة 21+، نستخدم forward_origin بدلاً من forward_from_chat
         if message.forward_origin:
-            # نحاول معرفة القناة الأصلية
             origin_chat = getattr(message.forward_origin, 'chat', None)
-            
-            # إذا كانت الرسالة محولة من قناة، وهذه القناة ليست قناتنا المصدر -> حظر
-            if origin_chat and origin_chat.id != settings.MASTER_SOURCE_ID:
-                logger.info("🚫 Filter: Blocked external forward (Channel).")
-                return True
-            
-            # إذا كانت محولة من مستخدم أو مصدر مخفي -> حظر (غالباً إعلانات)
+            # محولة من قناة غير قناتنا المصدر، أو من مستخدم/مصدر مخفي (غالباً إعلانات)
             if not origin_chat:
-                 logger.info("🚫 Filter: Blocked external forward (User/Hidden).")
-                 return True
+                return self._verdict("forward_user")
+            if origin_chat.id != settings.MASTER_SOURCE_ID:
+                return self._verdict("forward_channel")
 
-        # --- 2. فحص الروابط (Links Check) ---
+        # --- 2. النص والروابط المخفية (text_link) ---
         text = message.text or message.caption or ""
-        if text:
-            # تعبير نمطي لاكتشاف الروابط
-            url_pattern = r"(https?://[^\s]+)|(t\.me/[^\s]+)|(telegram\.me/[^\s]+)"
-            found_urls = re.findall(url_pattern, text)
-
-            for url_tuple in found_urls:
-                url = "".join(url_tuple).lower()
-                
-                # تنظيف المعرف من @ للمقارنة
-                my_handle = settings.CHANNEL_HANDLE.replace("@", "").lower()
-                
-                # إذا وجد رابطاً، ولم يكن يحتوي على معرف قناتنا -> حظر
-                if my_handle not in url:
-                    logger.info(f"🚫 Filter: Blocked external link ({url}).")
-                    return True
-
-        return False
\ No newline at end of file
+        entities = message.entities or message.caption_entities or ()
+        hidden = [e.url for e in entities if e.type == MessageEntity.TEXT_LINK and e.url]
+        if not text and not hidden: return self._verdict(None)
+
+        key = hashlib.blake2b("\n".join([text, *hidden]).encode(), digest_size=12).digest()
+        if key in self._verdicts:
+            self._verdicts.move_to_end(key)
+            return self._verdict(self._verdicts[key], cached=True)
+
+        reason = self._check_text(text, hidden)
+        self._verdicts[key] = reason
+        if len(self._verdicts) > self._cache_size:
+            self._verdicts.popitem(last=False)
+        return self._verdict(reason)
+
+    def _check_text(self, text: str, hidden: list):
+        for url in (*(u.rstrip(URL_TRAILING) for u in URL_PATTERN.findall(text)), *hidden):
+            reason = self._check_url(url)
+            if reason: return reason
+
+        phrase = self.phrases.search(text.lower())
+        if phrase: return f"phrase:{phrase}"
+        return None
+
+    def _check_url(self, url: str):
+        if "://" not in url: url = "https://" + url
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or "").lower()
+        except ValueError:
+            return "link:malformed"
+
+        if self.deny.match(host): return f"link:{host}"
+        if self.allow.match(host): return None
+        if host in TG_HOSTS:
+            handle = parts.path.strip("/").split("/", 1)[0].lower()
+            return None if handle in self.handles else f"tg:{handle}"
+        return f"link:{host}"
+
+    def _verdict(self, reason, cached=False):
+        metrics.FILTER_VERDICTS.inc(result="blocked" if reason else "clean", cache="hit" if cached else "miss")
+        return reason
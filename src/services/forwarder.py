@@ -2,86 +2,252 @@
 
 import logging
 import asyncio
+import time
 import redis.asyncio as redis
 from telegram import Bot
 from telegram.error import RetryAfter, Forbidden, BadRequest
 from sqlalchemy import select, update, delete
 from src.database import AsyncSessionLocal
-from src.models import BotUser, TelegramChannel, TelegramGroup, BroadcastLog
+from src.models import BotUser, BroadcastLog
 from src.config import settings
+from src.services.user_cache import user_cache
+from src.services.segments import Segment, EVERYONE, KIND_OF_MODEL
+from src.services.recipients import recipients
+from src.services.chat_health import chat_health
+from src.services import metrics
 
 logger = logging.getLogger(__name__)
 
 class ForwarderService:
     def __init__(self):
         self.redis = redis.from_url(settings.REDIS_URL)
+        # بث واحد في كل مرة: بثّان كبيران لا يتنافسان على نفس حد الإرسال
+        self._fanout_lock = asyncio.Lock()
+        # بوت بمجمع اتصالات مستقل للتوزيع (يُضبط عند التشغيل)؛ بدونه نستخدم البوت الممرر
+        self.sender: Bot = None
+        # مجموعة بوتات اختيارية (HELPER_BOT_TOKENS) لتقاسم القنوات والمجموعات
+        self.pool = None
 
-    async def broadcast_message(self, bot: Bot, source_msg_id: int):
-        """توزيع الرسالة وتسجيلها في السجل"""
-        await self._broadcast(bot, source_msg_id, BotUser, BotUser.user_id, BotUser.is_active, "Users")
-        await self._broadcast(bot, source_msg_id, TelegramChannel, TelegramChannel.chat_id, TelegramChannel.is_active, "Channels")
-        await self._broadcast(bot, source_msg_id, TelegramGroup, TelegramGroup.chat_id, TelegramGroup.is_active, "Groups")
+    async def broadcast_message(self, bot: Bot, source_msg_id: int, segment: Segment = None, album: list = None):
+        """
+        توزيع الرسالة (على الجميع أو على شريحة) وتسجيلها في السجل.
+        album: كل عناصر الألبوم (تُنسخ بطلب copyMessages واحد لكل مستلم)
+        """
+        segment = segment or EVERYONE
+        source_ids = tuple(album) if album else (source_msg_id,)
+        bot = self.sender or bot
+        if not segment.is_everyone:
+            logger.info(f"🎯 Targeted broadcast of {source_msg_id} to segment: {segment}")
+        async with self._fanout_lock:
+            # المحادثات المتعثرة تُؤجَّل لنهاية البث (أو تُتخطى حتى موعد فحصها التالي)
+            plan = await chat_health.plan()
+            later = []
+            for kind, label, model, id_col, stmt in segment.targets():
+                # البث الكامل يقرأ من اللقطة في الذاكرة؛ الشرائح تحتاج استعلاماً
+                ids = recipients.ids(kind) if segment.is_everyone and recipients.ready else None
+                deferred = await self._broadcast(bot, source_ids, model, id_col, stmt, label, ids, plan)
+                if deferred: later.append((model, id_col, label, deferred))
 
-    async def _broadcast(self, bot, msg_id, model, id_col, active_col, label):
+            for model, id_col, label, deferred in later:
+                await self._broadcast(bot, source_ids, model, id_col, None, f"{label}-deferred", deferred)
+            if plan.skipped:
+                logger.info(f"🩺 {len(plan.skipped)} unhealthy chats skipped until their next probe.")
+
+    async def _recipients(self, stmt, ids):
+        if ids is not None:
+            for chat_id in ids: yield chat_id
+            return
         async with AsyncSessionLocal() as session:
-            result = await session.stream_scalars(select(id_col).where(active_col == True))
-            batch = []
-            async for chat_id in result:
-                batch.append(chat_id)
-                if len(batch) >= 20:
-                    await self._send_batch(bot, batch, msg_id, model, id_col)
-                    batch = []
-                    await asyncio.sleep(0.1)
-            if batch: await self._send_batch(bot, batch, msg_id, model, id_col)
+            result = await session.stream_scalars(stmt)
+            async for chat_id in result: yield chat_id
+
+    async def _broadcast(self, bot, source_ids, model, id_col, stmt, label, ids=None, plan=None) -> list:
+        """يرجع المحادثات المؤجلة (تُرسل بعد انتهاء كل المستلمين السليمين)"""
+        start = time.perf_counter()
+        sent_before = metrics.BROADCAST_SENDS.value(result="ok")
+        deferred = []
+        batch = []
+        # مع البوتات المساعدة تتسع الدفعة بقدر عددها (كل توكن له حد إرسال خاص)
+        batch_size = settings.BROADCAST_BATCH_SIZE * (self.pool.width(KIND_OF_MODEL[model]) if self.pool else 1)
+        async for chat_id in self._recipients(stmt, ids):
+            route = plan.route(chat_id) if plan else "send"
+            if route == "defer":
+                deferred.append(chat_id)
+                continue
+            if route == "skip": continue
+            batch.append(chat_id)
+            if len(batch) >= batch_size:
+                await self._send_batch(bot, batch, source_ids, model, id_col)
+                batch = []
+                await asyncio.sleep(settings.BROADCAST_BATCH_PAUSE)
+        if batch: await self._send_batch(bot, batch, source_ids, model, id_col)
+
+        elapsed = time.perf_counter() - start
+        metrics.BROADCAST_SECONDS.observe(elapsed, kind=label)
+        sent = metrics.BROADCAST_SENDS.value(result="ok") - sent_before
+        metrics.BROADCAST_RATE.set(round(sent / elapsed, 2) if elapsed else 0, kind=label)
+        logger.info(f"📤 {label}: {sent:g} sent in {elapsed:.1f}s" + (f", {len(deferred)} deferred" if deferred else ""))
+        return deferred
 
-    async def _send_batch(self, bot, batch, msg_id, model, id_col):
-        tasks = [self._safe_copy(bot, chat_id, settings.MASTER_SOURCE_ID, msg_id, model, id_col) for chat_id in batch]
+    async def _send_batch(self, bot, batch, source_ids, model, id_col):
+        with metrics.BROADCAST_BATCH_SECONDS.time():
+            await self._send_batch_inner(bot, batch, source_ids, model, id_col)
+
+    async def _send_batch_inner(self, bot, batch, source_ids, model, id_col):
+        tasks = [self._safe_copy(bot, chat_id, settings.MASTER_SOURCE_ID, source_ids, model, id_col) for chat_id in batch]
         results = await asyncio.gather(*tasks)
+
+        # المحادثات التي فشلت مرات متتالية كثيرة تُعطّل
+        for chat_id in await chat_health.flush():
+            logger.info(f"🩺 Deactivating chronically failing chat {chat_id}")
+            metrics.BROADCAST_SENDS.inc(result="unhealthy")
+            await self._deactivate(model, id_col, chat_id, "Unhealthy")
         
-        # تسجيل الرسائل الناجحة
+        # تسجيل الرسائل الناجحة (صف لكل عنصر؛ عناصر الألبوم تشترك في source_group_id)
+        group_id = source_ids[0] if len(source_ids) > 1 else None
         async with AsyncSessionLocal() as session:
             logs = []
             for res in results:
-                if res: 
-                    logs.append(BroadcastLog(source_msg_id=msg_id, target_chat_id=res[0], target_msg_id=res[1]))
+                if not res: continue
+                chat_id, target_ids, sender_id = res
+                for source_id, target_id in zip(source_ids, target_ids):
+                    logs.append(BroadcastLog(source_msg_id=source_id, target_chat_id=chat_id, target_msg_id=target_id,
+                                             source_group_id=group_id, sender_bot_id=sender_id))
             if logs:
                 session.add_all(logs)
                 await session.commit()
 
-    async def _safe_copy(self, bot, chat_id, from_chat, msg_id, model, id_col):
+    async def _safe_copy(self, bot, chat_id, from_chat, source_ids, model, id_col):
+        member = self.pool.for_chat(chat_id, KIND_OF_MODEL[model]) if self.pool else None
+        if member:
+            await member.limiter.acquire()
+            bot = member.bot
+        sender_id = member.bot_id if member and not member.primary else None
         try:
-            sent = await bot.copy_message(chat_id=chat_id, from_chat_id=from_chat, message_id=msg_id)
-            return (chat_id, sent.message_id)
+            started = time.perf_counter()
+            if len(source_ids) > 1:
+                sent = await bot.copy_messages(chat_id=chat_id, from_chat_id=from_chat, message_ids=source_ids)
+                target_ids = [m.message_id for m in sent]
+            else:
+                sent = await bot.copy_message(chat_id=chat_id, from_chat_id=from_chat, message_id=source_ids[0])
+                target_ids = [sent.message_id]
+            chat_health.record_ok(chat_id, time.perf_counter() - started)
+            metrics.BROADCAST_SENDS.inc(result="ok")
+            return (chat_id, target_ids, sender_id)
         except RetryAfter as e:
+            metrics.BROADCAST_RETRY_AFTER.inc()
+            metrics.BROADCAST_RETRY_SLEEP.inc(e.retry_after)
             await asyncio.sleep(e.retry_after)
-            return await self._safe_copy(bot, chat_id, from_chat, msg_id, model, id_col)
+            return await self._safe_copy(bot, chat_id, from_chat, source_ids, model, id_col)
         # ✅ THE FIX: استبدال ChatNotFound بـ BadRequest
         except (Forbidden, BadRequest) as e:
             # إذا كان الخطأ أن الشات غير موجود أو تم طرد البوت
             err_msg = str(e).lower()
+            if sender_id and (isinstance(e, Forbidden) or "chat not found" in err_msg):
+                # البوت المساعد ليس عضواً: نعيد عبر الأساسي بدل تعطيل المحادثة
+                await self.pool.demote(chat_id)
+                return await self._safe_copy(bot, chat_id, from_chat, source_ids, model, id_col)
+            metrics.BROADCAST_SENDS.inc(result="forbidden" if isinstance(e, Forbidden) else "bad_request")
             if isinstance(e, Forbidden) or "chat not found" in err_msg or "kicked" in err_msg:
                 await self._deactivate(model, id_col, chat_id, "Inactive")
+            else:
+                chat_health.record_fail(chat_id)
             return None
         except Exception as e:
+            chat_health.record_fail(chat_id)
+            metrics.BROADCAST_SENDS.inc(result="error")
             logger.error(f"⚠️ Broadcast Error for {chat_id}: {e}")
             return None
 
+    def _bot_for(self, bot, sender_bot_id):
+        """النسخة تُعدّل وتُحذف بنفس البوت الذي أرسلها"""
+        return self.pool.by_id(sender_bot_id) if self.pool and sender_bot_id else bot
+
     async def _deactivate(self, model, id_col, chat_id, reason):
+        if model is BotUser:
+            user_cache.invalidate(chat_id)
+        recipients.remove(KIND_OF_MODEL[model], chat_id)
         try:
             async with AsyncSessionLocal() as session:
                 await session.execute(update(model).where(id_col == chat_id).values(is_active=False))
                 await session.commit()
         except: pass
 
-    async def delete_broadcast(self, bot: Bot, source_msg_id: int):
+    async def delete_broadcast(self, bot: Bot, source_msg_id: int) -> list:
+        """حذف كل النسخ الموزعة (والألبوم كاملاً إن كانت الرسالة جزءاً منه). يرجع معرفات المصدر المحذوفة"""
         logger.info(f"🗑️ Deleting broadcast for source: {source_msg_id}")
+        bot = self.sender or bot
         async with AsyncSessionLocal() as session:
-            stmt = select(BroadcastLog).where(BroadcastLog.source_msg_id == source_msg_id)
-            logs = await session.scalars(stmt)
-            tasks = [self._safe_delete(bot, log.target_chat_id, log.target_msg_id) for log in logs]
+            group_id = await session.scalar(
+                select(BroadcastLog.source_group_id)
+                .where(BroadcastLog.source_msg_id == source_msg_id, BroadcastLog.source_group_id.is_not(None))
+                .limit(1)
+            )
+            cond = BroadcastLog.source_group_id == group_id if group_id else BroadcastLog.source_msg_id == source_msg_id
+            logs = (await session.scalars(select(BroadcastLog).where(cond))).all()
+            tasks = [self._safe_delete(self._bot_for(bot, log.sender_bot_id), log.target_chat_id, log.target_msg_id) for log in logs]
             await asyncio.gather(*tasks)
-            await session.execute(delete(BroadcastLog).where(BroadcastLog.source_msg_id == source_msg_id))
+            await session.execute(delete(BroadcastLog).where(cond))
             await session.commit()
+        return sorted({log.source_msg_id for log in logs} | {source_msg_id})
+
+    async def edit_broadcast(self, bot: Bot, message):
+        """تعديل كل النسخ الموزعة لرسالة مصدر (نص أو وصف) بدفعات محدودة السرعة"""
+        if message.text:
+            kind = "text"
+        elif message.caption is not None:
+            kind = "caption"
+        else:
+            return
+
+        logger.info(f"✏️ Propagating edit for source: {message.message_id}")
+        bot = self.sender or bot
+        edited = 0
+        # نفس إيقاع البث: الدفعة تتسع بعدد البوتات، وكل تعديل يمر بحد إرسال البوت الذي أرسل النسخة
+        batch_size = settings.BROADCAST_BATCH_SIZE * (len(self.pool.members) if self.pool else 1)
+        async with AsyncSessionLocal() as session:
+            stmt = select(BroadcastLog.target_chat_id, BroadcastLog.target_msg_id, BroadcastLog.sender_bot_id).where(BroadcastLog.source_msg_id == message.message_id)
+            result = await session.stream(stmt)
+            batch = []
+            async for row in result:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    results = await asyncio.gather(*[self._safe_edit(bot, c, m, message, kind, s) for c, m, s in batch])
+                    edited += sum(results)
+                    batch = []
+                    await asyncio.sleep(settings.BROADCAST_BATCH_PAUSE)
+            if batch:
+                results = await asyncio.gather(*[self._safe_edit(bot, c, m, message, kind, s) for c, m, s in batch])
+                edited += sum(results)
+        logger.info(f"✏️ Edited {edited} copies of {message.message_id}")
+
+    async def _safe_edit(self, bot, chat_id, msg_id, message, kind, sender_bot_id=None) -> bool:
+        # النسخة تُعدّل بنفس البوت الذي أرسلها، وبعد انتظار حد الإرسال الخاص به
+        member = self.pool.member(sender_bot_id) if self.pool else None
+        if member:
+            await member.limiter.acquire()
+            bot = member.bot
+        try:
+            if kind == "text":
+                await bot.edit_message_text(chat_id=chat_id, message_id=msg_id, text=message.text, entities=message.entities)
+            else:
+                await bot.edit_message_caption(chat_id=chat_id, message_id=msg_id, caption=message.caption, caption_entities=message.caption_entities)
+            metrics.BROADCAST_EDITS.inc(result="ok")
+            return True
+        except RetryAfter as e:
+            metrics.BROADCAST_RETRY_AFTER.inc()
+            metrics.BROADCAST_RETRY_SLEEP.inc(e.retry_after)
+            await asyncio.sleep(e.retry_after)
+            return await self._safe_edit(bot, chat_id, msg_id, message, kind, sender_bot_id)
+        except BadRequest as e:
+            # "message is not modified" ليس خطأ حقيقياً
+            if "not modified" not in str(e).lower():
+                metrics.BROADCAST_EDITS.inc(result="error")
+            return False
+        except Exception as e:
+            metrics.BROADCAST_EDITS.inc(result="error")
+            logger.error(f"⚠️ Edit Error for {chat_id}: {e}")
+            return False
 
     async def _safe_delete(self, bot, chat_id, msg_id):
         try: await bot.delete_message(chat_id=chat_id, message_id=msg_id)
@@ -1,9 +1,8 @@
 import logging
-import os
-import asyncio
-import fal_client
-import requests
 from src.config import settings
+from src.services import metrics
+from src.services.fal_queue import fal_queue
+from src.services.image_encoder import image_encoder
 
 logger = logging.getLogger("GoogleDesignService")
 
@@ -17,11 +16,10 @@ class GoogleDesignService:
         if not settings.FAL_KEY:
             logger.warning("⚠️ FAL_KEY is missing. Google Gemini will not work.")
             return
-        os.environ["FAL_KEY"] = settings.FAL_KEY
         self.model_endpoint = "fal-ai/gemini-3-pro-image-preview"
         logger.info("✅ GoogleDesignService initialized with Gemini 3 Pro.")
 
-    async def generate_pro_design(self, text: str, message_id: int) -> str:
+    async def generate_pro_design(self, text: str, message_id: int) -> bytes:
         """
         Generate a high-end cinematic Arabic calligraphy design from text.
         Includes signature, deep text analysis, calligraphy, and integrated background.
@@ -77,48 +75,41 @@ class GoogleDesignService:
         """
 
         try:
-            def run_fal():
-                return fal_client.subscribe(
+            with metrics.DESIGN_SECONDS.time(provider="google"):
+                result = await fal_queue.run(
                     self.model_endpoint,
-                    arguments={
+                    {
                         "prompt": prompt,
                         "image_size": "portrait_4_3",
                         "num_inference_steps": 50,  # high detail
                         "guidance_scale": 5.0,      # balance creativity & adherence
                         "enable_safety_checker": True
-                    },
-                    with_logs=True
+                    }
                 )
 
-            result = await asyncio.to_thread(run_fal)
-
             if result and "images" in result and len(result["images"]) > 0:
                 image_url = result["images"][0]["url"]
                 return await self._download_image(image_url, message_id)
 
             logger.warning("⚠️ Gemini returned no images.")
+            metrics.DESIGN_FAILURES.inc(provider="google")
             return None
 
         except Exception as e:
+            metrics.DESIGN_FAILURES.inc(provider="google")
             logger.error(f"❌ PRO Design generation failed: {e}")
             return None
 
-    async def _download_image(self, url: str, message_id: int) -> str:
+    async def _download_image(self, url: str, message_id: int) -> bytes:
         """
-        Download the generated image and save locally.
+        Download the generated image and re-encode it within the upload budget (kept in memory).
         """
         try:
-            def download():
-                response = requests.get(url, timeout=60)
-                if response.status_code == 200:
-                    output_dir = "/app/data"
-                    os.makedirs(output_dir, exist_ok=True)
-                    output_path = os.path.join(output_dir, f"pro_{message_id}.png")
-                    with open(output_path, "wb") as f:
-                        f.write(response.content)
-                    return output_path
+            data, _ = await fal_queue.download(url)
+            if not data:
                 return None
-            return await asyncio.to_thread(download)
+            # مخرجات Gemini صورة PNG كبيرة: نصغرها ونرمزها قبل الرفع
+            return await image_encoder.encode_async(data)
         except Exception as e:
             logger.error(f"❌ Download Error: {e}")
             return None
\ No newline at end of file
@@ -1,10 +1,12 @@
 # --- START OF FILE src/services/huggingface_design.py ---
 import logging
-import os
 import asyncio
 from huggingface_hub import InferenceClient
 from PIL import Image
 from src.config import settings
+from src.services import metrics
+from src.utils.images import image_to_data_url, image_to_bytes
+from src.services.container import services
 
 logger = logging.getLogger("HuggingFaceDesign")
 
@@ -21,38 +23,49 @@ class HuggingFaceDesignService:
         else:
             logger.warning("⚠️ Token Missing.")
 
-    async def generate_design(self, text: str, message_id: int) -> str:
-        if not self.client: return None
-
-        logger.info(f"🎨 AI Imagining (SDXL): {text[:30]}...")
-
+    async def generate_design(self, text: str, message_id: int) -> bytes:
         # تحسين هندسة الأمر ليتناسب مع SDXL
         # يفضل دائماً استخدام وصف "Soft, Cinematic, Arabic Art"
         prompt = f"Islamic art poster, cinematic lighting, soft colors, beige and gold palette, arabic calligraphy concept, masterpiece, 8k resolution, highly detailed background for text: {text}"
+        image = await self._generate_image(prompt)
+        return await asyncio.to_thread(image_to_bytes, image) if image else None
+
+    async def generate_background_b64(self, text: str, mood: str = None) -> str:
+        """نفس واجهة FalDesignService (للموجّه): خلفية كـ data URL بدون ملفات"""
+        # خلفية فقط: المزاج يقود الصورة، والنص نفسه لا يُرسل (وإلا ظهرت حروف تحت البطاقة)
+        prompt = (
+            f"Abstract artistic background, mood: {mood or services.mood_classifier.classify(text)}. "
+            "Cinematic, soft focus, elegant, professional color grading, balanced empty composition. "
+            "No text, no letters, no calligraphy, no logos, no watermarks, no people."
+        )
+        image = await self._generate_image(prompt, negative_prompt="text, letters, calligraphy, writing, watermark, logo")
+        return await asyncio.to_thread(image_to_data_url, image) if image else None
+
+    async def _generate_image(self, prompt: str, negative_prompt: str = None):
+        if not self.client: return None
+
+        logger.info(f"🎨 AI Imagining (SDXL): {prompt[:40]}...")
 
         try:
             def call_api():
                 return self.client.text_to_image(
                     prompt=prompt,
+                    negative_prompt=negative_prompt,
                     model=self.model_name
                 )
 
-            # مهلة 45 ثانية لأن SDXL قد يأخذ وقتاً للإبداع
-            image = await asyncio.wait_for(
-                asyncio.to_thread(call_api),
-                timeout=45.0
-            )
+            # المهلة يحددها DesignRouter (DESIGN_TIMEOUT) لجميع المزودين
+            with metrics.DESIGN_SECONDS.time(provider="hf_sdxl"):
+                image = await asyncio.to_thread(call_api)
             
             if image:
-                output_dir = "/app/data"
-                os.makedirs(output_dir, exist_ok=True)
-                output_path = os.path.join(output_dir, f"sdxl_{message_id}.png")
-                image.save(output_path)
                 logger.info("✅ SDXL Image Generated Successfully.")
-                return output_path
+                return image
             
+            metrics.DESIGN_FAILURES.inc(provider="hf_sdxl")
             return None
 
         except Exception as e:
+            metrics.DESIGN_FAILURES.inc(provider="hf_sdxl")
             logger.error(f"❌ AI Error: {e}")
             return None
\ No newline at end of file
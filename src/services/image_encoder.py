@@ -0,0 +1,67 @@
+import asyncio
+import io
+import logging
+from PIL import Image
+from src.config import settings
+
+logger = logging.getLogger("ImageEncoder")
+
+class ImageEncoder:
+    """
+    ترميز الصورة النهائية قبل الرفع:
+    - تصغير مخرجات النماذج الكبيرة إلى IMAGE_MAX_SIDE
+    - حذف البيانات الوصفية (EXIF/ICC/نصوص PNG)
+    - أعلى جودة ممكنة ضمن ميزانية IMAGE_MAX_BYTES (بحث ثنائي)
+    """
+    def __init__(self):
+        self.format = settings.IMAGE_FORMAT.lower()
+        self.max_bytes = settings.IMAGE_MAX_BYTES
+        self.max_side = settings.IMAGE_MAX_SIDE
+        self.min_quality = settings.IMAGE_MIN_QUALITY
+        self.max_quality = settings.IMAGE_MAX_QUALITY
+        self.progressive = settings.IMAGE_PROGRESSIVE
+
+    @property
+    def extension(self) -> str:
+        return "webp" if self.format == "webp" else "jpg"
+
+    def _save(self, img: Image.Image, quality: int) -> bytes:
+        buf = io.BytesIO()
+        if self.format == "webp":
+            img.save(buf, format="WEBP", quality=quality, method=4)
+        else:
+            img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=self.progressive)
+        return buf.getvalue()
+
+    def encode(self, data: bytes) -> bytes:
+        """عملية CPU متزامنة - استخدم encode_async من داخل الحلقة"""
+        src = Image.open(io.BytesIO(data))
+        # نسخة جديدة بدون أي بيانات وصفية
+        img = src.convert("RGB")
+        if max(img.size) > self.max_side:
+            img.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+
+        best = self._save(img, self.max_quality)
+        if len(best) <= self.max_bytes:
+            return best
+
+        # بحث ثنائي عن أعلى جودة ضمن الميزانية
+        lo, hi = self.min_quality, self.max_quality - 1
+        best = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            out = self._save(img, mid)
+            if len(out) <= self.max_bytes:
+                best, lo = out, mid + 1
+            else:
+                hi = mid - 1
+
+        if best is None:
+            best = self._save(img, self.min_quality)
+            logger.warning(f"⚠️ Image exceeds budget even at q={self.min_quality} ({len(best)} bytes)")
+        return best
+
+    async def encode_async(self, data: bytes) -> bytes:
+        return await asyncio.to_thread(self.encode, data)
+
+image_encoder = ImageEncoder()
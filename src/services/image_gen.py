@@ -1,18 +1,24 @@
 import os
+import base64
+import asyncio
 import logging
 import random
 from playwright.async_api import async_playwright
 from jinja2 import Environment, FileSystemLoader
 from src.config import settings
+from src.services import metrics
+from src.services.image_encoder import image_encoder
+from src.services.text_fit import text_fitter, TextOverflow, FONT_PATH, FONT_WEIGHT
+from src.services.container import services
 
 logger = logging.getLogger("HtmlRenderer")
 
 class ImageGenerator:
     def __init__(self):
-        self.output_dir = "/app/data"
         self.template_dir = "/app/templates"
-        os.makedirs(self.output_dir, exist_ok=True)
         self._create_template()
+        self.env = Environment(loader=FileSystemLoader(self.template_dir))
+        self.font_src = self._font_src()
         
         self.fallback_gradients = [
             "linear-gradient(135deg, #1e3c72 0%, #2a5298 100%)",
@@ -21,18 +27,15 @@ class ImageGenerator:
             "linear-gradient(135deg, #141E30 0%, #243B55 100%)"
         ]
 
-    def _calculate_font_size(self, text: str) -> int:
-        """حساب ذكي لحجم الخط بناءً على الطول والأسطر"""
-        length = len(text)
-        lines = text.count('\n') + 1
-        
-        # معادلة الأمان: كلما زادت الأسطر، صغر الخط إجبارياً
-        if lines > 10 or length > 400: return 40
-        if lines > 8 or length > 300: return 50
-        if lines > 6 or length > 200: return 60
-        if lines > 4 or length > 100: return 75
-        if length < 50: return 95 # نصوص قصيرة جداً
-        return 80
+    @staticmethod
+    def _font_src() -> str:
+        """خط البطاقة المرفق كـ data URL (الصفحة تُحمّل بـ set_content فلا يمكنها قراءة file://)"""
+        try:
+            with open(FONT_PATH, "rb") as f:
+                return "data:font/ttf;base64," + base64.b64encode(f.read()).decode()
+        except Exception as e:
+            logger.error(f"❌ Could not load card font {FONT_PATH}: {e}")
+            return ""
 
     def _create_template(self):
         os.makedirs(self.template_dir, exist_ok=True)
@@ -43,7 +46,14 @@ class ImageGenerator:
         <head>
             <meta charset="UTF-8">
             <style>
-                @import url('https://fonts.googleapis.com/css2?family=Amiri:wght@400;700&family=Reem+Kufi:wght@500;700&display=swap');
+                @import url('https://fonts.googleapis.com/css2?family=Reem+Kufi:wght@500;700&display=swap');
+
+                /* نفس الملف الذي يقيس به TextFitter (بدون تسميك صناعي) */
+                @font-face {
+                    font-family: 'CardAmiri';
+                    src: url('{{ font_src }}') format('truetype');
+                    font-weight: {{ font_weight }};
+                }
                 
                 * { box-sizing: border-box; }
 
@@ -52,7 +62,8 @@ class ImageGenerator:
                     padding: 0;
                     width: 1080px;
                     height: 1440px;
-                    font-family: 'Amiri', serif;
+                    font-family: 'CardAmiri', serif;
+                    font-synthesis: none;
                     background-color: #000;
                     background: {{ bg_css }};
                     background-size: cover;
@@ -88,16 +99,15 @@ class ImageGenerator:
 
                 .text-body {
                     font-size: {{ font_size }}px;
-                    font-weight: 700;
+                    font-weight: {{ font_weight }};
                     line-height: 1.7;
                     color: #ffffff;
                     text-shadow: 0 4px 15px rgba(0,0,0,1);
                     white-space: pre-wrap;
                     
-                    /* في حال كان النص طويلاً جداً، لا يخرج بل يظهر نقاط (أمان إضافي) */
+                    /* TextFitter يرفض النص الذي لا يتسع، فهذا أمان إضافي فقط */
                     max-height: 1000px;
                     overflow: hidden;
-                    text-overflow: ellipsis;
                 }
 
                 .footer {
@@ -110,7 +120,7 @@ class ImageGenerator:
                 }
 
                 .channel-name {
-                    font-family: 'Amiri', serif;
+                    font-family: 'CardAmiri', serif;
                     font-size: 30px;
                     color: #e0e0e0;
                     text-shadow: 0 2px 5px rgba(0,0,0,1);
@@ -144,32 +154,84 @@ class ImageGenerator:
         with open(os.path.join(self.template_dir, "card.html"), "w") as f:
             f.write(html_content)
 
-    async def render(self, text: str, message_id: int, bg_data: str = None) -> str:
+    def _build_html(self, text: str, bg_data: str = None) -> str:
         if bg_data and bg_data.startswith("data:image"):
             bg_css = f"url('{bg_data}')"
         else:
             bg_css = random.choice(self.fallback_gradients)
 
-        # استخدام المعادلة الذكية
-        font_size = self._calculate_font_size(text)
+        # أكبر حجم يتسع فيه النص فعلياً (قياس أعراض الكلمات بخط القالب)
+        fit = text_fitter.fit(text)
+        if fit.overflow:
+            raise TextOverflow(f"text does not fit even at {fit.size}px")
 
-        env = Environment(loader=FileSystemLoader(self.template_dir))
-        template = env.get_template("card.html")
+        template = self.env.get_template("card.html")
         
-        html_out = template.render(
+        return template.render(
             text=text, 
-            font_size=font_size, 
+            font_size=fit.size, 
+            font_weight=FONT_WEIGHT,
+            font_src=self.font_src,
             bg_css=bg_css
         )
-        
-        output_path = os.path.join(self.output_dir, f"card_{message_id}.jpg")
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(args=['--no-sandbox'])
-            page = await browser.new_page(viewport={'width': 1080, 'height': 1440})
+    async def _shoot(self, browser, html_out: str) -> bytes:
+        page = await browser.new_page(viewport={'width': 1080, 'height': 1440})
+        try:
             await page.set_content(html_out)
             await page.wait_for_timeout(1000)
-            await page.screenshot(path=output_path, type='jpeg', quality=95)
-            await browser.close()
-            
-        return output_path
\ No newline at end of file
+            # لقطة بدون فقد (PNG) ثم ترميز واحد ضمن ميزانية الحجم
+            return await page.screenshot(type='png')
+        finally:
+            await page.close()
+
+    async def _encode(self, raw: bytes) -> bytes:
+        with metrics.ENCODE_SECONDS.time():
+            encoded = await image_encoder.encode_async(raw)
+        metrics.ENCODED_BYTES.observe(len(encoded))
+        return encoded
+
+    async def _background(self, text: str, bg_data: str = None) -> str:
+        """بدون خلفية من المزودين: خلفية محلية ثابتة لكل نص بدل التدرجات الأربعة"""
+        if bg_data or not settings.PROCEDURAL_FALLBACK: return bg_data
+        try:
+            return await services.procedural_bg.generate_background_b64(text)
+        except Exception as e:
+            logger.warning(f"⚠️ Procedural background failed: {e}")
+            return None
+
+    async def render(self, text: str, message_id: int, bg_data: str = None) -> bytes:
+        """البطاقة مرمزة وجاهزة للرفع (بايتات في الذاكرة). TextOverflow إذا لم يتسع النص"""
+        html_out = self._build_html(text, await self._background(text, bg_data))
+
+        with metrics.RENDER_SECONDS.time():
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(args=['--no-sandbox'])
+                raw = await self._shoot(browser, html_out)
+                await browser.close()
+
+        return await self._encode(raw)
+
+    async def render_many(self, items: list, concurrency: int = None) -> list:
+        """
+        رسم عدة بطاقات على متصفح واحد مشترك (بدل تشغيل متصفح لكل بطاقة).
+        items: قائمة (text, message_id, bg_data) - النتيجة بنفس الترتيب، None للبطاقة الفاشلة.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_RENDER_CONCURRENCY)
+
+        async def one(browser, text, message_id, bg_data):
+            async with semaphore:
+                try:
+                    with metrics.RENDER_SECONDS.time():
+                        raw = await self._shoot(browser, self._build_html(text, await self._background(text, bg_data)))
+                    return await self._encode(raw)
+                except Exception as e:
+                    logger.error(f"❌ Batch render failed for {message_id}: {e}")
+                    return None
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(args=['--no-sandbox'])
+            try:
+                return await asyncio.gather(*(one(browser, *item) for item in items))
+            finally:
+                await browser.close()
@@ -0,0 +1,92 @@
+import logging
+from datetime import datetime, timedelta, date
+from sqlalchemy import text
+from src.database import engine
+from src.config import settings
+
+logger = logging.getLogger("LogPartitions")
+
+class LogPartitionService:
+    """
+    إدارة الأقسام اليومية لجدول broadcast_logs:
+    - إنشاء أقسام الأيام القادمة مسبقاً (حتى لا يفشل أي إدخال)
+    - حذف الأقسام المنتهية دفعة واحدة (DROP TABLE) بدل DELETE بطيء
+    """
+    PARENT = "broadcast_logs"
+    LEGACY = "broadcast_logs_legacy"
+
+    def __init__(self):
+        self.retention_days = settings.BROADCAST_LOG_RETENTION_DAYS
+        self.premake_days = settings.BROADCAST_LOG_PREMAKE_DAYS
+
+    def _partition_name(self, day: date) -> str:
+        return f"{self.PARENT}_p{day.strftime('%Y%m%d')}"
+
+    def _parse_day(self, name: str):
+        try:
+            return datetime.strptime(name.rsplit("_p", 1)[1], "%Y%m%d").date()
+        except (IndexError, ValueError):
+            return None
+
+    async def maintain(self) -> dict:
+        """تُستدعى عند البدء ودورياً من job_queue"""
+        stats = {"created": 0, "dropped": 0, "imported": 0}
+        if engine.dialect.name != "postgresql":
+            return stats
+
+        today = datetime.utcnow().date()
+        cutoff = today - timedelta(days=self.retention_days)
+
+        async with engine.begin() as conn:
+            existing = await self._list_partitions(conn)
+
+            # 1. إنشاء الأقسام (اليوم + الأيام القادمة)
+            first_day = today
+            has_legacy = await conn.scalar(text(f"SELECT to_regclass('{self.LEGACY}') IS NOT NULL"))
+            if has_legacy:
+                # عند الترحيل نحتاج أقساماً تغطي كامل نافذة الاحتفاظ
+                first_day = cutoff
+
+            day = first_day
+            while day <= today + timedelta(days=self.premake_days):
+                name = self._partition_name(day)
+                if name not in existing:
+                    await conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self.PARENT} "
+                        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                    ))
+                    existing.add(name)
+                    stats["created"] += 1
+                day += timedelta(days=1)
+
+            # 2. ترحيل السجلات الحديثة من الجدول القديم (مرة واحدة فقط)
+            if has_legacy:
+                result = await conn.execute(text(
+                    f"INSERT INTO {self.PARENT} (source_msg_id, target_chat_id, target_msg_id, created_at) "
+                    f"SELECT source_msg_id, target_chat_id, target_msg_id, created_at FROM {self.LEGACY} "
+                    f"WHERE created_at >= :start AND created_at < :end"
+                ), {"start": datetime.combine(cutoff, datetime.min.time()), "end": datetime.combine(day, datetime.min.time())})
+                stats["imported"] = result.rowcount or 0
+                await conn.execute(text(f"DROP TABLE {self.LEGACY}"))
+
+            # 3. حذف الأقسام الأقدم من مدة الاحتفاظ
+            for name in sorted(existing):
+                part_day = self._parse_day(name)
+                if part_day and part_day < cutoff:
+                    await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    stats["dropped"] += 1
+
+        if any(stats.values()):
+            logger.info(f"🗂️ Log partitions: +{stats['created']} / -{stats['dropped']} (imported {stats['imported']} legacy rows)")
+        return stats
+
+    async def _list_partitions(self, conn) -> set:
+        rows = await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {"parent": self.PARENT})
+        return {r[0] for r in rows}
+
+log_partitions = LogPartitionService()
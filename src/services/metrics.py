@@ -0,0 +1,219 @@
+import bisect
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("Metrics")
+
+# حدود الـ Histogram الافتراضية (بالثواني) - تغطي من إرسال رسالة حتى توليد تصميم
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+def _label_key(labelnames, labels: dict) -> tuple:
+    return tuple(str(labels.get(n, "")) for n in labelnames)
+
+def _fmt_labels(labelnames, key: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(labelnames, key)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, doc, labelnames=()):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        for key, v in self._values.items():
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {v}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[_label_key(self.labelnames, labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS, window=512):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.window = window
+        self._series = {}  # key -> [counts, sum, count, recent]
+
+    def _get(self, key):
+        s = self._series.get(key)
+        if s is None:
+            s = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, deque(maxlen=self.window)]
+        return s
+
+    def observe(self, value: float, **labels):
+        s = self._get(_label_key(self.labelnames, labels))
+        s[0][bisect.bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+        s[3].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantiles(self, *qs, **labels):
+        """نسب مئوية تقريبية من آخر N قياس (للعرض في تيليجرام)"""
+        s = self._series.get(_label_key(self.labelnames, labels))
+        if not s or not s[3]: return [None] * len(qs)
+        data = sorted(s[3])
+        return [data[min(len(data) - 1, int(q * len(data)))] for q in qs]
+
+    def series(self):
+        for key, s in self._series.items():
+            yield dict(zip(self.labelnames, key)), s[2], s[1]
+
+    def samples(self):
+        for key, (counts, total, count, _) in self._series.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                yield f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {count}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc, labelnames=()):
+        return self._register(Counter(name, doc, labelnames))
+
+    def gauge(self, name, doc, labelnames=()):
+        return self._register(Gauge(name, doc, labelnames))
+
+    def histogram(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        """صيغة Prometheus النصية"""
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.doc}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """ملخص مختصر للمدير"""
+        lines = []
+        for m in self._metrics:
+            if isinstance(m, Histogram):
+                for labels, count, total in m.series():
+                    p50, p95 = m.quantiles(0.5, 0.95, **labels)
+                    tag = ",".join(f"{v}" for v in labels.values() if v)
+                    lines.append(f"⏱️ {m.name}{f'[{tag}]' if tag else ''}: n={count} p50={p50:.3f}s p95={p95:.3f}s")
+            else:
+                for key, v in m._values.items():
+                    tag = ",".join(k for k in key if k)
+                    lines.append(f"🔢 {m.name}{f'[{tag}]' if tag else ''}: {v:g}")
+        return "\n".join(lines) or "لا توجد قياسات بعد."
+
+registry = MetricsRegistry()
+
+# --- البث ---
+BROADCAST_SENDS = registry.counter("broadcast_sends_total", "copy_message results", ["result"])
+BROADCAST_RETRY_AFTER = registry.counter("broadcast_retry_after_total", "RetryAfter responses received")
+BROADCAST_RETRY_SLEEP = registry.counter("broadcast_retry_after_sleep_seconds_total", "Seconds slept because of RetryAfter")
+BROADCAST_BATCH_SECONDS = registry.histogram("broadcast_batch_seconds", "Duration of one _send_batch call")
+BROADCAST_SECONDS = registry.histogram("broadcast_duration_seconds", "Duration of a full fan-out per recipient kind", ["kind"])
+BROADCAST_EDITS = registry.counter("broadcast_edits_total", "Edit propagation results", ["result"])
+BROADCAST_RATE = registry.gauge("broadcast_last_rate_per_second", "Successful sends per second in the last fan-out", ["kind"])
+
+BOT_API_SECONDS = registry.histogram("bot_api_seconds", "Bot API request duration per transport and method", ["transport", "method"])
+
+# --- فلتر المجموعات ---
+FILTER_VERDICTS = registry.counter("filter_verdicts_total", "Group message filter results", ["result", "cache"])
+FILTER_SECONDS = registry.histogram("filter_seconds", "Group message filter duration",
+                                    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01))
+
+# --- التصميم والرسم ---
+DESIGN_SECONDS = registry.histogram("design_seconds", "Image model call duration", ["provider"])
+DESIGN_FAILURES = registry.counter("design_failures_total", "Failed or empty image model calls", ["provider"])
+DESIGN_ROUTED = registry.counter("design_routed_total", "Router results served per provider", ["provider"])
+DESIGN_HEDGES = registry.counter("design_hedges_total", "Hedged second requests fired", ["provider"])
+DESIGN_CIRCUIT_OPEN = registry.counter("design_circuit_open_total", "Circuit breaker trips", ["provider"])
+RENDER_SECONDS = registry.histogram("render_seconds", "Chromium card render duration")
+TEXT_FIT_OVERFLOW = registry.counter("text_fit_overflow_total", "Cards whose text exceeds the safe zone at the minimum font size")
+ENCODE_SECONDS = registry.histogram("encode_seconds", "Output image encoding duration")
+ENCODED_BYTES = registry.histogram("encoded_bytes", "Encoded upload size in bytes",
+                                   buckets=(50_000, 100_000, 200_000, 300_000, 450_000, 700_000, 1_000_000, 2_000_000))
+
+# --- خط المعالجة ---
+PIPELINE_QUEUE_DEPTH = registry.gauge("pipeline_queue_depth", "Jobs waiting per stage", ["stage"])
+PIPELINE_WAIT_SECONDS = registry.histogram("pipeline_wait_seconds", "Time a job waited in a stage queue", ["stage"])
+
+# --- قاعدة البيانات ---
+DB_QUERY_SECONDS = registry.histogram("db_query_seconds", "SQL statement duration")
+DB_SESSIONS = registry.counter("db_sessions_total", "ORM transactions started")
+
+def instrument_engine(engine):
+    """ربط أحداث SQLAlchemy بمقاييس قاعدة البيانات"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if starts:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop())
+
+    # AsyncSession يعتمد داخلياً على Session المتزامنة
+    @event.listens_for(Session, "after_begin")
+    def _session_begin(session, transaction, connection):
+        DB_SESSIONS.inc()
+
+class MetricsServer:
+    """خادم HTTP محلي بسيط يعرض /metrics"""
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"📈 Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,69 @@
+import os
+import hashlib
+import logging
+import yaml
+from src.utils.arabic import normalize, stems
+from src.utils.text_match import AhoCorasick
+
+logger = logging.getLogger("MoodClassifier")
+
+class MoodClassifier:
+    """
+    تصنيف النص إلى مزاج خلفية (moods.yaml):
+    تطبيع + تجذيع خفيف للنص والكلمات، ثم مرور واحد لآلة Aho-Corasick على سلسلة الجذور.
+    الجذور تُحاط بمسافات حتى تطابق الكلمة كاملة (والعبارات متعددة الكلمات ممكنة).
+    النتيجة حتمية: نفس النص يعطي نفس المزاج، فتتكرر إصابة ذاكرة الخلفيات.
+    """
+    def __init__(self, filename="moods.yaml"):
+        self.filepath = os.path.join(os.path.dirname(__file__), "../resources", filename)
+        config = self._load_config()
+        self.prompts = {}        # اسم المزاج -> وصف الخلفية
+        self._weights = {}       # " جذر " -> [(مزاج, وزن)]
+        for name, spec in (config.get("moods") or {}).items():
+            self.prompts[name] = spec["prompt"]
+            for keyword, weight in (spec.get("keywords") or {}).items():
+                key = f" {' '.join(stems(str(keyword)))} "
+                self._weights.setdefault(key, []).append((name, float(weight)))
+        self._order = {name: i for i, name in enumerate(self.prompts)}
+        fallbacks = config.get("fallbacks") or {}
+        self.prompts.update(fallbacks)
+        self.fallbacks = list(fallbacks) or list(self.prompts)[:1]
+        self._names = {prompt: name for name, prompt in self.prompts.items()}   # وصف -> اسم
+        self._automaton = AhoCorasick(self._weights)
+
+    def _load_config(self) -> dict:
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.error(f"❌ Failed to load moods: {e}")
+            return {}
+
+    def scores(self, text: str) -> dict:
+        """مجموع أوزان كل مزاج في النص"""
+        totals = {}
+        for _, key in self._automaton.findall(f" {' '.join(stems(text))} "):
+            for name, weight in self._weights[key]:
+                totals[name] = totals.get(name, 0.0) + weight
+        return totals
+
+    def classify_name(self, text: str) -> str:
+        """اسم المزاج (مفتاح في moods.yaml)"""
+        totals = self.scores(text)
+        if totals:
+            return max(totals, key=lambda name: (totals[name], -self._order[name]))
+        if not self.fallbacks: return None
+        digest = hashlib.blake2b(normalize(text).encode(), digest_size=8).digest()
+        return self.fallbacks[int.from_bytes(digest, "big") % len(self.fallbacks)]
+
+    def classify(self, text: str) -> str:
+        """وصف الخلفية للمزاج (يُمرر للمزودين)"""
+        name = self.classify_name(text)
+        return self.prompts[name] if name else ""
+
+    def name_of(self, prompt: str):
+        """اسم المزاج من وصفه (المزودون يستلمون الوصف فقط)"""
+        return self._names.get(prompt)
+
+    def classify_many(self, texts) -> list:
+        return [self.classify(t) for t in texts]
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+from src.config import settings
+from src.services import metrics
+
+logger = logging.getLogger("PostPipeline")
+
+@dataclass
+class PostJob:
+    """منشور يمر عبر مراحل التصميم ثم النشر"""
+    kind: str                         # "design" | "pro" | "publish" | "edit"
+    message_id: int                   # المنشور الأصلي (مفتاح التتبع)
+    bot: Any = None
+    text: Optional[str] = None
+    publish_id: Optional[int] = None  # الرسالة التي ستوزع فعلاً
+    segment: Any = None               # شريحة المستلمين (None = الجميع)
+    run_at: Any = None                # جدولة بدل البث الفوري (منشور معلّق + /at)
+    scheduled_id: Optional[int] = None  # منشور مجدول حان موعده (يُعلّم sent بعد البث)
+    album: Optional[list] = None      # عناصر الألبوم (publish_id = أولها)
+    message: Any = None               # الرسالة المعدلة (لمهام edit)
+    cleanup: list = field(default_factory=list)  # رسائل تُحذف بعد النشر (مثل أمر /pro)
+    profiler: Any = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+class Stage:
+    """مرحلة بطابور محدود وعدد ثابت من العمال، تمرر نتيجتها للمرحلة التالية"""
+    def __init__(self, name: str, handler: Callable[[PostJob], Awaitable[Optional[PostJob]]],
+                 maxsize: int, workers: int, next_stage: "Stage" = None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.next_stage = next_stage
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks = []
+
+    def put_nowait(self, job: PostJob):
+        job.enqueued_at = time.perf_counter()
+        self.queue.put_nowait(job)
+        metrics.PIPELINE_QUEUE_DEPTH.set(self.queue.qsize(), stage=self.name)
+
+    async def put(self, job: PostJob):
+        job.enqueued_at = time.perf_counter()
+        await self.queue.put(job)
+        metrics.PIPELINE_QUEUE_DEPTH.set(self.queue.qsize(), stage=self.name)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(i), name=f"{self.name}-{i}") for i in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks: t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self.queue.get()
+            metrics.PIPELINE_QUEUE_DEPTH.set(self.queue.qsize(), stage=self.name)
+            metrics.PIPELINE_WAIT_SECONDS.observe(time.perf_counter() - job.enqueued_at, stage=self.name)
+            try:
+                result = await self.handler(job)
+                if result is not None and self.next_stage:
+                    # ضغط عكسي: ننتظر إذا امتلأ طابور المرحلة التالية
+                    await self.next_stage.put(result)
+            except Exception as e:
+                logger.error(f"❌ Stage '{self.name}' failed for {job.message_id}: {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+
+class PostPipeline:
+    """
+    معالج التحديث يضع المنشور في الطابور ويعود فوراً،
+    مرحلة التصميم تنتج البطاقة، ومرحلة النشر تسلمها للموزع.
+    """
+    def __init__(self, design_handler, publish_handler):
+        self.publish = Stage("publish", publish_handler, settings.PUBLISH_QUEUE_SIZE, settings.PUBLISH_WORKERS)
+        self.design = Stage("design", design_handler, settings.DESIGN_QUEUE_SIZE, settings.DESIGN_WORKERS, next_stage=self.publish)
+
+    def submit(self, job: PostJob) -> bool:
+        """يرجع False إذا كان الطابور ممتلئاً (يقرر المستدعي البديل)"""
+        stage = self.publish if job.kind in ("publish", "edit") else self.design
+        try:
+            stage.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"⚠️ {stage.name} queue full, job {job.message_id} rejected.")
+            return False
+
+    async def start(self):
+        self.design.start()
+        self.publish.start()
+        logger.info(f"🧵 Pipeline started (design x{self.design.workers}, publish x{self.publish.workers})")
+
+    async def stop(self):
+        await self.design.stop()
+        await self.publish.stop()
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+from src.config import settings
+from src.services import metrics
+from src.services.container import services
+from src.utils.images import image_to_data_url
+
+logger = logging.getLogger("ProceduralBackground")
+
+WIDTH, HEIGHT = 1080, 1440
+SCALE = 2   # الحساب بنصف الدقة ثم تكبير bicubic (الخلفية ناعمة أصلاً، والزمن ربع)
+
+# لوحات الألوان حسب اسم المزاج في moods.yaml: (أعلى التدرج, أسفله, لون الإضاءات والزخرفة)
+PALETTES = {
+    "dawn":     ((250, 196, 140), (96, 60, 110), (255, 236, 190)),
+    "night":    ((10, 18, 48), (2, 4, 14), (170, 190, 255)),
+    "nature":   ((34, 78, 70), (8, 28, 24), (190, 230, 170)),
+    "abstract": ((32, 92, 96), (18, 24, 32), (226, 196, 120)),
+    "vintage":  ((120, 88, 56), (36, 24, 16), (240, 210, 160)),
+    "fluid":    ((200, 200, 206), (70, 70, 78), (236, 214, 150)),
+}
+
+class ProceduralBackgroundService:
+    """
+    خلفيات مجردة محلية بدون شبكة أو GPU (NumPy + Pillow):
+    تدرج بزاوية عشوائية + حقل ضوضاء ناعم + بقع ضوء (bokeh) + زخرفة نجمة ثمانية متكررة.
+    البذرة من بصمة النص والمزاج: نفس النص = نفس الخلفية، والنتيجة تُحفظ في ذاكرة LRU.
+    """
+    def __init__(self):
+        self._cache = OrderedDict()
+
+    async def generate_background_b64(self, text: str, mood: str = None) -> str:
+        """نفس واجهة FalDesignService (للموجّه): خلفية كـ data URL"""
+        mood = mood or services.mood_classifier.classify(text)
+        key = hashlib.blake2b(f"{mood}\n{text}".encode(), digest_size=8).digest()
+        cached = self._cache.get(key)
+        if cached:
+            self._cache.move_to_end(key)
+            return cached
+
+        with metrics.DESIGN_SECONDS.time(provider="procedural"):
+            data_url = await asyncio.to_thread(self._render_data_url, int.from_bytes(key, "big"), mood)
+        self._cache[key] = data_url
+        if len(self._cache) > settings.PROCEDURAL_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return data_url
+
+    def _render_data_url(self, seed: int, mood: str) -> str:
+        return image_to_data_url(self.render(seed, mood), quality=88)
+
+    def render(self, seed: int, mood: str) -> Image.Image:
+        rng = np.random.default_rng(seed)
+        top, bottom, accent = (np.array(c, dtype=np.float32) / 255 for c in self._palette(mood, rng))
+        w, h = WIDTH // SCALE, HEIGHT // SCALE
+        # إحداثيات قابلة للبث (عمود × صف) بدل شبكة كاملة لكل محور
+        py, px = np.ogrid[0:h, 0:w]
+        px, py = px.astype(np.float32), py.astype(np.float32)
+        x, y = (px - w / 2) / (w / 2), (py - h / 2) / (w / 2)
+
+        # 1. تدرج خطي بزاوية عشوائية
+        angle = rng.uniform(-0.6, 0.6) + np.pi / 2
+        t = x * np.float32(np.cos(angle)) + y * np.float32(np.sin(angle))
+        t = np.clip(t / np.abs(t).max() * 0.5 + 0.5, 0, 1)
+
+        # 2. حقل ضوضاء ناعم (شبكة عشوائية صغيرة مكبرة بتنعيم) يكسر رتابة التدرج
+        shade = 0.85 + 0.3 * self._noise(rng, (w, h), 12, 16)
+
+        # 3. تعتيم الحواف (مثل طبقة القالب السينمائية)
+        shade *= 1 - 0.35 * np.clip(np.sqrt(x * x + (y * w / h) ** 2) - 0.4, 0, 1)
+
+        # 4. زخرفة نجمة ثمانية (خاتم سليمان) بخطوط خافتة
+        cell = rng.choice((120, 144, 180)) / SCALE
+        pattern = self._star_tiling(px, py, cell, rng.uniform(0, 1, 2).astype(np.float32))
+        pattern *= np.float32(rng.uniform(0.08, 0.16))
+
+        # 5. بقع ضوء (bokeh)
+        glow = self._bokeh(rng, (w, h)) * np.float32(0.6)
+
+        # تركيب القنوات: لكل قناة عمليات ثنائية الأبعاد فقط
+        channels = []
+        for c in range(3):
+            base = (top[c] + (bottom[c] - top[c]) * t) * shade
+            base += (accent[c] - base) * pattern
+            base += accent[c] * glow
+            channels.append(Image.fromarray((np.clip(base, 0, 1) * 255).astype(np.uint8), "L"))
+        return Image.merge("RGB", channels).resize((WIDTH, HEIGHT), Image.BICUBIC)
+
+    @staticmethod
+    def _palette(mood: str, rng):
+        palette = PALETTES.get(services.mood_classifier.name_of(mood))
+        if palette: return palette
+        names = sorted(PALETTES)
+        return PALETTES[names[rng.integers(len(names))]]
+
+    @staticmethod
+    def _noise(rng, size, gw: int, gh: int) -> np.ndarray:
+        """ضوضاء قيمية: شبكة gw×gh عشوائية مكبرة بتكبير bicubic (قيم 0..1)"""
+        grid = Image.fromarray((rng.random((gh, gw)) * 255).astype(np.uint8), "L")
+        return np.asarray(grid.resize(size, Image.BICUBIC), dtype=np.float32) / 255
+
+    @staticmethod
+    def _star_tiling(x, y, cell: int, phase) -> np.ndarray:
+        """
+        نجمة ثمانية في كل خلية = اتحاد مربع ومربع مدار 45°.
+        المسافة للنجمة = أصغر المسافتين (مسافة Chebyshev)، والخط حيث تقترب من نصف القطر.
+        """
+        u = (x / cell + phase[0]) % 1 - 0.5
+        v = (y / cell + phase[1]) % 1 - 0.5
+        square = np.maximum(np.abs(u), np.abs(v))
+        diamond = np.maximum(np.abs(u + v), np.abs(u - v)) / np.sqrt(2)
+        star = np.minimum(square, diamond)
+        width = np.float32(1.2 / cell)
+        line = np.clip(1 - np.abs(star - 0.3) / width, 0, 1)
+        frame = np.clip(1 - (0.5 - square) / width, 0, 1)   # حدود الخلية
+        return np.maximum(line, frame * 0.6)
+
+    @staticmethod
+    def _bokeh(rng, size) -> np.ndarray:
+        """دوائر ضوء مرسومة بربع الدقة ثم مموهة ومكبرة (أرخص من التمويه بالدقة الكاملة)"""
+        w, h = WIDTH // 4, HEIGHT // 4
+        layer = Image.new("L", (w, h), 0)
+        draw = ImageDraw.Draw(layer)
+        for _ in range(int(rng.integers(12, 28))):
+            cx, cy = rng.uniform(0, w), rng.uniform(0, h)
+            radius = rng.uniform(4, 22)
+            draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), fill=int(rng.uniform(40, 150)))
+        layer = layer.filter(ImageFilter.GaussianBlur(3)).resize(size, Image.BILINEAR)
+        return np.asarray(layer, dtype=np.float32) / 255
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+import redis.asyncio as redis
+from sqlalchemy import select
+from src.database import AsyncSessionLocal
+from src.config import settings
+from src.services.segments import KINDS
+
+logger = logging.getLogger("RecipientSnapshot")
+
+class RecipientSnapshot:
+    """
+    معرفات المستلمين النشطين لكل نوع (users / channels / groups) كمصفوفة int64 مرتبة في الذاكرة.
+    - البث الكامل يقرأ منها مباشرة (بدون أي استعلام)
+    - تُحدَّث تدريجياً (انضمام، مغادرة، حظر) وتُحفظ في Redis لإعادة التشغيل السريع
+    - تُعاد بناؤها من قاعدة البيانات عند الطلب أو دورياً (لتصحيح أي انحراف)
+    """
+    def __init__(self):
+        self.redis = redis.from_url(settings.REDIS_URL)
+        self._ids = {kind: array("q") for kind in KINDS}
+        self._dirty = set()
+        self._flush_task = None
+        self._journal = None   # تغييرات تصل أثناء إعادة البناء (تُعاد بعد التبديل)
+        self.ready = False
+        self.built_at = None
+
+    # --- القراءة ---
+    def ids(self, kind: str) -> array:
+        """نسخة ثابتة (البث لا يتأثر بالتعديلات أثناءه)"""
+        return array("q", self._ids[kind])
+
+    def count(self, kind: str = None) -> int:
+        if kind: return len(self._ids[kind])
+        return sum(len(a) for a in self._ids.values())
+
+    def contains(self, kind: str, chat_id: int) -> bool:
+        arr = self._ids[kind]
+        i = bisect_left(arr, chat_id)
+        return i < len(arr) and arr[i] == chat_id
+
+    # --- التحديث التدريجي ---
+    def add(self, kind: str, chat_id: int):
+        if self._journal is not None: self._journal.append((self.add, kind, chat_id))
+        arr = self._ids[kind]
+        i = bisect_left(arr, chat_id)
+        if i < len(arr) and arr[i] == chat_id: return
+        arr.insert(i, chat_id)
+        self._mark_dirty(kind)
+
+    def remove(self, kind: str, chat_id: int):
+        if self._journal is not None: self._journal.append((self.remove, kind, chat_id))
+        arr = self._ids[kind]
+        i = bisect_left(arr, chat_id)
+        if i < len(arr) and arr[i] == chat_id:
+            del arr[i]
+            self._mark_dirty(kind)
+
+    def _mark_dirty(self, kind: str):
+        if not self.ready: return  # لم تُحمّل بعد: البناء القادم سيلتقط التغيير
+        self._dirty.add(kind)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # تجميع التغييرات المتتالية (موجة انضمام) في كتابة واحدة
+        await asyncio.sleep(settings.RECIPIENT_SNAPSHOT_FLUSH_SECONDS)
+        await self.flush()
+
+    async def flush(self):
+        dirty, self._dirty = self._dirty, set()
+        if not dirty: return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for kind in dirty:
+                    pipe.set(f"recipients:{kind}", self._ids[kind].tobytes())
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Snapshot persist failed: {e}")
+            self._dirty |= dirty
+
+    # --- البناء والتحميل ---
+    async def rebuild(self) -> dict:
+        start = time.perf_counter()
+        fresh = {}
+        self._journal = []
+        try:
+            async with AsyncSessionLocal() as session:
+                for kind, (model, id_col, active_col, _) in KINDS.items():
+                    rows = await session.scalars(select(id_col).where(active_col == True).order_by(id_col))
+                    fresh[kind] = array("q", rows.all())
+        finally:
+            journal, self._journal = self._journal, None
+
+        self._ids = fresh
+        for op, kind, chat_id in journal:
+            op(kind, chat_id)
+        self.built_at = time.time()
+        self.ready = True
+        self._dirty = set(KINDS)
+        await self.flush()
+        await self.redis.set("recipients:built_at", self.built_at)
+
+        counts = {kind: len(arr) for kind, arr in fresh.items()}
+        logger.info(f"📇 Recipient snapshot rebuilt in {time.perf_counter() - start:.2f}s: {counts}")
+        return counts
+
+    async def load(self):
+        """التحميل من Redis عند التشغيل، أو البناء إذا كانت غائبة أو قديمة"""
+        try:
+            built_at = await self.redis.get("recipients:built_at")
+            max_age = settings.RECIPIENT_SNAPSHOT_MAX_AGE_HOURS * 3600
+            if built_at and time.time() - float(built_at) < max_age:
+                blobs = await self.redis.mget([f"recipients:{kind}" for kind in KINDS])
+                if all(b is not None for b in blobs):
+                    for kind, blob in zip(KINDS, blobs):
+                        arr = array("q")
+                        arr.frombytes(blob)
+                        self._ids[kind] = arr
+                    self.built_at = float(built_at)
+                    self.ready = True
+                    logger.info(f"📇 Recipient snapshot loaded from Redis ({self.count()} recipients).")
+                    return
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot load failed, rebuilding: {e}")
+        await self.rebuild()
+
+recipients = RecipientSnapshot()
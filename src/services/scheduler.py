@@ -0,0 +1,159 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from src.database import AsyncSessionLocal
+from src.models import ScheduledPost, BotUser, TelegramChannel, TelegramGroup
+from src.config import settings
+
+logger = logging.getLogger("PostScheduler")
+
+class PostScheduler:
+    """
+    جدولة دائمة للمنشورات: تُحفظ في قاعدة البيانات وتُحمّل في job_queue عند البدء.
+    المواعيد تُباعد تلقائياً بحيث لا يتداخل بثّان كبيران على نفس حد الإرسال.
+    """
+    def __init__(self, publish_fn):
+        self.publish_fn = publish_fn   # async (bot, message_id, scheduled_id) -> وضع الرسالة في طابور النشر
+        self.job_queue = None          # يُضبط في load() (للجدولة من خارج معالجات التحديث)
+        self._recipients = (0, 0.0)    # (العدد، وقت الحساب)
+
+    async def _recipient_count(self) -> int:
+        count, at = self._recipients
+        if time.monotonic() - at < 600: return count
+        async with AsyncSessionLocal() as session:
+            count = 0
+            for model in (BotUser, TelegramChannel, TelegramGroup):
+                count += await session.scalar(select(func.count()).select_from(model).where(model.is_active == True)) or 0
+        self._recipients = (count, time.monotonic())
+        return count
+
+    async def broadcast_gap(self) -> timedelta:
+        """المدة المتوقعة لبث كامل + هامش"""
+        seconds = await self._recipient_count() / settings.SCHEDULE_SEND_RATE
+        return timedelta(seconds=seconds + settings.SCHEDULE_MARGIN_SECONDS)
+
+    async def _free_slot(self, session, run_at: datetime) -> datetime:
+        gap = await self.broadcast_gap()
+        rows = await session.scalars(
+            select(ScheduledPost.run_at)
+            .where(ScheduledPost.status == "pending", ScheduledPost.run_at > run_at - gap)
+            .order_by(ScheduledPost.run_at)
+        )
+        slot = run_at
+        for taken in rows:
+            if abs(slot - taken) < gap:
+                slot = taken + gap
+        return slot
+
+    async def add(self, run_at: datetime, source_msg_id: int = None, photo_file_id: str = None, caption: str = None) -> ScheduledPost:
+        async with AsyncSessionLocal() as session:
+            slot = await self._free_slot(session, run_at)
+            if slot != run_at:
+                logger.info(f"⏰ Slot {run_at:%H:%M} busy, moved to {slot:%H:%M}")
+            post = ScheduledPost(source_msg_id=source_msg_id, photo_file_id=photo_file_id, caption=caption, run_at=slot, status="pending")
+            session.add(post)
+            await session.commit()
+            return post
+
+    @staticmethod
+    def parse_when(value: str):
+        """
+        "+30m" / "+2h" -> بعد مدة
+        "18:30"        -> أقرب موعد قادم (بتوقيت SCHEDULE_TZ_OFFSET_HOURS)
+        يرجع datetime بتوقيت UTC أو None
+        """
+        value = value.strip().lower()
+        now = datetime.utcnow()
+        try:
+            if value.startswith("+"):
+                amount, unit = int(value[1:-1]), value[-1]
+                return now + {"m": timedelta(minutes=amount), "h": timedelta(hours=amount), "d": timedelta(days=amount)}[unit]
+            hour, minute = (int(x) for x in value.split(":"))
+            offset = timedelta(hours=settings.SCHEDULE_TZ_OFFSET_HOURS)
+            local_now = now + offset
+            target = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if target <= local_now: target += timedelta(days=1)
+            return target - offset
+        except (ValueError, KeyError):
+            return None
+
+    async def schedule(self, run_at: datetime, **kwargs) -> ScheduledPost:
+        """add + register على job_queue المحفوظ (مثلاً من مرحلة النشر)"""
+        post = await self.add(run_at, **kwargs)
+        self.register(self.job_queue, post)
+        return post
+
+    def register(self, job_queue, post: ScheduledPost):
+        delay = max(1.0, (post.run_at - datetime.utcnow()).total_seconds())
+        job_queue.run_once(self._run_job, when=delay, data=post.id, name=f"scheduled_post_{post.id}")
+
+    async def load(self, job_queue) -> int:
+        """
+        تحميل المنشورات المعلقة إلى job_queue (عند البدء).
+        المنشورات "dispatched" دخلت طابور النشر ولم يكتمل بثها قبل التوقف، فتُعاد جدولتها أيضاً.
+        """
+        self.job_queue = job_queue
+        async with AsyncSessionLocal() as session:
+            posts = (await session.scalars(
+                select(ScheduledPost).where(ScheduledPost.status.in_(("pending", "dispatched"))).order_by(ScheduledPost.run_at)
+            )).all()
+        for post in posts:
+            self.register(job_queue, post)
+        if posts:
+            logger.info(f"⏰ Loaded {len(posts)} scheduled posts.")
+        return len(posts)
+
+    async def reload(self, job_queue) -> int:
+        """إعادة تحميل كل المعلق (بعد الاستعادة من نسخة احتياطية) دون تكرار المهام الحالية"""
+        for job in job_queue.jobs():
+            if job.name and job.name.startswith("scheduled_post_"):
+                job.schedule_removal()
+        return await self.load(job_queue)
+
+    async def pending(self) -> list:
+        async with AsyncSessionLocal() as session:
+            return (await session.scalars(
+                select(ScheduledPost).where(ScheduledPost.status == "pending").order_by(ScheduledPost.run_at)
+            )).all()
+
+    async def cancel(self, job_queue, post_id: int) -> bool:
+        async with AsyncSessionLocal() as session:
+            post = await session.get(ScheduledPost, post_id)
+            if not post or post.status != "pending": return False
+            post.status = "cancelled"
+            await session.commit()
+        for job in job_queue.get_jobs_by_name(f"scheduled_post_{post_id}"):
+            job.schedule_removal()
+        return True
+
+    async def finish(self, post_id: int, ok: bool):
+        """تُستدعى من مرحلة النشر بعد انتهاء البث فعلاً (sent) أو فشله (failed)"""
+        async with AsyncSessionLocal() as session:
+            post = await session.get(ScheduledPost, post_id)
+            if not post or post.status != "dispatched": return
+            post.status = "sent" if ok else "failed"
+            await session.commit()
+
+    async def _run_job(self, context):
+        post_id = context.job.data
+        async with AsyncSessionLocal() as session:
+            post = await session.get(ScheduledPost, post_id)
+            if not post or post.status not in ("pending", "dispatched"): return
+            try:
+                # البطاقة تُرفع للقناة المصدر مرة واحدة (إعادة التحميل بعد التوقف تستخدم نفس الرسالة)
+                if post.photo_file_id and not post.source_msg_id:
+                    sent = await context.bot.send_photo(
+                        chat_id=settings.MASTER_SOURCE_ID,
+                        photo=post.photo_file_id,
+                        caption=post.caption
+                    )
+                    post.source_msg_id = sent.message_id
+                # في طابور النشر الآن؛ مرحلة النشر تعلّمه sent بعد اكتمال البث (finish)
+                post.status = "dispatched"
+                await session.commit()
+                await self.publish_fn(context.bot, post.source_msg_id, post_id)
+            except Exception as e:
+                logger.error(f"❌ Scheduled post {post_id} failed: {e}")
+                post.status = "failed"
+                await session.commit()
@@ -0,0 +1,150 @@
+import logging
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func, and_, or_, not_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.database import AsyncSessionLocal
+from src.models import BotUser, TelegramChannel, TelegramGroup, ChatTag
+
+logger = logging.getLogger("Segments")
+
+# نوع المستلم -> (الجدول، عمود المعرف، عمود النشاط، اسم السجل)
+KINDS = {
+    "users": (BotUser, BotUser.user_id, BotUser.is_active, "Users"),
+    "channels": (TelegramChannel, TelegramChannel.chat_id, TelegramChannel.is_active, "Channels"),
+    "groups": (TelegramGroup, TelegramGroup.chat_id, TelegramGroup.is_active, "Groups"),
+}
+
+KIND_OF_MODEL = {model: kind for kind, (model, *_) in KINDS.items()}
+
+_AGE = re.compile(r"^(joined|seen)([<>])(\d+)([hdw])$")
+_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+
+class Segment:
+    """
+    شريحة مستلمين تُكتب كشروط مفصولة بمسافات (كلها معاً = AND):
+        tag:vip,gold     أحد الوسوم (OR)
+        -tag:muted       استبعاد
+        lang:ar          لغة المستخدم (وسم lang:ar)
+        joined<30d       انضم خلال آخر 30 يوماً (joined>30d: أقدم من ذلك)
+        seen<7d          تفاعل خلال آخر 7 أيام (للمستخدمين فقط)
+        kind:users,groups
+    تتحول لكل نوع إلى استعلام واحد (فهرس + semi-join على chat_tags) يُقرأ كتدفق.
+    """
+    def __init__(self, expr: str = ""):
+        self.expr = " ".join(expr.split())
+        self.kinds = None          # None = حسب الشروط
+        self.users_only = False
+        self._terms = []           # (negate, field, value)
+        for raw in self.expr.lower().split():
+            self._parse_term(raw)
+
+    def _parse_term(self, raw: str):
+        negate = raw.startswith("-")
+        term = raw.lstrip("-")
+
+        age = _AGE.match(term)
+        if age:
+            field, op, amount, unit = age.groups()
+            delta = timedelta(**{_UNITS[unit]: int(amount)})
+            if field == "seen": self.users_only = True
+            self._terms.append((negate, field, (op, delta)))
+            return
+
+        key, _, value = term.partition(":")
+        values = [v for v in value.split(",") if v]
+        if not values:
+            raise ValueError(f"شرط غير مفهوم: {raw}")
+
+        if key == "kind":
+            unknown = set(values) - set(KINDS)
+            if unknown or negate:
+                raise ValueError(f"نوع غير معروف: {raw}")
+            self.kinds = values
+        elif key == "tag":
+            self._terms.append((negate, "tag", values))
+        elif key == "lang":
+            self.users_only = True
+            self._terms.append((negate, "tag", [f"lang:{v}" for v in values]))
+        else:
+            raise ValueError(f"شرط غير مفهوم: {raw}")
+
+    @property
+    def is_everyone(self) -> bool:
+        return not self._terms and self.kinds is None
+
+    def _condition(self, model, id_col, negate, field, value):
+        if field == "tag":
+            cond = id_col.in_(select(ChatTag.chat_id).where(ChatTag.tag.in_(value)))
+        elif field == "joined":
+            op, delta = value
+            cutoff = datetime.utcnow() - delta
+            cond = model.joined_at >= cutoff if op == "<" else model.joined_at < cutoff
+        else:  # seen
+            op, delta = value
+            cutoff = datetime.utcnow() - delta
+            cond = model.last_seen_at >= cutoff if op == "<" else or_(model.last_seen_at < cutoff, model.last_seen_at.is_(None))
+        return not_(cond) if negate else cond
+
+    def targets(self):
+        """(kind, label, model, id_col, select) لكل نوع مشمول بالشريحة"""
+        kinds = self.kinds or (["users"] if self.users_only else list(KINDS))
+        for kind in kinds:
+            if self.users_only and kind != "users": continue
+            model, id_col, active_col, label = KINDS[kind]
+            conds = [active_col == True]
+            conds += [self._condition(model, id_col, *term) for term in self._terms]
+            yield kind, label, model, id_col, select(id_col).where(and_(*conds))
+
+    async def count(self) -> dict:
+        """عدد المستلمين لكل نوع (لمعاينة الشريحة قبل الإرسال)"""
+        counts = {}
+        async with AsyncSessionLocal() as session:
+            for _, label, _, _, stmt in self.targets():
+                counts[label] = await session.scalar(select(func.count()).select_from(stmt.subquery()))
+        return counts
+
+    def __str__(self):
+        return self.expr or "everyone"
+
+EVERYONE = Segment()
+
+# ---------------------------------------------------------
+# إدارة الوسوم
+# ---------------------------------------------------------
+async def add_tag(tag: str, chat_ids: list) -> int:
+    if not chat_ids: return 0
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            pg_insert(ChatTag)
+            .values([{"tag": tag, "chat_id": c} for c in chat_ids])
+            .on_conflict_do_nothing(index_elements=[ChatTag.tag, ChatTag.chat_id])
+            .returning(ChatTag.chat_id)
+        )
+        added = len((await session.scalars(stmt)).all())
+        await session.commit()
+    return added
+
+async def remove_tag(tag: str, chat_ids: list) -> int:
+    if not chat_ids: return 0
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(delete(ChatTag).where(ChatTag.tag == tag, ChatTag.chat_id.in_(chat_ids)))
+        await session.commit()
+    return result.rowcount
+
+async def tag_counts() -> list:
+    """[(tag, عدد)] مرتبة تنازلياً"""
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(ChatTag.tag, func.count()).group_by(ChatTag.tag).order_by(func.count().desc())
+        )
+        return rows.all()
+
+async def set_language(session, user_id: int, language_code: str):
+    """وسم lang:xx واحد لكل مستخدم (يُستبدل عند تغيّر لغة تيليجرام)"""
+    if not language_code: return
+    tag = f"lang:{language_code.split('-')[0].lower()}"
+    await session.execute(delete(ChatTag).where(ChatTag.chat_id == user_id, ChatTag.tag.like("lang:%"), ChatTag.tag != tag))
+    await session.execute(
+        pg_insert(ChatTag).values(tag=tag, chat_id=user_id).on_conflict_do_nothing(index_elements=[ChatTag.tag, ChatTag.chat_id])
+    )
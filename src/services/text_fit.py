@@ -0,0 +1,120 @@
+import os
+import logging
+from collections import OrderedDict
+from typing import NamedTuple
+from PIL import ImageFont
+from src.services import metrics
+
+logger = logging.getLogger("TextFit")
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "../../assets")
+# خط البطاقة: نفس الملف يُقاس هنا ويُحمّل في القالب (@font-face)، فلا فرق بين القياس والرسم.
+# Amiri العريض (700) إن وُجد في assets، وإلا Amiri العادي المرفق بوزنه الحقيقي (400)
+BOLD_FONT_PATH = os.path.join(ASSETS_DIR, "Amiri-Bold.ttf")
+FONT_PATH = BOLD_FONT_PATH if os.path.exists(BOLD_FONT_PATH) else os.path.join(ASSETS_DIR, "font.ttf")
+FONT_WEIGHT = 700 if FONT_PATH == BOLD_FONT_PATH else 400
+
+class TextOverflow(ValueError):
+    """النص لا يتسع للبطاقة حتى بأصغر حجم خط (المستدعي ينشر النص كما هو بدل بطاقة مقصوصة)"""
+
+class FitResult(NamedTuple):
+    size: int
+    lines: list        # الأسطر بعد الالتفاف (بنفس ترتيب النص)
+    overflow: bool     # حتى أصغر حجم لا يتسع للمنطقة الآمنة
+
+class TextFitter:
+    """
+    اختيار أكبر حجم خط يتسع فيه النص للمنطقة الآمنة (مع التفاف الأسطر)، بدون متصفح.
+    - عرض كل كلمة يُقاس مرة واحدة بحجم مرجعي (الحروف العربية تتغير حسب موضعها، فالكلمة هي الوحدة)
+      ثم يُحفظ؛ العرض يتناسب خطياً مع حجم الخط فلا حاجة لقياس جديد لكل حجم
+    - بحث ثنائي على الحجم: كل محاولة مجرد جمع أعراض محفوظة
+    الأبعاد الافتراضية تطابق قالب card.html (منطقة 900×1200 بحشوة 20، وتذييل ~160px)،
+    والخط هو نفسه خط القالب (FONT_PATH) فلا حاجة لهامش تقديري.
+    """
+    REF_SIZE = 100
+    CACHE_SIZE = 20000
+
+    def __init__(self, font_path: str = FONT_PATH, width: int = 860, height: int = 1000,
+                 line_height: float = 1.7, min_size: int = 36, max_size: int = 96):
+        self.width = width
+        self.height = height
+        self.line_height = line_height
+        self.min_size = min_size
+        self.max_size = max_size
+        self._widths = OrderedDict()
+        try:
+            self.font = ImageFont.truetype(font_path, self.REF_SIZE)
+            self.space = self.font.getlength(" ")
+        except Exception as e:
+            # بدون الخط: تقدير تقريبي لعرض الحرف (أفضل من التخمين بعدد الأحرف فقط)
+            logger.error(f"❌ Could not load {font_path}, using estimated widths: {e}")
+            self.font = None
+            self.space = self.REF_SIZE * 0.25
+
+    def _word_width(self, word: str) -> float:
+        """عرض الكلمة بالحجم المرجعي"""
+        width = self._widths.get(word)
+        if width is not None:
+            self._widths.move_to_end(word)
+            return width
+        width = self.font.getlength(word) if self.font else len(word) * self.REF_SIZE * 0.45
+        self._widths[word] = width
+        if len(self._widths) > self.CACHE_SIZE:
+            self._widths.popitem(last=False)
+        return width
+
+    def _paragraphs(self, text: str) -> list:
+        """[(كلمات, أعراضها المرجعية)] لكل سطر في النص الأصلي"""
+        result = []
+        for line in text.split("\n"):
+            words = line.split()
+            result.append((words, [self._word_width(w) for w in words]))
+        return result
+
+    def _wrap(self, paragraphs: list, size: int):
+        """التفاف جشع مثل pre-wrap. يرجع (الأسطر, هل كل كلمة تتسع لعرض السطر)"""
+        scale = size / self.REF_SIZE
+        max_width = self.width / scale   # المقارنة بالوحدات المرجعية بدل ضرب كل عرض
+        space = self.space
+        lines, fits = [], True
+        for words, widths in paragraphs:
+            if not words:
+                lines.append("")
+                continue
+            current, used = [words[0]], widths[0]
+            fits = fits and widths[0] <= max_width
+            for word, w in zip(words[1:], widths[1:]):
+                fits = fits and w <= max_width
+                if used + space + w <= max_width:
+                    current.append(word)
+                    used += space + w
+                else:
+                    lines.append(" ".join(current))
+                    current, used = [word], w
+            lines.append(" ".join(current))
+        return lines, fits
+
+    def _fits(self, paragraphs: list, size: int):
+        lines, wide_ok = self._wrap(paragraphs, size)
+        return wide_ok and len(lines) * size * self.line_height <= self.height, lines
+
+    def fit(self, text: str) -> FitResult:
+        paragraphs = self._paragraphs(text.strip())
+        lo, hi = self.min_size, self.max_size
+        ok, lines = self._fits(paragraphs, lo)
+        if not ok:
+            metrics.TEXT_FIT_OVERFLOW.inc()
+            logger.warning(f"⚠️ Text does not fit even at {lo}px ({len(lines)} lines)")
+            return FitResult(lo, lines, True)
+
+        best = (lo, lines)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            ok, lines = self._fits(paragraphs, mid)
+            if ok:
+                lo, best = mid, (mid, lines)
+            else:
+                hi = mid - 1
+        return FitResult(best[0], best[1], False)
+
+text_fitter = TextFitter()
@@ -0,0 +1,116 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+from contextlib import asynccontextmanager
+import redis.asyncio as redis
+from src.config import settings
+
+logger = logging.getLogger("PostTracer")
+
+class PostTracer:
+    """
+    تتبع مراحل معالجة المنشور الواحد (قفل، مزاج، خلفية، رسم، رفع، بث)
+    وحفظ الجدول الزمني في Redis تحت trace:{message_id}
+    """
+    def __init__(self):
+        self.redis = redis.from_url(settings.REDIS_URL)
+        self.ttl = settings.TRACE_TTL
+
+    def _key(self, msg_id: int) -> str:
+        return f"trace:{msg_id}"
+
+    @asynccontextmanager
+    async def span(self, msg_id: int, stage: str):
+        started = time.time()
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            await self.record(msg_id, stage, started, time.perf_counter() - t0, error)
+
+    async def record(self, msg_id, stage, started, duration, error=None):
+        entry = {"stage": stage, "start": round(started, 3), "ms": round(duration * 1000, 1)}
+        if error: entry["error"] = error[:200]
+        try:
+            key = self._key(msg_id)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.rpush(key, json.dumps(entry, ensure_ascii=False))
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.debug(f"Trace record failed: {e}")
+
+    async def alias(self, alias_id: int, msg_id: int):
+        """ربط رقم البطاقة المنشورة بالمنشور الأصلي (ليعمل /trace على أيهما)"""
+        try: await self.redis.set(f"trace:alias:{alias_id}", msg_id, ex=self.ttl)
+        except Exception: pass
+
+    async def get(self, msg_id: int) -> list:
+        target = await self.redis.get(f"trace:alias:{msg_id}")
+        if target: msg_id = int(target)
+        raw = await self.redis.lrange(self._key(msg_id), 0, -1)
+        return [json.loads(r) for r in raw]
+
+    def format(self, msg_id: int, spans: list) -> str:
+        if not spans:
+            return f"لا يوجد تتبع للرسالة {msg_id} (ربما انتهت صلاحيته)."
+        origin = min(s["start"] for s in spans)
+        lines = [f"🧭 تتبع المنشور {msg_id}", "──────────────"]
+        for s in spans:
+            offset = (s["start"] - origin) * 1000
+            mark = " ❌" if s.get("error") else ""
+            lines.append(f"+{offset:>7.0f}ms  {s['stage']:<10} {s['ms']:>8.1f}ms{mark}")
+            if s.get("error"): lines.append(f"           ↳ {s['error']}")
+        return "\n".join(lines)
+
+    # --- التحليل العميق (Profiling) عند الطلب ---
+    async def arm_profile(self):
+        await self.redis.set("trace:profile_next", "1", ex=self.ttl)
+
+    async def start_profile(self):
+        """يبدأ Profiler إذا طلبه المدير للمنشور القادم (مرة واحدة فقط)"""
+        try:
+            if not await self.redis.getdel("trace:profile_next"):
+                return None
+        except Exception:
+            return None
+
+        try:
+            # pyinstrument يفهم asyncio ويتتبع المهمة الحالية فقط
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="enabled")
+        except ImportError:
+            # cProfile يسجل كل ما يجري على الحلقة خلال المعالجة
+            profiler = cProfile.Profile()
+        if isinstance(profiler, cProfile.Profile): profiler.enable()
+        else: profiler.start()
+        logger.info("🔬 Profiling this post...")
+        return profiler
+
+    async def stop_profile(self, profiler, msg_id: int):
+        if profiler is None: return
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            report = out.getvalue()
+        else:
+            profiler.stop()
+            report = profiler.output_text(unicode=True, color=False)
+        await self.redis.set(f"trace:profile:{msg_id}", report, ex=self.ttl)
+        logger.info(f"🔬 Profile stored for post {msg_id}")
+
+    async def get_profile(self, msg_id: int):
+        target = await self.redis.get(f"trace:alias:{msg_id}")
+        if target: msg_id = int(target)
+        report = await self.redis.get(f"trace:profile:{msg_id}")
+        return report.decode("utf-8") if report else None
+
+tracer = PostTracer()
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.database import AsyncSessionLocal
+from src.models import BotUser, ChatTag
+from src.config import settings
+
+logger = logging.getLogger("UserCache")
+
+class UserCache:
+    """
+    ذاكرة LRU محدودة أمام جدول bot_users: (user_id -> (first_name, is_active, seen_on))
+    seen_on = تاريخ آخر تحديث لـ last_seen_at (نكتبه مرة واحدة يومياً لكل مستخدم)
+    + تجميع إدخالات المستخدمين الجدد في INSERT واحد أثناء موجات الانضمام.
+    """
+    def __init__(self):
+        self.max_size = settings.USER_CACHE_SIZE
+        self.batch_window = settings.USER_BATCH_WINDOW
+        self.batch_max = settings.USER_BATCH_MAX
+        self._cache = OrderedDict()
+        self._pending = {}      # user_id -> بيانات الإدخال
+        self._langs = {}        # user_id -> وسم اللغة (يُكتب مع نفس الدفعة)
+        self._waiters = {}      # user_id -> Future (هل أُدخل فعلاً؟)
+        self._flush_task = None
+
+    # --- القراءة والكتابة في الذاكرة ---
+    def get(self, user_id: int):
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self._cache.move_to_end(user_id)
+        return entry
+
+    def put(self, user_id: int, first_name: str, is_active: bool = True):
+        self._cache[user_id] = (first_name, is_active, datetime.utcnow().date())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id, None)
+
+    def clear(self):
+        """بعد تغييرات جماعية في الجدول (مثل الاستعادة من نسخة احتياطية)"""
+        self._cache.clear()
+
+    # --- الإدخال المجمّع ---
+    async def insert(self, user) -> bool:
+        """
+        يضيف المستخدم لدفعة الإدخال وينتظر تنفيذها.
+        يرجع True إذا كان المستخدم جديداً فعلاً (لم يسبقه إدخال آخر).
+        """
+        waiter = self._waiters.get(user.id)
+        if waiter is None:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[user.id] = waiter
+            self._pending[user.id] = {
+                "user_id": user.id,
+                "first_name": user.first_name,
+                "username": user.username,
+                "is_active": True,
+                "last_seen_at": datetime.utcnow(),
+            }
+            if user.language_code:
+                self._langs[user.id] = f"lang:{user.language_code.split('-')[0].lower()}"
+
+        if len(self._pending) >= self.batch_max:
+            await self._flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+        # shield: إلغاء أحد المنتظرين لا يلغي نتيجة الدفعة للبقية
+        return await asyncio.shield(waiter)
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.batch_window)
+        await self._flush()
+
+    async def _flush(self):
+        if not self._pending: return
+        rows, self._pending = list(self._pending.values()), {}
+        langs, self._langs = self._langs, {}
+        waiters = {r["user_id"]: self._waiters.pop(r["user_id"]) for r in rows}
+
+        try:
+            async with AsyncSessionLocal() as session:
+                stmt = (
+                    pg_insert(BotUser)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=[BotUser.user_id])
+                    .returning(BotUser.user_id)
+                )
+                inserted = set((await session.scalars(stmt)).all())
+                tags = [{"tag": langs[uid], "chat_id": uid} for uid in inserted if uid in langs]
+                if tags:
+                    await session.execute(
+                        pg_insert(ChatTag).values(tags).on_conflict_do_nothing(index_elements=[ChatTag.tag, ChatTag.chat_id])
+                    )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"❌ Batch user insert failed ({len(rows)} users): {e}")
+            for fut in waiters.values():
+                if not fut.done(): fut.set_exception(e)
+            return
+
+        if len(rows) > 1:
+            logger.info(f"👥 Batched {len(rows)} new users in one insert.")
+        for r in rows:
+            self.put(r["user_id"], r["first_name"], True)
+            fut = waiters[r["user_id"]]
+            if not fut.done(): fut.set_result(r["user_id"] in inserted)
+
+user_cache = UserCache()
@@ -0,0 +1,34 @@
+import re
+
+# التشكيل + علامات القرآن + التطويل
+_DIACRITICS = re.compile(r"[ؐ-ًؚ-ٰٟۖ-ۭـ]")
+_NON_WORD = re.compile(r"[^\w]+")
+# توحيد أشكال الألف والهمزة والياء والتاء المربوطة
+_UNIFY = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي", "ى": "ي", "ة": "ه",
+})
+
+# سوابق ولواحق شائعة (الأطول أولاً) للتجذيع الخفيف
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال", "و")
+_SUFFIXES = ("هما", "كما", "ات", "ون", "ين", "ان", "ها", "هم", "هن", "كم", "نا", "ته", "تي", "يه", "ه", "ي")
+
+def normalize(text: str) -> str:
+    """حذف التشكيل والتطويل، توحيد الحروف، حروف صغيرة، وعلامات الترقيم إلى مسافات"""
+    text = _DIACRITICS.sub("", text).translate(_UNIFY).lower()
+    return _NON_WORD.sub(" ", text).strip()
+
+def light_stem(word: str) -> str:
+    """تجذيع خفيف: سابقة واحدة ولاحقة واحدة مع إبقاء ثلاثة أحرف على الأقل"""
+    for p in _PREFIXES:
+        if word.startswith(p) and len(word) - len(p) >= 3:
+            word = word[len(p):]
+            break
+    for s in _SUFFIXES:
+        if word.endswith(s) and len(word) - len(s) >= 3:
+            word = word[:-len(s)]
+            break
+    return word
+
+def stems(text: str) -> list:
+    return [light_stem(w) for w in normalize(text).split()]
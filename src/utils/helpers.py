@@ -1,4 +1,5 @@
 import logging
+from datetime import datetime
 from telegram import Bot
 from telegram.constants import ParseMode
 from sqlalchemy import select
@@ -6,6 +7,9 @@ from src.database import AsyncSessionLocal
 from src.models import BotUser
 from src.config import settings
 from src.services.content_manager import content
+from src.services.user_cache import user_cache
+from src.services.segments import set_language
+from src.services.recipients import recipients
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +22,41 @@ async def notify_admin(bot: Bot, text: str):
         )
     except: pass
 
+def split_text(text: str, limit: int = 4096) -> list:
+    """تقسيم نص طويل على حدود الأسطر إلى أجزاء لا تتجاوز حد رسالة تيليجرام"""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current: chunks.append(current); current = ""
+            chunks.append(line[:limit]); line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current); current = line
+        else:
+            current = candidate
+    if current: chunks.append(current)
+    return chunks
+
+def card_caption(text: str) -> str:
+    """وصف البطاقة المنشورة: مقتطف من أول سطر + التوقيع"""
+    lines = [line for line in text.split('\n') if line.strip()]
+    excerpt = lines[0][:50] + "..." if lines else ""
+    return f"❝ {excerpt}\n\n💎 {settings.CHANNEL_HANDLE}"
+
 async def ensure_user_exists(user, bot: Bot = None):
     if not user: return None
+
+    # المسار السريع: مستخدم معروف ولم يتغير شيء وسُجّل تفاعله اليوم -> لا حاجة لقاعدة البيانات
+    # وجوده في لقطة المستلمين شرط أيضاً: أي تعطيل (مهما كان مساره) يخرجه منها
+    now = datetime.utcnow()
+    if user_cache.get(user.id) == (user.first_name, True, now.date()) and recipients.contains("users", user.id):
+        return user.id
+
     async with AsyncSessionLocal() as session:
         result = await session.execute(select(BotUser).where(BotUser.user_id == user.id))
         db_user = result.scalar_one_or_none()
         
-        if not db_user:
-            session.add(BotUser(user_id=user.id, first_name=user.first_name, username=user.username, is_active=True))
-            await session.commit()
-            logger.info(f"👤 New User: {user.first_name}")
-            if bot:
-                msg = content.get("admin.new_user", name=user.first_name, id=user.id)
-                await notify_admin(bot, msg)
-        else:
+        if db_user:
             updated = False
             if not db_user.is_active:
                 db_user.is_active = True
@@ -39,5 +64,22 @@ async def ensure_user_exists(user, bot: Bot = None):
             if db_user.first_name != user.first_name:
                 db_user.first_name = user.first_name
                 updated = True
+            # التفاعل واللغة يُحدّثان مرة يومياً على الأكثر (للشرائح seen:/lang:)
+            if not db_user.last_seen_at or db_user.last_seen_at.date() != now.date():
+                db_user.last_seen_at = now
+                await set_language(session, user.id, user.language_code)
+                updated = True
             if updated: await session.commit()
+            # بعد الحفظ فقط (ويصلح أيضاً لقطة فاتها المستخدم)
+            recipients.add("users", user.id)
+            user_cache.put(user.id, user.first_name, True)
+            return user.id
+
+    # مستخدم جديد: الإدخال يتم ضمن دفعة مشتركة (مهم عند موجات الانضمام)
+    if await user_cache.insert(user):
+        recipients.add("users", user.id)
+        logger.info(f"👤 New User: {user.first_name}")
+        if bot:
+            msg = content.get("admin.new_user", name=user.first_name, id=user.id)
+            await notify_admin(bot, msg)
     return user.id
\ No newline at end of file
@@ -0,0 +1,40 @@
+import base64
+import io
+import os
+import logging
+from telegram import InputFile
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+def image_to_data_url(image, fmt: str = "JPEG", quality: int = 90) -> str:
+    """تحويل صورة PIL إلى data URL (لاستخدامها كخلفية في القالب)"""
+    buf = io.BytesIO()
+    if fmt.upper() == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.save(buf, format=fmt, quality=quality)
+    mime = "image/jpeg" if fmt.upper() == "JPEG" else f"image/{fmt.lower()}"
+    return f"data:{mime};base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"
+
+def image_to_bytes(image, fmt: str = "PNG") -> bytes:
+    """تحويل صورة PIL إلى بايتات في الذاكرة (بدون ملف مؤقت)"""
+    buf = io.BytesIO()
+    if fmt.upper() == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.save(buf, format=fmt)
+    return buf.getvalue()
+
+def photo_file(data: bytes, name: str) -> InputFile:
+    """بايتات الصورة كـ InputFile للرفع مباشرة (مع نسخة على القرص عند تفعيل DEBUG_SPILL_DIR)"""
+    spill(data, name)
+    return InputFile(data, filename=name)
+
+def spill(data: bytes, name: str):
+    """للتشخيص فقط: حفظ نسخة من الصورة إن كان DEBUG_SPILL_DIR مضبوطاً"""
+    if not settings.DEBUG_SPILL_DIR: return
+    try:
+        os.makedirs(settings.DEBUG_SPILL_DIR, exist_ok=True)
+        with open(os.path.join(settings.DEBUG_SPILL_DIR, name), "wb") as f:
+            f.write(data)
+    except OSError as e:
+        logger.warning(f"⚠️ Debug spill of {name} failed: {e}")
@@ -0,0 +1,88 @@
+from collections import deque
+
+class AhoCorasick:
+    """
+    مطابقة عدة عبارات في مرور واحد على النص (زمن خطي في طول النص مهما كثرت العبارات).
+    العبارات والنص يُمرران بعد التطبيع نفسه (مثلاً lower).
+    """
+    def __init__(self, patterns):
+        self._goto = [{}]       # حالة -> {حرف: حالة}
+        self._fail = [0]
+        self._out = [()]        # حالة -> العبارات المنتهية هنا (الأطول أولاً، ثم عبر روابط الفشل)
+        for pattern in patterns:
+            if pattern: self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = (pattern,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str):
+        """أول عبارة موجودة في النص، أو None"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return out[state][0]
+        return None
+
+    def findall(self, text: str):
+        """كل تطابق (بما فيها المتداخلة) كأزواج (موضع النهاية, العبارة)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in out[state]:
+                yield i, pattern
+
+    def __len__(self):
+        return len(self._goto)
+
+class DomainSet:
+    """
+    مجموعة نطاقات بمطابقة اللاحقة: "example.com" تطابق "example.com" و"a.b.example.com".
+    الفحص = بحث في set لكل لاحقة من اسم المضيف (عدد النقاط + 1 عملية على الأكثر).
+    """
+    def __init__(self, domains=()):
+        self._domains = {d.strip().lower().lstrip(".") for d in domains if d and d.strip()}
+
+    def add(self, domain: str):
+        self._domains.add(domain.strip().lower().lstrip("."))
+
+    def match(self, host: str) -> bool:
+        if not self._domains: return False
+        host = host.lower().rstrip(".")
+        while True:
+            if host in self._domains: return True
+            dot = host.find(".")
+            if dot < 0: return False
+            host = host[dot + 1:]
+
+    def __len__(self):
+        return len(self._domains)
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# إعدادات وهمية تكفي لاستيراد src (قاعدة SQLite مؤقتة، بدون أي اتصال خارجي)
+os.environ.setdefault("BOT_TOKEN", "1:test")
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.setdefault("MASTER_SOURCE_ID", "-100")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+os.environ.setdefault("FAL_KEY", "test")
@@ -0,0 +1,19 @@
+from datetime import datetime
+from telegram import Chat, Message
+from src.config import settings
+from src.services.filters import FilterService
+
+def _message(text: str) -> Message:
+    return Message(message_id=1, date=datetime.utcnow(), chat=Chat(id=-200, type=Chat.SUPERGROUP), text=text)
+
+def test_trailing_comma_does_not_change_the_link():
+    message_filter = FilterService()
+    handle = settings.CHANNEL_HANDLE.lstrip("@")
+    assert message_filter.check(_message(f"تابعونا على t.me/{handle}, وشاركوا")) is None
+    assert message_filter.check(_message("شاهد https://youtube.com/watch?v=1، رائع")) is None
+    assert message_filter.check(_message("رابط https://bit.ly/x, اضغط")) == "link:bit.ly"
+
+def test_trailing_punctuation_is_stripped():
+    message_filter = FilterService()
+    assert message_filter.check(_message("انظر (https://wikipedia.org/wiki/Amiri).")) is None
+    assert message_filter.check(_message("هنا: https://spam.example?")) == "link:spam.example"
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from telegram import Chat, ChatMemberLeft, ChatMemberMember, ChatMemberUpdated, Update, User
+from sqlalchemy import select
+from src.database import engine, AsyncSessionLocal
+from src.models import Base, TelegramChannel
+from src.services.recipients import recipients
+from src.handlers.groups import track_chats
+
+CHAT_ID = -1001234
+
+def _left_update():
+    bot_user = User(id=42, first_name="bot", is_bot=True)
+    admin = User(id=7, first_name="owner", is_bot=False)
+    return Update(update_id=1, my_chat_member=ChatMemberUpdated(
+        chat=Chat(id=CHAT_ID, type=Chat.CHANNEL, title="test"),
+        from_user=admin,
+        date=datetime.utcnow(),
+        old_chat_member=ChatMemberMember(bot_user),
+        new_chat_member=ChatMemberLeft(bot_user),
+    ))
+
+async def _prepare():
+    tables = [Base.metadata.tables["bot_users"], TelegramChannel.__table__]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+    async with AsyncSessionLocal() as session:
+        session.add(TelegramChannel(chat_id=CHAT_ID, title="test", is_active=True))
+        await session.commit()
+
+def test_leaving_a_channel_deactivates_it():
+    async def scenario():
+        await _prepare()
+        recipients.add("channels", CHAT_ID)
+        await track_chats(_left_update(), SimpleNamespace(bot=None))
+        async with AsyncSessionLocal() as session:
+            return await session.scalar(select(TelegramChannel.is_active).where(TelegramChannel.chat_id == CHAT_ID))
+
+    assert asyncio.run(scenario()) is False
+    assert CHAT_ID not in recipients._ids["channels"]